@@ -0,0 +1,231 @@
+# Bulk resume scoring: many resumes against one or more target roles.
+#
+#   python batch.py resumes.jsonl --roles "Data Analyst,QA Engineer" > scores.jsonl
+#   python batch.py ./resumes/ --jd jd.txt --feedback --llm-concurrency 4 -o scores.jsonl
+#
+# Input is JSONL (one {"id", "resume_text", "target_role"?, "job_description"?} per
+# line, "-" for stdin) or a directory of .txt/.md files. Local scoring runs in a
+# process pool; optional LLM feedback fans out with bounded concurrency. Results
+# are written as JSONL the moment each one is ready, so output order != input order.
+import argparse
+import concurrent.futures
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", str(os.cpu_count() or 2)))
+# Resumes per pool task; amortizes pickling/IPC over several ~1ms scorings
+BATCH_CHUNK = int(os.environ.get("BATCH_CHUNK", "16"))
+# Upstream calls one batch may hold at once (the LLM layer's global cap still applies)
+BATCH_LLM_CONCURRENCY = int(os.environ.get("BATCH_LLM_CONCURRENCY", "4"))
+# Limits for /api/resume/batch (resume/role pairs, request body size)
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "500"))
+BATCH_MAX_BYTES = int(os.environ.get("BATCH_MAX_BYTES", str(20 * 1024 * 1024)))
+
+_SCORE_FIELDS = ("ats_score_percent", "missing_keywords", "keyword_coverage", "basis", "profile_role")
+_FEEDBACK_FIELDS = ("sections_feedback", "bullet_improvements", "suggested_projects", "certification_suggestions")
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _init_worker():
+    # Workers only score locally: load the taxonomy and index once per process
+    import scoring  # noqa: F401
+
+
+def make_pool(workers: int = BATCH_WORKERS):
+    # spawn, not fork: the server process is multi-threaded by the time a batch arrives.
+    # A spawned worker re-runs the parent's main module (server.py under `python server.py`),
+    # so that module must stay cheap to import; the workers themselves only need scoring
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+    )
+
+
+def shared_pool():
+    # One long-lived pool per server process, started on the first batch request
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = make_pool()
+        return _POOL
+
+
+def score_job(job: dict) -> dict:
+    import scoring
+    resume_text = job["resume_text"]
+    rec = {"id": job["id"], "target_role": job["target_role"]}
+    rec.update(scoring.SKILLS.score_resume(resume_text, job["target_role"], job["job_description"]))
+    rec.setdefault("ats_score_percent", None)
+    rec["top_roles"] = [{"title": role["title"], "score": sc} for sc, role in scoring.SKILLS.rank_roles(resume_text, 3)]
+    rec["job_suggestions"] = scoring.job_suggestions(resume_text, job["target_role"])
+    return rec
+
+
+def _score_chunk(jobs):
+    return [score_job(job) for job in jobs]
+
+
+def _feedback(job: dict, rec: dict, analyze, cache_get=None, cache_set=None) -> dict:
+    out = dict(rec)
+    local = {k: rec[k] for k in _SCORE_FIELDS if rec.get(k) is not None}
+    try:
+        data = cache_get(job) if cache_get is not None else None
+        if data is None:
+            data = analyze(job["resume_text"], job["target_role"], job["job_description"], local)
+            if cache_set is not None:
+                cache_set(job, data)
+        if not isinstance(data, dict):
+            raise ValueError("model returned no JSON object")
+    except Exception as e:
+        out["warning"] = f"AI feedback unavailable: {e}"
+        return out
+    if not local:
+        out["ats_score_percent"] = data.get("ats_score_percent")
+        out["missing_keywords"] = data.get("missing_keywords") or []
+    out["feedback"] = {k: data.get(k) for k in _FEEDBACK_FIELDS}
+    if data.get("meta"):
+        out["meta"] = data["meta"]
+    return out
+
+
+def make_jobs(items, roles=None, job_description: str = ""):
+    # One job per (resume, target role); an item's own target_role/job_description win
+    for n, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            continue
+        text = str(item.get("resume_text") or "").strip()
+        if not text:
+            continue
+        own = item.get("target_roles") or ([item["target_role"]] if item.get("target_role") else None)
+        for role in own or roles or [""]:
+            yield {
+                "id": str(item.get("id") or n),
+                "resume_text": text,
+                "target_role": str(role or "").strip(),
+                "job_description": str(item.get("job_description") or job_description or "").strip(),
+            }
+
+
+def run_batch(jobs, pool=None, workers: int = BATCH_WORKERS, analyze=None, cache_get=None, cache_set=None,
+              llm_concurrency: int = BATCH_LLM_CONCURRENCY, chunk: int = BATCH_CHUNK):
+    # Generator of result records in completion order; close it to abandon the batch.
+    # analyze(resume_text, target_role, job_description, local) adds model feedback; the caller
+    # passes it (and cache_get(job) / cache_set(job, data)) so this module never imports server
+    own_pool = pool is None
+    if own_pool:
+        pool = make_pool(workers)
+    llm_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, llm_concurrency)) if analyze is not None else None
+    jobs = iter(jobs)
+    pending = {}  # future -> ("score", jobs) | ("feedback", None)
+    max_chunks = max(1, workers) * 2
+
+    def refill():
+        # keep only a few chunks queued so huge inputs stream through in bounded memory
+        while sum(1 for kind, _ in pending.values() if kind == "score") < max_chunks:
+            part = list(itertools.islice(jobs, max(1, chunk)))
+            if not part:
+                return
+            pending[pool.submit(_score_chunk, part)] = ("score", part)
+
+    try:
+        refill()
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in done:
+                kind, part = pending.pop(fut)
+                if kind == "feedback":
+                    yield fut.result()
+                    continue
+                try:
+                    records = fut.result()
+                except Exception as e:
+                    records = [{"id": j["id"], "target_role": j["target_role"], "error": str(e)} for j in part]
+                for job, rec in zip(part, records):
+                    if llm_pool is not None and not rec.get("error"):
+                        pending[llm_pool.submit(_feedback, job, rec, analyze, cache_get, cache_set)] = ("feedback", None)
+                    else:
+                        yield rec
+                refill()
+    finally:
+        for fut in pending:
+            fut.cancel()
+        if llm_pool is not None:
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+        if own_pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def read_items(path: str):
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if os.path.splitext(name)[1].lower() in (".txt", ".md"):
+                with open(os.path.join(path, name), "r", encoding="utf-8", errors="replace") as f:
+                    yield {"id": name, "resume_text": f.read()}
+        return
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"[WARN] {path}:{n}: not valid JSON, skipped", file=sys.stderr)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Score many resumes against one or more target roles")
+    ap.add_argument("input", help="JSONL file ('-' for stdin) or a directory of .txt/.md resumes")
+    ap.add_argument("--roles", default="", help="comma-separated target roles (default: each item's target_role)")
+    ap.add_argument("--jd", default=None, help="file with a job description to score every resume against")
+    ap.add_argument("--feedback", action="store_true", help="also ask the model for prose feedback")
+    ap.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    ap.add_argument("--llm-concurrency", type=int, default=BATCH_LLM_CONCURRENCY)
+    ap.add_argument("--chunk", type=int, default=BATCH_CHUNK)
+    ap.add_argument("-o", "--output", default="-", help="output JSONL file (default: stdout)")
+    args = ap.parse_args(argv)
+
+    feedback = {}
+    if args.feedback:
+        # Only feedback needs the model; server wants GROQ_API_KEY and may warn on import.
+        # It is loaded here in the parent only, the scoring workers never import it
+        with contextlib.redirect_stdout(sys.stderr):
+            import server
+        feedback = {"analyze": server.analyze_resume, "cache_get": server._batch_cache_get, "cache_set": server._batch_cache_set}
+
+    roles = [x.strip() for x in args.roles.split(",") if x.strip()]
+    jd = ""
+    if args.jd:
+        with open(args.jd, "r", encoding="utf-8") as f:
+            jd = f.read()
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    started = time.time()
+    count = errors = 0
+    try:
+        jobs = make_jobs(read_items(args.input), roles, jd)
+        for rec in run_batch(jobs, workers=args.workers, llm_concurrency=args.llm_concurrency, chunk=args.chunk, **feedback):
+            out.write(json.dumps(rec) + "\n")
+            out.flush()
+            count += 1
+            errors += 1 if rec.get("error") else 0
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"scored {count} resume/role pairs ({errors} errors) in {time.time() - started:.1f}s", file=sys.stderr)
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
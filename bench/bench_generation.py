@@ -0,0 +1,174 @@
+# Generation-profile benchmark: every JSON endpoint against the local stub, with
+# the per-endpoint profiles (JSON mode, max_tokens, temperature, stop) off and on.
+#
+#   python bench/bench_generation.py [--requests 20] [--tps 1000] [--runaway 0.1] [--json out.json]
+#
+# The stub plays a chatty model: outside JSON mode it wraps replies in prose and
+# fences, a --runaway fraction of replies keeps going for ~2000 more tokens, and
+# each reply takes latency + tokens / tps. Token counts are the stub's ~4 chars
+# per token estimate. This measures what the settings do to output size and
+# tail latency, not answer quality.
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_WEEKS_RE = re.compile(r"(\d+) weeks")
+
+
+def _weeks(body, default=8):
+    m = _WEEKS_RE.search(body["messages"][-1]["content"])
+    return int(m.group(1)) if m else default
+
+
+def _sentences(n, topic="this area"):
+    return " ".join(f"Sentence {i + 1} about {topic} with enough detail to be useful to a learner." for i in range(n))
+
+
+# Reply the stub sends for each endpoint, keyed by a phrase from that endpoint's system prompt
+REPLIES = {
+    "labor market analyst": lambda body: json.dumps({
+        "role": "Role", "region": "US",
+        "demand_trend": {"years": [2020, 2021, 2022, 2023, 2024], "demand_index": [55, 60, 64, 70, 73]},
+        "salary_by_region": [{"region": "US", "avg_salary": 98000}, {"region": "EU", "avg_salary": 71000}],
+        "top_skills": ["SQL", "Python", "Statistics", "Dashboards", "Communication"],
+        "growth_forecast": {"five_year_outlook": _sentences(4), "automation_risk_percent": 22, "notes": _sentences(4)},
+    }, indent=2),
+    "Applicant Tracking System": lambda body: json.dumps({
+        "target_role": "Data Analyst",
+        "sections_feedback": {k: _sentences(3, k) for k in ("summary", "experience", "skills", "education")},
+        "bullet_improvements": [_sentences(2, "a bullet") for _ in range(4)],
+        "suggested_projects": [_sentences(1, "a project") for _ in range(3)],
+        "certification_suggestions": [_sentences(1, "a certification") for _ in range(3)],
+        "job_suggestions": [{"title": "BI Analyst", "level": "junior", "why_fit": _sentences(2)} for _ in range(3)],
+    }, indent=2),
+    "adaptive career quiz by asking": lambda body: json.dumps({"question": {
+        "id": "start_interest", "text": "If you could pick one superpower for work, which would it be?",
+        "options": ["Master any skill", "Perfect networking", "Unlimited energy", "See future trends"]}}, indent=2),
+    "NEXT adaptive question": lambda body: json.dumps({"question": {
+        "id": "work_style", "text": "Which kind of problem do you enjoy untangling most?",
+        "options": ["Messy data", "People conflicts", "Broken machines", "Blank canvases"]}}, indent=2),
+    "analyze the provided quiz answers": lambda body: json.dumps({"matches": [
+        {"role": r, "confidence": c, "reasoning": _sentences(2), "personality_fit": ["Curious", "Analytical"],
+         "skills_fit": ["SQL", "Communication"]} for r, c in (("Data Analyst", 82), ("QA Engineer", 70), ("UX Researcher", 64))]}, indent=2),
+    "learning plan": lambda body: json.dumps({
+        "role": "Role",
+        "learning_paths": [{"title": f"Path {p}", "resources": [{"name": f"Resource {r}", "url": "https://example.org"} for r in range(4)]}
+                           for p in range(3)],
+        "roadmap_weeks": [{"week": w + 1, "focus": _sentences(3, f"week {w + 1}"), "outcomes": [f"Outcome {o}" for o in range(4)]}
+                          for w in range(_weeks(body))],
+        "resume_tips": [_sentences(1, "the resume") for _ in range(6)],
+    }, indent=2),
+    "comparative overview": lambda body: json.dumps({
+        "roles": [{"role": r, "salary_range": _sentences(2), "demand_growth": _sentences(2), "work_life_balance": _sentences(2),
+                   "education": _sentences(2), "top_skills": [f"Skill {s}: why it matters" for s in range(5)],
+                   "automation_risk_percent": 30} for r in ("A", "B")],
+        "summary": _sentences(5),
+    }, indent=2),
+    "weekly skill development roadmap": lambda body: json.dumps({
+        "job": "Job",
+        "weeks": [{"week": w + 1, "focus_description": _sentences(2, f"week {w + 1}"),
+                   "skills": [f"Skill {s}: what it is for and how to practise it" for s in range(4)]} for w in range(_weeks(body))],
+    }, indent=2),
+}
+
+# (name, path, payload for request i)
+ENDPOINTS = [
+    ("market", "/api/market", lambda i: {"role": f"Bench Role {i}", "region": "US"}),
+    ("resume", "/api/resume/analyze", lambda i: {"resume_text": f"Analyst {i}. Skills: SQL, Python, Excel. 3 years experience.",
+                                                 "target_role": "Underwater Welder"}),
+    ("adaptive_quiz_start", "/api/adaptive_quiz/start", lambda i: {}),
+    ("adaptive_quiz_next", "/api/adaptive_quiz/next", lambda i: {"history": [
+        {"role": "assistant", "content": "Pick a superpower"}, {"role": "user", "content": f"Answer {i}"}]}),
+    ("quiz", "/api/quiz", lambda i: {"answers": [f"Q{n}: answer {i}-{n}" for n in range(10)]}),
+    ("recommend", "/api/recommend", lambda i: {"role": f"Bench Role {i}", "background": "CS student", "weeks": 8}),
+    ("compare", "/api/compare", lambda i: {"role_a": f"Role A{i}", "role_b": f"Role B{i}"}),
+    ("roadmap", "/api/roadmap", lambda i: {"job": f"Bench Job {i}", "weeks": 10}),
+]
+
+
+def _call(server, path, payload):
+    raw = json.dumps(payload).encode("utf-8")
+    env = {"REQUEST_METHOD": "POST", "PATH_INFO": path, "QUERY_STRING": "", "SERVER_NAME": "bench", "SERVER_PORT": "80",
+           "SERVER_PROTOCOL": "HTTP/1.1", "wsgi.input": io.BytesIO(raw), "wsgi.errors": sys.stderr, "wsgi.version": (1, 0),
+           "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False, "wsgi.url_scheme": "http",
+           "CONTENT_LENGTH": str(len(raw)), "CONTENT_TYPE": "application/json"}
+    out = []
+    body = server.app(env, lambda status, headers, exc=None: out.append)
+    return b"".join(out) + b"".join(body)
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run(server, prompts, stub, log, requests: int, profiles: bool):
+    prompts.GENERATION_PROFILES = profiles
+    stub.RequestHandlerClass._rng.seed(7)  # same runaway pattern for both modes
+    rows = {}
+    for name, path, payload in ENDPOINTS:
+        latencies = []
+        start = len(log)
+        for i in range(requests):
+            server._CACHE.clear()
+            t = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                _call(server, path, payload(i))
+            latencies.append(time.perf_counter() - t)
+        calls = log[start:]
+        rows[name] = {
+            "upstream_calls": len(calls),
+            "prompt_tokens": round(statistics.mean(c["prompt_tokens"] for c in calls)) if calls else 0,
+            "completion_tokens": round(statistics.mean(c["completion_tokens"] for c in calls)) if calls else 0,
+            "truncated": sum(1 for c in calls if c["finish_reason"] == "length"),
+            "p50_ms": round(_pct(latencies, 0.5) * 1000, 1),
+            "p95_ms": round(_pct(latencies, 0.95) * 1000, 1),
+        }
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=20, help="requests per endpoint and mode")
+    ap.add_argument("--latency", type=float, default=0.05, help="stub time to first token (seconds)")
+    ap.add_argument("--tps", type=float, default=1000.0, help="stub completion tokens per second")
+    ap.add_argument("--runaway", type=float, default=0.1, help="fraction of replies that run on past the JSON")
+    ap.add_argument("--json", default=None, help="also write the results to this file")
+    args = ap.parse_args()
+
+    from bench.stub_groq import serve
+    log = []
+    stub = serve("127.0.0.1", 0, args.latency, replies=REPLIES, tps=args.tps, chatter=True, runaway=args.runaway, log=log)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    os.environ.update({"GROQ_API_KEY": "stub", "GROQ_BASE_URL": f"http://127.0.0.1:{stub.server_address[1]}",
+                       "CACHE_DB": "", "MARKET_INDEX_PATH": "", "MARKET_INDEX_REFRESH": "0",
+                       "LLM_RATE_LIMITS": ""})  # the stub has no quota to protect
+    with contextlib.redirect_stdout(sys.stderr):
+        import prompts
+        import server
+
+    results = {"settings": vars(args), "off": run(server, prompts, stub, log, args.requests, False),
+               "on": run(server, prompts, stub, log, args.requests, True)}
+    stub.shutdown()
+
+    print(f"{'endpoint':22}{'completion tok off/on':>24}{'p50 ms off/on':>20}{'p95 ms off/on':>20}{'truncated on':>14}")
+    for name, _, _ in ENDPOINTS:
+        off, on = results["off"][name], results["on"][name]
+        print(f"{name:22}{off['completion_tokens']:>12}/{on['completion_tokens']:<11}"
+              f"{off['p50_ms']:>10}/{on['p50_ms']:<9}{off['p95_ms']:>10}/{on['p95_ms']:<9}{on['truncated']:>14}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
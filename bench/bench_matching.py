@@ -0,0 +1,223 @@
+# Micro-benchmark: tokenizing keyword matcher vs. the original substring scans.
+#
+#   python bench/bench_matching.py [--repeat 200] [--resume-kb 20]
+#
+# The legacy_* functions below are verbatim copies of the pre-matcher heuristics
+# in server.py, kept here only as the baseline.
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# server.py wants a key at import time; the heuristics never call upstream
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("CACHE_DB", "")
+os.environ.setdefault("MARKET_INDEX_REFRESH", "0")
+import server  # noqa: E402
+from matching import KeywordMatcher, RoleTaxonomy  # noqa: E402
+
+
+def legacy_job_suggestions(resume_text: str, target_role: str = ""):
+    txt = (resume_text or "")
+    low = txt.lower()
+    def has(*keys):
+        return any(k in low for k in keys)
+    # Rough experience level detection
+    level = "entry"
+    if "intern" in low or "internship" in low:
+        level = "entry"
+    else:
+        import re
+        m = re.search(r"(\d+)\+?\s*(years|yrs)", low)
+        years = int(m.group(1)) if m else 0
+        if years >= 7:
+            level = "senior"
+        elif years >= 4:
+            level = "mid"
+        elif years >= 2:
+            level = "junior"
+        else:
+            level = "entry"
+
+    roles = []
+    def add(title, why, score):
+        roles.append({"title": title, "level": level, "why_fit": why, "_score": score})
+
+    # Keyword-based scoring
+    score = 0
+    if has("python", "pandas", "numpy", "sklearn", "sql"):
+        score = sum(1 for k in ["python","pandas","numpy","sql","excel","tableau","power bi"] if k in low)
+        if has("tensorflow","pytorch","scikit"):
+            add("Data Scientist", "ML libraries and data tools present", score + 2)
+        add("Data Analyst", "Data tools (" + ", ".join([k for k in ["sql","excel","tableau","power bi","python"] if k in low]) + ")", score)
+    if has("react", "javascript", "typescript"):
+        score = sum(1 for k in ["react","typescript","javascript","next.js"] if k in low)
+        add("Frontend Developer", "Web stack (" + ", ".join([k for k in ["react","typescript","javascript"] if k in low]) + ")", score)
+    if has("node", "express", "java", "spring", "django", "flask"):
+        score = sum(1 for k in ["node","express","java","spring","django","flask","go",".net"] if k in low)
+        add("Backend Developer", "Backend frameworks present", score)
+    if has("aws", "azure", "gcp", "docker", "kubernetes", "terraform", "ci/cd"):
+        score = sum(1 for k in ["aws","azure","gcp","docker","kubernetes","terraform","jenkins","ci/cd"] if k in low)
+        add("Cloud/DevOps Engineer", "Cloud/DevOps tooling experience", score)
+    if has("figma", "ux", "ui", "sketch"):
+        score = sum(1 for k in ["figma","ux","ui","sketch","wireframe"] if k in low)
+        add("UI/UX Designer", "Design tools and UX keywords", score)
+    if has("excel", "tableau", "power bi") and not any(r["title"].startswith("Data") for r in roles):
+        score = sum(1 for k in ["excel","tableau","power bi","sql"] if k in low)
+        add("Business Analyst", "BI/analytics tools present", score)
+    if has("qa", "testing", "selenium", "cypress"):
+        score = sum(1 for k in ["qa","testing","selenium","cypress","jest"] if k in low)
+        add("QA Engineer", "Test frameworks and QA focus", score)
+    if has("security", "cyber", "soc"):
+        score = sum(1 for k in ["security","cyber","siem","soc","splunk"] if k in low)
+        add("Security Analyst", "Security keywords present", score)
+    if has("marketing", "seo", "content", "social"):
+        score = sum(1 for k in ["marketing","seo","content","social"] if k in low)
+        add("Digital Marketing Specialist", "Marketing stack keywords present", score)
+    if has("salesforce"):
+        add("Salesforce Administrator", "Salesforce keyword present", 1)
+    if has("project management", "scrum", "jira"):
+        add("Project Coordinator", "Project management tools present", 1)
+
+    # Include target role if provided and absent
+    if (target_role or "").strip():
+        tr = (target_role or "").strip()
+        if not any(r["title"].lower() == tr.lower() for r in roles):
+            add(tr, "Matches your target role", 0)
+
+    # De-duplicate by title and sort by score desc
+    uniq = {}
+    for r in roles:
+        t = r["title"].strip()
+        if t and (t not in uniq or r.get("_score", 0) > uniq[t].get("_score", 0)):
+            uniq[t] = r
+    out = list(uniq.values())
+    out.sort(key=lambda x: x.get("_score", 0), reverse=True)
+    # Strip internal keys
+    for r in out:
+        r.pop("_score", None)
+    return out[:4]
+
+
+def legacy_matches_from_answers(answers):
+    try:
+        txt = " \n ".join([str(a) for a in (answers or [])])
+    except Exception:
+        txt = str(answers)
+    low = txt.lower()
+    found = []
+    def score_for(keys):
+        return sum(1 for k in keys if k in low)
+    candidates = []
+    # Role candidate tuples: (title, keywords, personality, extra_skills)
+    candidates.append(("Data Analyst", ["python","sql","excel","tableau","power bi","statistics","pandas"], ["Analytical","Detail-oriented"], ["SQL","Excel"]))
+    candidates.append(("Data Scientist", ["tensorflow","pytorch","ml","machine learning","sklearn","deep learning"], ["Curious","Analytical"], ["ML","Python"]))
+    candidates.append(("Frontend Developer", ["react","javascript","typescript","css","html","ui"], ["Creative","User-focused"], ["React","JS"]))
+    candidates.append(("Backend Developer", ["node","express","java","spring","django","flask","api"], ["System-thinking","Problem-solving"], ["APIs","Databases"]))
+    candidates.append(("UI/UX Designer", ["figma","ui","ux","wireframe","prototype","design"], ["Empathy","Creative"], ["Figma","Prototyping"]))
+    candidates.append(("Business Analyst", ["excel","tableau","power bi","stakeholder","requirements"], ["Communicator","Analytical"], ["Dashboards","KPIs"]))
+    candidates.append(("Cloud/DevOps Engineer", ["aws","azure","gcp","docker","kubernetes","ci/cd","terraform"], ["Pragmatic","Reliable"], ["CI/CD","Cloud"]))
+    for title, keys, persona, extra in candidates:
+        sc = score_for(keys)
+        if sc:
+            found.append({
+                "title": title,
+                "score": sc,
+                "personality": persona,
+                "skills": [k.upper() for k in keys if k in low][:5] or extra,
+            })
+    if not found:
+        # default generic
+        found.append({"title": "Generalist (Explore)", "score": 1, "personality": ["Curious"], "skills": ["Communication","Basics"]})
+    found.sort(key=lambda x: x["score"], reverse=True)
+    matches = []
+    for f in found[:3]:
+        conf = min(90, 40 + f["score"] * 10)
+        matches.append({
+            "role": f["title"],
+            "confidence": conf,
+            "reasoning": f"Signals found in your answers (e.g., {', '.join(f['skills'])}).",
+            "personality_fit": f["personality"],
+            "skills_fit": f["skills"],
+        })
+    return matches
+
+
+_WORDS = (
+    "built scalable data pipelines using python pandas and sql for reporting teams; "
+    "led migration of legacy services to aws with docker and kubernetes; "
+    "designed dashboards in tableau and power bi; wrote unit tests with jest and cypress; "
+    "collaborated with stakeholders to gather requirements; mentored interns; "
+    "improved build times by 40% through ci/cd caching; 5+ years of experience; "
+    "delivered react and typescript front-ends; managed jira boards in scrum ceremonies; "
+).split()
+
+
+def make_resume(kb: int, seed: int = 7) -> str:
+    rnd = random.Random(seed)
+    out, size = [], 0
+    while size < kb * 1024:
+        line = " ".join(rnd.choice(_WORDS) for _ in range(14))
+        out.append(line)
+        size += len(line) + 1
+    return "\n".join(out)
+
+
+def timed(fn, arg, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=200)
+    ap.add_argument("--resume-kb", type=int, default=20)
+    args = ap.parse_args()
+
+    resume = make_resume(args.resume_kb)
+    answers = [line for line in resume.splitlines()[:40]]
+    rows = [
+        ("job_suggestions", server._heuristic_job_suggestions, legacy_job_suggestions, resume),
+        ("matches_from_answers", server._heuristic_matches_from_answers, legacy_matches_from_answers, answers),
+    ]
+    print(f"resume size: {len(resume) / 1024:.1f} KB, repeat: {args.repeat}")
+    print(f"{'function':<24}{'legacy ms':>12}{'matcher ms':>14}{'speedup':>10}")
+    for name, new, old, arg in rows:
+        t_old = timed(old, arg, args.repeat)
+        t_new = timed(new, arg, args.repeat)
+        print(f"{name:<24}{t_old:>12.3f}{t_new:>14.3f}{t_old / t_new:>9.1f}x")
+
+    # Substring scans cost one pass per keyword; the matcher one pass per text
+    low = resume.lower()
+    base = list(server._TAXONOMY.matcher.keywords)
+    print(f"\n{'keywords':<24}{'substring ms':>12}{'matcher ms':>14}{'speedup':>10}")
+    for n in (len(base), 250, 1000):
+        vocab = base + [f"skill{i}" for i in range(max(0, n - len(base)))]
+        matcher = KeywordMatcher(vocab)
+        t_old = timed(lambda t: [k for k in vocab if k in t], low, args.repeat)
+        t_new = timed(matcher.present, low, args.repeat)
+        print(f"{len(vocab):<24}{t_old:>12.3f}{t_new:>14.3f}{t_old / t_new:>9.1f}x")
+
+    # Taxonomy scoring: only columns of keywords present in the text are touched
+    rnd = random.Random(3)
+    print(f"\n{'roles':<24}{'rank ms':>12}")
+    for n in (len(server._TAXONOMY), 500):
+        roles = [dict(r) for r in server._TAXONOMY.roles]
+        for i in range(n - len(roles)):
+            roles.append({"title": f"Synthetic Role {i}", "keywords": rnd.sample(base, 6) + [f"skill{i}"]})
+        taxonomy = RoleTaxonomy(roles)
+        print(f"{len(taxonomy):<24}{timed(taxonomy.rank, resume, args.repeat):>12.3f}")
+
+    # Substring false positives the word-boundary matcher no longer reports
+    sample = "Built internal tooling; good at guiding teams; social skills"
+    print("\nfalse-hit check on:", repr(sample))
+    print("  legacy  :", [r["title"] for r in legacy_job_suggestions(sample)])
+    print("  matcher :", [r["title"] for r in server._heuristic_job_suggestions(sample)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+# Load test: every route in do_GET/do_POST plus the static assets, against the
+# local stub Groq server, at one or more concurrency levels.
+#
+#   python bench/load.py [--concurrency 1,8,32] [--duration 10] [--latency 0.3 --latency-dist lognormal]
+#                        [--error-rate 0.05] [--malformed 0.05] [--out results.json] [--compare old.json]
+#
+# server.py runs in this process on a free port (HTTP/1.1 keep-alive, one
+# connection per worker). To load a separately started server instead (e.g.
+# gunicorn, so the driver doesn't share its GIL), start it against the stub
+# this script runs and pass --target:
+#
+#   GROQ_API_KEY=stub GROQ_BASE_URL=http://127.0.0.1:9100 LLM_RATE_LIMITS= gunicorn server:app ...
+#   python bench/load.py --stub-port 9100 --target http://127.0.0.1:8000
+#
+# Every worker cycles through the routes; payloads differ per request (so AI
+# routes miss the response cache) unless --keys caps how many distinct ones
+# there are. A response counts as an error on a 4xx/5xx, a JSON body with an
+# "error" key, an SSE stream without its "done" event or an NDJSON batch
+# without its summary; a "warning" key (heuristic fallback) counts as degraded.
+# Results go to .cache/bench/load-<commit>.json (untracked) unless --out says otherwise;
+# --compare prints the change against an earlier run.
+import argparse
+import contextlib
+import gzip
+import http.client
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.bench_generation import ENDPOINTS, REPLIES  # noqa: E402
+from bench.stub_groq import add_fault_args, fault_options, serve  # noqa: E402
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_RESUME = "Analyst {i}. Skills: SQL, Python, Excel, Tableau. 3 years experience building dashboards and reports."
+
+
+def _batch(i):
+    return {"items": [{"id": str(n), "resume_text": _RESUME.format(i=f"{i}-{n}")} for n in range(3)],
+            "target_roles": ["Data Analyst", "QA Engineer"]}
+
+
+_PAYLOADS = {name: payload for name, _, payload in ENDPOINTS}
+# (name, method, path, payload for request i or None); the AI routes reuse bench_generation's payloads
+ROUTES = [
+    ("ping", "GET", "/api/ping", None),
+    ("live", "GET", "/api/live", None),
+    ("ready", "GET", "/api/ready", None),
+    ("stats", "GET", "/api/stats", None),
+    ("metrics", "GET", "/api/metrics", None),
+    ("page /", "GET", "/", None),
+    ("page /quiz", "GET", "/quiz", None),
+    ("asset shared.js", "GET", "/static/shared.js", None),
+    ("asset style.css", "GET", "/static/style.css", None),
+] + [(name, "POST", path, payload) for name, path, payload in ENDPOINTS] + [
+    ("recommend (stream)", "POST", "/api/recommend", lambda i: dict(_PAYLOADS["recommend"](i), stream=True)),
+    ("roadmap (stream)", "POST", "/api/roadmap", lambda i: dict(_PAYLOADS["roadmap"](i), stream=True)),
+    ("resume_score", "POST", "/api/resume/score", lambda i: {"resume_text": _RESUME.format(i=i), "target_role": "Data Analyst"}),
+    ("resume_batch", "POST", "/api/resume/batch", _batch),
+]
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def _outcome(status: int, ctype: str, body: bytes) -> str:
+    if status >= 400:
+        return "error"
+    if "event-stream" in ctype:
+        return "ok" if b"event: done" in body and b"event: error" not in body else "error"
+    if "ndjson" in ctype:
+        lines = body.strip().splitlines()
+        return "ok" if lines and b'"summary"' in lines[-1] else "error"
+    if "json" in ctype:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return "error"
+        if isinstance(data, dict) and data.get("error"):
+            return "error"
+        if isinstance(data, dict) and data.get("warning"):
+            return "degraded"
+    return "ok"
+
+
+class Worker(threading.Thread):
+    """One keep-alive connection issuing requests until the deadline."""
+
+    def __init__(self, host, port, routes, counter, keys, stop_at, results, lock):
+        super().__init__(daemon=True)
+        self.host, self.port = host, port
+        self.routes = routes
+        self.counter = counter
+        self.keys = keys
+        self.stop_at = stop_at
+        self.results = results  # name -> list of (seconds, outcome)
+        self.lock = lock
+        self.conn = None
+
+    def _request(self, method, path, payload):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json", "Accept-Encoding": "gzip"} if body is not None else {"Accept-Encoding": "gzip"}
+        self.conn.request(method, path, body=body, headers=headers)
+        resp = self.conn.getresponse()
+        data = resp.read()
+        if resp.will_close:
+            self.conn.close()
+            self.conn = None
+        if resp.getheader("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        return resp.status, resp.getheader("Content-Type") or "", data
+
+    def run(self):
+        while time.monotonic() < self.stop_at:
+            n = next(self.counter)
+            name, method, path, payload = self.routes[n % len(self.routes)]
+            i = n // len(self.routes)
+            if self.keys:
+                i %= self.keys
+            started = time.perf_counter()
+            try:
+                outcome = _outcome(*self._request(method, path, payload(i) if payload else None))
+            except (OSError, http.client.HTTPException):
+                outcome = "error"
+                if self.conn is not None:
+                    self.conn.close()
+                self.conn = None
+            with self.lock:
+                self.results.setdefault(name, []).append((time.perf_counter() - started, outcome))
+        if self.conn is not None:
+            self.conn.close()
+
+
+def _summary(samples, elapsed):
+    times = [s for s, _ in samples]
+    errors = sum(1 for _, o in samples if o == "error")
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "degraded": sum(1 for _, o in samples if o == "degraded"),
+        "p50_ms": round(_pct(times, 0.5) * 1000, 1),
+        "p95_ms": round(_pct(times, 0.95) * 1000, 1),
+        "p99_ms": round(_pct(times, 0.99) * 1000, 1),
+        "max_ms": round(max(times) * 1000, 1) if times else 0.0,
+    }
+
+
+def run_level(host, port, routes, concurrency, duration, keys):
+    results, lock = {}, threading.Lock()
+    counter = itertools.count()
+    started = time.monotonic()
+    workers = [Worker(host, port, routes, counter, keys, started + duration, results, lock) for _ in range(concurrency)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.monotonic() - started
+    return {
+        "seconds": round(elapsed, 2),
+        "total": _summary([s for samples in results.values() for s in samples], elapsed),
+        "endpoints": {name: _summary(results[name], elapsed) for name, _, _, _ in routes if name in results},
+    }
+
+
+def _commit():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=_ROOT, capture_output=True, text=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _print_level(concurrency, level):
+    print(f"\nconcurrency {concurrency}: {level['total']['requests']} requests in {level['seconds']}s")
+    print(f"{'endpoint':22}{'n':>7}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err %':>8}{'degr':>6}")
+    for name, row in list(level["endpoints"].items()) + [("TOTAL", level["total"])]:
+        print(f"{name:22}{row['requests']:>7}{row['rps']:>9}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}"
+              f"{row['error_rate'] * 100:>8.1f}{row['degraded']:>6}")
+
+
+def _print_compare(old, new):
+    # Relative change per endpoint for the concurrency levels both runs have
+    print(f"\nvs {old['meta']['commit']} ({old['meta']['timestamp']})")
+    print(f"{'level / endpoint':30}{'rps':>10}{'p95':>10}{'p99':>10}{'err % old->new':>18}")
+
+    def pct(a, b):
+        return f"{(b - a) / a * 100:+.0f}%" if a else "n/a"
+
+    for level, cur in new["levels"].items():
+        prev = old["levels"].get(level)
+        if prev is None:
+            continue
+        for name, row in list(cur["endpoints"].items()) + [("TOTAL", cur["total"])]:
+            before = prev["total"] if name == "TOTAL" else prev["endpoints"].get(name)
+            if before is None:
+                continue
+            print(f"{'c' + level + ' ' + name:30}{pct(before['rps'], row['rps']):>10}{pct(before['p95_ms'], row['p95_ms']):>10}"
+                  f"{pct(before['p99_ms'], row['p99_ms']):>10}{before['error_rate'] * 100:>9.1f}->{row['error_rate'] * 100:<7.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load test server.py against the stub Groq server")
+    ap.add_argument("--concurrency", default="1,8,32", help="comma-separated worker counts, one run each")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    ap.add_argument("--keys", type=int, default=0, help="distinct payloads per route (0 = every request differs)")
+    ap.add_argument("--routes", default=None, help="comma-separated route names to run (default: all)")
+    ap.add_argument("--target", default=None, help="URL of an already running server (default: start one in-process)")
+    ap.add_argument("--stub-port", type=int, default=0, help="port for the stub Groq server (0 = any free port)")
+    ap.add_argument("--latency", type=float, default=0.2, help="stub time to first token (seconds)")
+    ap.add_argument("--tps", type=float, default=1000.0, help="stub completion tokens per second")
+    add_fault_args(ap)
+    ap.add_argument("--out", default=None, help="results file (default: .cache/bench/load-<commit>.json)")
+    ap.add_argument("--compare", default=None, help="earlier results file to compare against")
+    args = ap.parse_args()
+
+    routes = ROUTES
+    if args.routes:
+        wanted = {r.strip() for r in args.routes.split(",")}
+        routes = [r for r in ROUTES if r[0] in wanted]
+        if not routes:
+            raise SystemExit("no routes match --routes; names: " + ", ".join(r[0] for r in ROUTES))
+    log = []
+    stub = serve("127.0.0.1", args.stub_port, args.latency, replies=REPLIES, tps=args.tps, log=log, **fault_options(args))
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    httpd = None
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.target:
+            url = urllib.parse.urlsplit(args.target)
+            host, port = url.hostname, url.port or 80
+        else:
+            os.environ.update({"GROQ_API_KEY": "stub", "GROQ_BASE_URL": f"http://127.0.0.1:{stub.server_address[1]}",
+                               "CACHE_DB": "", "MARKET_INDEX_PATH": "", "MARKET_INDEX_REFRESH": "0",
+                               "LLM_RATE_LIMITS": ""})  # the stub has no quota to protect
+            os.environ.setdefault("LOG_SAMPLE", "0")
+            os.chdir(_ROOT)  # static/ is resolved from the working directory
+            import server
+            from http.server import ThreadingHTTPServer
+
+            class Server(ThreadingHTTPServer):
+                request_queue_size = 128  # don't measure SYN-backlog retries at high concurrency
+
+            httpd = Server(("127.0.0.1", 0), server.CareerLensHandler)
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+            host, port = httpd.server_address[:2]
+
+        levels = {}
+        for concurrency in (int(c) for c in args.concurrency.split(",") if c.strip()):
+            if httpd is not None:
+                server._CACHE.clear()
+            start = len(log)
+            levels[str(concurrency)] = run_level(host, port, routes, concurrency, args.duration, args.keys)
+            calls = log[start:]
+            levels[str(concurrency)]["upstream"] = {
+                "calls": len(calls),
+                "faults": {k: sum(1 for c in calls if c.get("fault") == k) for k in {c["fault"] for c in calls if c.get("fault")}},
+            }
+    stub.shutdown()
+    if httpd is not None:
+        httpd.shutdown()
+
+    settings = {k: v for k, v in vars(args).items() if k not in ("out", "compare")}
+    results = {"meta": {"commit": _commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                        "platform": platform.platform(), "settings": settings}, "levels": levels}
+    for concurrency, level in levels.items():
+        _print_level(concurrency, level)
+    out = args.out or os.path.join(_ROOT, ".cache", "bench", f"load-{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            _print_compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+# Local stand-in for the Groq OpenAI-compatible API, for exercising server.py
+# without spending quota:
+#
+#   python bench/stub_groq.py --port 9100 --latency 1.5
+#   GROQ_BASE_URL=http://127.0.0.1:9100 GROQ_API_KEY=stub python server.py
+#
+# It honours max_tokens (truncates, finish_reason "length"), stop sequences,
+# JSON mode and stream=True, and with --tps the reply takes longer the more
+# tokens it carries, so generation settings show up in latency the way they do
+# upstream. Faults are opt-in: --latency-dist draws each request's latency from
+# a distribution, --error-rate answers with 429/5xx like an overloaded Groq, and
+# --malformed returns broken or off-schema JSON (in JSON mode, invalid JSON
+# becomes the 400 json_validate_failed Groq sends instead).
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+DEFAULT_REPLY = {"ok": True, "source": "stub"}
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text or "") // 4)
+
+
+# What a chatty model wraps around JSON when not in JSON mode
+_CHATTER_HEAD = "Here is the JSON you asked for:\n```json\n"
+_CHATTER_TAIL = "\n```\n\nLet me know if you would like me to adjust anything or add more detail to any section. " * 2
+
+
+# Ways a model reply goes wrong, applied to the canned reply text
+MALFORMED = {
+    "truncated": lambda c: c[:max(1, len(c) * 2 // 3)],
+    "trailing_comma": lambda c: c.rstrip()[:-1].rstrip() + ",\n}" if c.rstrip().endswith("}") else c + ",",
+    "not_json": lambda c: "I'm sorry, but I can't provide that information right now.",
+    "empty": lambda c: "",
+    "wrong_schema": lambda c: json.dumps({"result": "ok", "details": []}),
+}
+_INVALID_JSON = ("truncated", "trailing_comma", "not_json", "empty")
+
+_ERRORS = {
+    429: ("Rate limit reached for model. Please try again in 1s.", "tokens", "rate_limit_exceeded"),
+    500: ("Internal Server Error", "internal_server_error", "internal_server_error"),
+    502: ("Bad Gateway", "internal_server_error", "bad_gateway"),
+    503: ("Service Unavailable: the model is over capacity", "internal_server_error", "service_unavailable"),
+}
+
+
+class StubGroqHandler(BaseHTTPRequestHandler):
+    latency = 0.0  # time to first token (the mean/median of latency_dist)
+    latency_dist = "fixed"  # fixed | uniform | exp | lognormal
+    jitter = 0.5  # spread: +-fraction for uniform, sigma for lognormal
+    reply = json.dumps(DEFAULT_REPLY)
+    replies = {}  # substring of the prompt -> reply text, or callable(request body) -> reply text
+    tps = 0.0  # completion tokens per second; 0 = instant
+    chatter = False  # wrap replies in prose/fences unless JSON mode is on
+    runaway = 0.0  # fraction of replies that run on for about runaway_tokens more
+    runaway_tokens = 2000
+    error_rate = 0.0  # fraction of requests answered with one of error_codes
+    error_codes = (429, 503)
+    retry_after = 1.0  # seconds, sent with 429s
+    malformed = 0.0  # fraction of replies broken by one of malformed_kinds
+    malformed_kinds = tuple(MALFORMED)
+    stream_chunk = 16  # characters per streamed delta
+    models = ("llama-3.1-8b-instant", "llama-3.3-70b-versatile", "stub-model")  # listed by GET /models
+    log = None  # list of per-request records when set
+    _lock = threading.Lock()
+    _rng = random.Random(7)
+
+    def _reply_for(self, body: dict, prompt: str):
+        for marker, reply in self.replies.items():
+            if marker in prompt:
+                return marker, reply(body) if callable(reply) else reply
+        return None, self.reply
+
+    def _latency(self) -> float:
+        base = self.latency
+        if base <= 0 or self.latency_dist == "fixed":
+            return max(0.0, base)
+        with self._lock:
+            if self.latency_dist == "uniform":
+                return self._rng.uniform(base * (1 - self.jitter), base * (1 + self.jitter))
+            if self.latency_dist == "exp":
+                return self._rng.expovariate(1 / base)
+            if self.latency_dist == "lognormal":
+                # base is the median; sigma=jitter puts p99 at about base * e^(2.33 * sigma)
+                return base * math.exp(self._rng.gauss(0, self.jitter))
+        raise ValueError(f"unknown latency distribution {self.latency_dist!r}")
+
+    def _fault(self):
+        # None, ("error", status) or ("malformed", kind); one draw per request
+        with self._lock:
+            r = self._rng.random()
+            if r < self.error_rate:
+                return "error", self._rng.choice(self.error_codes)
+            if r < self.error_rate + self.malformed:
+                return "malformed", self._rng.choice(self.malformed_kinds)
+        return None
+
+    def _send_error(self, status: int, message: str, kind: str, code: str, **extra):
+        self.send_response(status)
+        out = json.dumps({"error": dict({"message": message, "type": kind, "code": code}, **extra)}).encode("utf-8")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        if status == 429:
+            self.send_header("retry-after", f"{self.retry_after:g}")
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _shape(self, body: dict, content: str):
+        # Apply what a real model would do with these generation settings
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        if self.chatter and not json_mode:
+            content = _CHATTER_HEAD + content + _CHATTER_TAIL
+        with self._lock:
+            rambles = self._rng.random() < self.runaway
+        if rambles:
+            # JSON mode can't add prose, but it can still pad with whitespace until max_tokens
+            if json_mode:
+                content += "\n    " * (self.runaway_tokens * 4 // 5)
+            else:
+                content += " More context on this answer follows." * (self.runaway_tokens // 8)
+        for stop in body.get("stop") or ():
+            if stop and stop in content:
+                content = content[:content.index(stop)]
+        finish = "stop"
+        max_tokens = body.get("max_tokens")
+        if max_tokens and _estimate_tokens(content) > max_tokens:
+            content = content[:max_tokens * 4]
+            finish = "length"
+        return content, finish
+
+    def _send(self, payload: dict, code: int = 200):
+        out = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send({"object": "list", "data": [{"id": m, "object": "model"} for m in self.models]})
+            return
+        self._send({"error": {"message": "Not found"}}, 404)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send({"error": {"message": "Not found"}}, 404)
+            return
+        length = int(self.headers.get("Content-Length", "0"))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        started = time.time()
+        prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+        marker, content = self._reply_for(body, prompt)
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        fault = self._fault()
+        latency = self._latency()
+        record = {"match": marker, "prompt_tokens": _estimate_tokens(prompt), "fault": fault and fault[1]}
+        if fault and (fault[0] == "error" or (json_mode and fault[1] in _INVALID_JSON)):
+            time.sleep(latency)
+            if fault[0] == "error":
+                self._send_error(fault[1], *_ERRORS.get(fault[1], _ERRORS[500]))
+            else:
+                self._send_error(400, "Failed to generate JSON. Please adjust your prompt. See 'failed_generation' for more details.",
+                                 "invalid_request_error", "json_validate_failed",
+                                 failed_generation=MALFORMED[fault[1]](content))
+            self._log(record, completion_tokens=0, finish_reason="error", seconds=time.time() - started)
+            return
+        if fault:
+            content = MALFORMED[fault[1]](content)
+        content, finish = self._shape(body, content)
+        generation = _estimate_tokens(content) / self.tps if self.tps else 0.0
+        usage = {
+            "prompt_tokens": _estimate_tokens(prompt),
+            "completion_tokens": _estimate_tokens(content),
+            "total_tokens": _estimate_tokens(prompt) + _estimate_tokens(content),
+        }
+        reply = {
+            "id": "chatcmpl-" + uuid.uuid4().hex[:12],
+            "created": int(time.time()),
+            "model": body.get("model", "stub-model"),
+        }
+        if body.get("stream"):
+            self._stream(reply, content, finish, usage, latency, generation)
+        else:
+            if latency + generation:
+                time.sleep(latency + generation)
+            self._send(dict(reply, object="chat.completion", usage=usage,
+                            choices=[{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": finish}]))
+        self._log(record, completion_tokens=usage["completion_tokens"], finish_reason=finish, seconds=time.time() - started)
+
+    def _stream(self, reply: dict, content: str, finish: str, usage: dict, latency: float, generation: float):
+        # SSE chunks like Groq's: deltas, then an empty delta with finish_reason and x_groq.usage
+        parts = [content[i:i + self.stream_chunk] for i in range(0, len(content), self.stream_chunk)] or [""]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        time.sleep(latency)
+        try:
+            for part in parts:
+                if generation:
+                    time.sleep(generation / len(parts))
+                chunk = dict(reply, object="chat.completion.chunk",
+                             choices=[{"index": 0, "delta": {"content": part}, "finish_reason": None}])
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            last = dict(reply, object="chat.completion.chunk", x_groq={"usage": usage},
+                        choices=[{"index": 0, "delta": {}, "finish_reason": finish}])
+            self.wfile.write(f"data: {json.dumps(last)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the server cancelled the stream
+
+    def _log(self, record: dict, **fields):
+        if self.log is not None:
+            with self._lock:
+                self.log.append(dict(record, **fields))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str = "127.0.0.1", port: int = 9100, latency: float = 0.0, reply: str = None, **options):
+    # options: any StubGroqHandler attribute (replies, tps, chatter, runaway, latency_dist, jitter,
+    # error_rate, error_codes, retry_after, malformed, malformed_kinds, log)
+    attrs = {"latency": latency, "reply": reply or StubGroqHandler.reply, **options}
+    unknown = [k for k in attrs if not hasattr(StubGroqHandler, k)]
+    if unknown:
+        raise TypeError(f"unknown stub options: {', '.join(unknown)}")
+    handler = type("Handler", (StubGroqHandler,), attrs)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def add_fault_args(ap):
+    # Latency/error/malformed options, shared with bench/load.py
+    ap.add_argument("--latency-dist", default="fixed", choices=("fixed", "uniform", "exp", "lognormal"),
+                    help="distribution of per-request latency around --latency")
+    ap.add_argument("--jitter", type=float, default=0.5, help="spread for uniform (+-fraction) and lognormal (sigma)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error status")
+    ap.add_argument("--error-codes", default="429,503", help="statuses to pick from, e.g. 429,500,503")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    ap.add_argument("--malformed", type=float, default=0.0, help="fraction of replies with broken or off-schema JSON")
+    ap.add_argument("--malformed-kinds", default=",".join(MALFORMED), help="comma-separated subset of: " + ", ".join(MALFORMED))
+    ap.add_argument("--replies", default=None, help="JSON file mapping a prompt substring to the reply text to send")
+
+
+def fault_options(args) -> dict:
+    kinds = tuple(k.strip() for k in args.malformed_kinds.split(",") if k.strip())
+    bad = [k for k in kinds if k not in MALFORMED]
+    if bad:
+        raise SystemExit(f"unknown --malformed-kinds: {', '.join(bad)}")
+    options = {"latency_dist": args.latency_dist, "jitter": args.jitter, "error_rate": args.error_rate,
+               "error_codes": tuple(int(c) for c in args.error_codes.split(",") if c.strip()),
+               "retry_after": args.retry_after, "malformed": args.malformed, "malformed_kinds": kinds}
+    if args.replies:
+        with open(args.replies, encoding="utf-8") as f:
+            options["replies"] = {k: v if isinstance(v, str) else json.dumps(v) for k, v in json.load(f).items()}
+    return options
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Stub Groq-compatible server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9100)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds to sleep before each completion")
+    ap.add_argument("--reply", default=None, help="completion content to return (default: a small JSON object)")
+    ap.add_argument("--tps", type=float, default=0.0, help="completion tokens per second (0 = no per-token delay)")
+    ap.add_argument("--chatter", action="store_true", help="wrap replies in prose and fences unless JSON mode is on")
+    ap.add_argument("--runaway", type=float, default=0.0, help="fraction of replies that run on past the JSON")
+    add_fault_args(ap)
+    args = ap.parse_args()
+    httpd = serve(args.host, args.port, args.latency, args.reply, tps=args.tps, chatter=args.chatter, runaway=args.runaway,
+                  **fault_options(args))
+    print(f"Stub Groq server on http://{args.host}:{args.port} (latency {args.latency}s, {args.latency_dist})")
+    httpd.serve_forever()
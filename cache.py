@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def approx_size(value) -> int:
+    # Serialized size is a good proxy for what a cached JSON payload costs us
+    try:
+        return len(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL and entry/byte budgets.
+
+    get/set are O(1): entries live in an OrderedDict kept in recency order, so
+    eviction always pops the least recently used entry from the front.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024, default_ttl: float = 900):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            exp, size, value = entry
+            if exp < now:
+                del self._data[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        # get() without counting a hit/miss or refreshing recency
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None or entry[0] < time.time():
+            return default
+        return entry[2]
+
+    def set(self, key, value, ttl: float = None, size: int = None):
+        if size is None:
+            size = approx_size(value)
+        if size > self.max_bytes:
+            # would evict everything else and still not fit
+            return False
+        exp = time.time() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (exp, size, value)
+            self.bytes += size
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                _, (old_exp, old_size, _) = self._data.popitem(last=False)
+                self.bytes -= old_size
+                if old_exp < time.time():
+                    self.expirations += 1
+                else:
+                    self.evictions += 1
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class DiskCache:
+    """SQLite-backed TTL cache shared by every worker process on the host.
+
+    WAL mode lets readers in other processes proceed while one process writes;
+    each thread (and each forked process) opens its own connection. Errors are
+    counted and treated as misses so a bad disk never fails a request.
+    """
+
+    def __init__(self, path: str, compact_interval: float = 600):
+        self.path = path
+        self.compact_interval = compact_interval
+        self._local = threading.local()
+        self._last_compact = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self.compactions = 0
+        self._schema_ready = False
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+    def _conn(self):
+        # The file and table are created on first use, so constructing one (at import) touches no database
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            # auto_vacuum only sticks on a brand-new file, so it must precede the WAL switch
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._schema_ready:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    " key TEXT PRIMARY KEY,"
+                    " value TEXT NOT NULL,"
+                    " expires_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries(expires_at)")
+                self._schema_ready = True
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_entry(self, key):
+        # Returns (value, expires_at) or None
+        try:
+            row = self._conn().execute(
+                "SELECT value, expires_at FROM entries WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        try:
+            value = json.loads(row[0])
+        except ValueError:
+            self.errors += 1
+            return None
+        self.hits += 1
+        return value, row[1]
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, ttl: float = 900):
+        try:
+            payload = json.dumps(value, separators=(",", ":"))
+            self._conn().execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, payload, time.time() + ttl),
+            )
+            self.writes += 1
+        except (sqlite3.Error, TypeError, ValueError):
+            self.errors += 1
+            return False
+        if time.time() - self._last_compact > self.compact_interval:
+            self.compact()
+        return True
+
+    def delete(self, key):
+        try:
+            self._conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+        except sqlite3.Error:
+            self.errors += 1
+
+    def compact(self):
+        # Drop expired rows, hand freed pages back to the filesystem and fold the WAL in
+        self._last_compact = time.time()
+        try:
+            conn = self._conn()
+            removed = conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),)).rowcount
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            self.compactions += 1
+            return removed
+        except sqlite3.Error:
+            self.errors += 1
+            return 0
+
+    def stats(self) -> dict:
+        try:
+            entries = self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "errors": self.errors,
+            "compactions": self.compactions,
+        }
@@ -0,0 +1,139 @@
+import collections
+import os
+import threading
+import time
+from metrics import log_event
+
+
+# Readiness comes from a background probe instead of a completion per health check
+HEALTH_PROBE_INTERVAL = float(os.environ.get("HEALTH_PROBE_INTERVAL", "30"))
+HEALTH_PROBE_TIMEOUT = float(os.environ.get("HEALTH_PROBE_TIMEOUT", "5"))
+# A provider whose last good probe is older than this counts as down
+HEALTH_STALE_AFTER = float(os.environ.get("HEALTH_STALE_AFTER", str(3 * HEALTH_PROBE_INTERVAL)))
+_LATENCY_WINDOW = 20
+
+
+def _listed(model: str, available: set) -> bool:
+    # Ollama lists "llama3.1:latest" for a model pulled as "llama3.1"
+    return model in available or (":" not in model and model + ":latest" in available)
+
+
+class _Provider:
+    __slots__ = ("ok", "error", "checked_at", "last_success", "latencies", "probes", "failures")
+
+    def __init__(self):
+        self.ok = False
+        self.error = "not checked yet"
+        self.checked_at = None
+        self.last_success = None
+        self.latencies = collections.deque(maxlen=_LATENCY_WINDOW)
+        self.probes = 0
+        self.failures = 0
+
+
+class HealthProber:
+    """Keeps a cached up/down status per upstream provider.
+
+    A daemon thread lists each provider's models every `interval` seconds (the
+    cheapest authenticated call: no tokens, no quota) and checks the models the
+    routes use are there. Readiness is read from that cache, so health checks
+    cost nothing upstream and don't fail just because a completion is slow.
+    Ready means at least one routed provider answered within `stale_after`.
+    """
+
+    def __init__(self, clients: dict, models: dict, interval: float = HEALTH_PROBE_INTERVAL,
+                 timeout: float = HEALTH_PROBE_TIMEOUT, stale_after: float = HEALTH_STALE_AFTER):
+        self.clients = clients  # provider -> LLMClient
+        self.models = models  # provider -> model names the routes send to it
+        self.interval = max(1.0, interval)
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.started_at = time.time()
+        self._providers = {name: _Provider() for name in models}
+        self._lock = threading.Lock()
+        self._checked = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Idempotent and cheap after the first call; the server calls it on every request
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="health-probe", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            self.probe_all()
+            time.sleep(self.interval)
+
+    def probe_all(self):
+        for name in self._providers:
+            self.probe(name)
+        self._checked.set()
+
+    def probe(self, name: str):
+        started = time.monotonic()
+        error = None
+        try:
+            available = set(self.clients[name].list_models(self.timeout))
+            missing = [m for m in self.models[name] if available and not _listed(m, available)]
+            if missing:
+                error = f"model not available: {', '.join(missing)}"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        elapsed = time.monotonic() - started
+        with self._lock:
+            p = self._providers[name]
+            changed = p.checked_at is None or p.ok != (error is None)
+            p.probes += 1
+            p.checked_at = time.time()
+            p.ok = error is None
+            p.error = error
+            if error is None:
+                p.last_success = p.checked_at
+                p.latencies.append(elapsed)
+            else:
+                p.failures += 1
+        if changed:
+            log_event("upstream_health", level="info" if error is None else "warn", provider=name,
+                      ok=error is None, error=error, ms=round(elapsed * 1000, 1))
+
+    def wait_first(self, timeout: float) -> bool:
+        # Lets the first few requests after startup see a real answer instead of "not checked yet"
+        return self._checked.wait(timeout)
+
+    def _provider_status(self, p: _Provider, now: float) -> dict:
+        age = now - p.last_success if p.last_success is not None else None
+        latencies = sorted(p.latencies)
+        out = {
+            "ok": p.ok and age is not None and age <= self.stale_after,
+            "error": p.error,
+            "last_success_age": round(age, 1) if age is not None else None,
+            "last_check_age": round(now - p.checked_at, 1) if p.checked_at is not None else None,
+            "latency_ms": {
+                "last": round(p.latencies[-1] * 1000, 1),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1),
+            } if latencies else None,
+            "probes": p.probes,
+            "failures": p.failures,
+        }
+        if out["ok"] is False and p.ok:
+            out["error"] = f"last successful probe was {age:.0f}s ago"
+        return out
+
+    def status(self) -> dict:
+        now = time.time()
+        with self._lock:
+            providers = {name: self._provider_status(p, now) for name, p in self._providers.items()}
+        ready = any(p["ok"] for p in providers.values())
+        out = {"ready": ready, "providers": providers, "probe_interval": self.interval}
+        if not ready:
+            out["error"] = "; ".join(f"{name}: {p['error']}" for name, p in providers.items() if p["error"]) or "no upstream checked yet"
+        return out
+
+    def uptime(self) -> float:
+        return time.time() - self.started_at
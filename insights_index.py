@@ -0,0 +1,241 @@
+# Precomputed market-insights index for common role x region pairs.
+#
+# Build (or top up) the index offline, e.g. against the stub server:
+#   GROQ_BASE_URL=http://127.0.0.1:9100 GROQ_API_KEY=stub \
+#       python insights_index.py build --roles "Data Analyst,QA Engineer" --regions "global,India"
+#
+# server.py loads the index on its first request and serves hits as O(1) dict
+# lookups; a background refresher regenerates entries shortly before they expire.
+import argparse
+import concurrent.futures
+import json
+import os
+import threading
+import time
+from model_json import validate
+from prompts import PROMPTS
+
+try:
+    import fcntl
+except ImportError:  # Windows: refresher runs in every process
+    fcntl = None
+
+
+DEFAULT_REGIONS = ["global"]
+
+MARKET_INDEX_PATH = os.environ.get("MARKET_INDEX_PATH", os.path.join(".cache", "market_index.json"))
+MARKET_INDEX_TTL = float(os.environ.get("MARKET_INDEX_TTL", str(24 * 3600)))
+# Regenerate entries this many seconds before they expire
+MARKET_INDEX_REFRESH_MARGIN = float(os.environ.get("MARKET_INDEX_REFRESH_MARGIN", "3600"))
+MARKET_INDEX_REFRESH_INTERVAL = float(os.environ.get("MARKET_INDEX_REFRESH_INTERVAL", "300"))
+
+
+def _split_env(name: str, default):
+    raw = os.environ.get(name, "")
+    items = [x.strip() for x in raw.split(",") if x.strip()]
+    return items or list(default)
+
+
+class MarketIndex:
+    """role x region -> market payload, persisted as one JSON file.
+
+    Entries are keyed with the caller's key function (the same cache key
+    handle_market computes), so lookups are a single dict access. Stale entries
+    keep being served until the refresher replaces them.
+    """
+
+    def __init__(self, path: str, key_fn, ttl: float = MARKET_INDEX_TTL):
+        self.path = path
+        self.key_fn = key_fn
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._refresher = None
+        self.hits = 0
+        self.refreshed = 0
+        self.refresh_errors = 0
+        self.load()
+
+    def load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return False
+        entries = {}
+        for e in raw.get("entries", []):
+            if isinstance(e, dict) and e.get("role") and isinstance(e.get("data"), dict):
+                # re-key on load so key normalization changes never orphan entries
+                entries[self.key_fn(e["role"], e.get("region") or "global")] = e
+        with self._lock:
+            self._entries = entries
+            self._mtime = mtime
+        return True
+
+    def save(self):
+        with self._lock:
+            payload = {"version": 1, "saved_at": time.time(), "entries": list(self._entries.values())}
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry["data"]
+
+    def put(self, role: str, region: str, data: dict):
+        now = time.time()
+        entry = {"role": role, "region": region, "data": data, "generated_at": now, "expires_at": now + self.ttl}
+        with self._lock:
+            self._entries[self.key_fn(role, region)] = entry
+
+    def __len__(self):
+        return len(self._entries)
+
+    def due(self, margin: float = MARKET_INDEX_REFRESH_MARGIN):
+        horizon = time.time() + margin
+        with self._lock:
+            return [(e["role"], e["region"]) for e in self._entries.values() if e.get("expires_at", 0) <= horizon]
+
+    def build(self, generate, roles, regions, concurrency: int = 4, on_result=None):
+        # generate(role, region) -> dict; failures are skipped so one bad role doesn't sink the batch
+        pairs = [(r, g) for r in roles for g in regions]
+        done = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = {pool.submit(generate, role, region): (role, region) for role, region in pairs}
+            for fut in concurrent.futures.as_completed(futures):
+                role, region = futures[fut]
+                try:
+                    data = fut.result()
+                    # a reply that still misses the schema after its repair turn isn't indexed
+                    ok = isinstance(data, dict) and not data.get("error") and not validate(data, PROMPTS["market"].schema)
+                except Exception as e:
+                    data, ok = {"error": str(e)}, False
+                if ok:
+                    self.put(role, region, data)
+                    done += 1
+                if on_result is not None:
+                    on_result(role, region, ok, data)
+        if done:
+            self.save()
+        return done
+
+    def refresh_due(self, generate, margin: float = MARKET_INDEX_REFRESH_MARGIN, concurrency: int = 2):
+        due = self.due(margin)
+        if not due:
+            return 0
+
+        def on_result(role, region, ok, data):
+            if not ok:
+                self.refresh_errors += 1
+        count = 0
+        for role, region in due:
+            count += self.build(generate, [role], [region], concurrency, on_result)
+        self.refreshed += count
+        return count
+
+    def _refresh_loop(self, generate, interval: float, margin: float):
+        lock_file = None
+        while True:
+            time.sleep(interval)
+            try:
+                if fcntl is not None:
+                    # one refresher per host; other workers just pick up the rewritten file
+                    if lock_file is None:
+                        lock_file = open(self.path + ".lock", "a")
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        if os.path.exists(self.path) and os.path.getmtime(self.path) != self._mtime:
+                            self.load()
+                        continue
+                try:
+                    if os.path.exists(self.path) and os.path.getmtime(self.path) != self._mtime:
+                        self.load()
+                    self.refresh_due(generate, margin)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+            except Exception as e:
+                self.refresh_errors += 1
+                print(f"[WARN] Market index refresh failed: {e}")
+
+    def start_refresher(self, generate, interval: float = MARKET_INDEX_REFRESH_INTERVAL, margin: float = MARKET_INDEX_REFRESH_MARGIN):
+        if self._refresher is not None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._refresher = threading.Thread(target=self._refresh_loop, args=(generate, interval, margin), name="market-index-refresh", daemon=True)
+        self._refresher.start()
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            stale = sum(1 for e in self._entries.values() if e.get("expires_at", 0) <= now)
+        return {
+            "path": self.path,
+            "entries": len(self._entries),
+            "stale": stale,
+            "hits": self.hits,
+            "refreshed": self.refreshed,
+            "refresh_errors": self.refresh_errors,
+        }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Precompute the CareerLens market-insights index")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="generate payloads for a role x region matrix")
+    b.add_argument("--roles", default=None, help="comma-separated roles (default: MARKET_INDEX_ROLES or every role in the taxonomy)")
+    b.add_argument("--regions", default=None, help="comma-separated regions (default: MARKET_INDEX_REGIONS or 'global')")
+    b.add_argument("--concurrency", type=int, default=4)
+    b.add_argument("--missing-only", action="store_true", help="skip pairs already in the index")
+    b.add_argument("--path", default=MARKET_INDEX_PATH)
+    r = sub.add_parser("refresh", help="regenerate entries that are expired or about to expire")
+    r.add_argument("--margin", type=float, default=MARKET_INDEX_REFRESH_MARGIN)
+    r.add_argument("--path", default=MARKET_INDEX_PATH)
+    sub.add_parser("stats", help="print index statistics").add_argument("--path", default=MARKET_INDEX_PATH)
+    args = ap.parse_args(argv)
+
+    # Imported lazily: server pulls in the Groq client and needs GROQ_API_KEY.
+    # Its own refresher only starts on a first request, so it stays off here.
+    import server
+
+    index = MarketIndex(args.path, server._market_key)
+    if args.cmd == "stats":
+        print(json.dumps(index.stats(), indent=2))
+        return 0
+    if args.cmd == "refresh":
+        print(f"refreshed {index.refresh_due(server.generate_market, args.margin)} entries")
+        return 0
+
+    roles = [x.strip() for x in args.roles.split(",") if x.strip()] if args.roles else _split_env("MARKET_INDEX_ROLES", server._TAXONOMY.titles)
+    regions = [x.strip() for x in args.regions.split(",") if x.strip()] if args.regions else _split_env("MARKET_INDEX_REGIONS", DEFAULT_REGIONS)
+    if args.missing_only:
+        roles_regions = [(ro, rg) for ro in roles for rg in regions if server._market_key(ro, rg) not in index._entries]
+    else:
+        roles_regions = [(ro, rg) for ro in roles for rg in regions]
+    started = time.time()
+
+    def report(role, region, ok, data):
+        status = "ok" if ok else "FAILED: " + str((data or {}).get("error", "invalid payload"))[:120]
+        print(f"  {role} / {region}: {status}", flush=True)
+
+    by_region = {}
+    for ro, rg in roles_regions:
+        by_region.setdefault(rg, []).append(ro)
+    done = sum(index.build(server.generate_market, ros, [rg], args.concurrency, report) for rg, ros in by_region.items())
+    print(f"indexed {done}/{len(roles_regions)} pairs in {time.time() - started:.1f}s -> {args.path}")
+    return 0 if done == len(roles_regions) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,334 @@
+import asyncio
+import json
+import os
+import queue
+import select
+import socket
+import threading
+import time
+import concurrent.futures
+from types import SimpleNamespace
+from groq import AsyncGroq
+
+
+# Global cap on concurrent upstream calls; callers beyond it wait in a queue
+LLM_MAX_INFLIGHT = int(os.environ.get("LLM_MAX_INFLIGHT", "8"))
+# Maximum number of callers allowed to wait for a slot before we reject outright
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", "256"))
+LLM_DEFAULT_DEADLINE = float(os.environ.get("LLM_DEADLINE", "45"))
+
+# Per-endpoint deadlines (seconds), covering queue wait + upstream time.
+# Override individually, e.g. LLM_DEADLINE_RECOMMEND=120
+_DEADLINES = {
+    "ping": 5,
+    "adaptive_quiz_start": 20,
+    "adaptive_quiz_next": 20,
+    "quiz": 30,
+    "market": 40,
+    "compare": 40,
+    "resume": 60,
+    "roadmap": 60,
+    "recommend": 90,
+}
+
+
+def deadline_for(endpoint: str) -> float:
+    env = os.environ.get("LLM_DEADLINE_" + endpoint.upper())
+    if env:
+        try:
+            return float(env)
+        except ValueError:
+            pass
+    return float(_DEADLINES.get(endpoint, LLM_DEFAULT_DEADLINE))
+
+
+class LLMBusyError(RuntimeError):
+    pass
+
+
+class LLMTimeoutError(RuntimeError):
+    pass
+
+
+class LLMCancelledError(RuntimeError):
+    pass
+
+
+class UpstreamStatusError(RuntimeError):
+    # Non-2xx reply from an OpenAI-compatible server; carries status_code/response like the SDK's errors
+    def __init__(self, message: str, status_code: int, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+def socket_closed(sock) -> bool:
+    # True when the peer has hung up (readable with nothing left to read)
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except (OSError, ValueError):
+        return True
+
+
+def _namespace(value):
+    # JSON -> attribute access, so replies read like the SDK's response objects
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_namespace(v) for v in value]
+    return value
+
+
+class OpenAICompatClient:
+    """Minimal async client for OpenAI-compatible chat servers (Ollama's /v1, llama.cpp, vLLM).
+
+    Covers the slice of AsyncGroq that LLMClient uses: chat.completions.create()
+    returns an object with choices[0].message.content, or with stream=True an
+    async iterator of chunks carrying choices[0].delta.content.
+    """
+
+    def __init__(self, base_url: str, api_key: str = None):
+        import httpx  # ships with the groq SDK
+        self._transport_error = httpx.TransportError
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._http = httpx.AsyncClient(base_url=base_url.rstrip("/"), headers=headers)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.models = SimpleNamespace(list=self._list_models)
+
+    @staticmethod
+    def _check(resp, text: str):
+        if resp.status_code >= 400:
+            raise UpstreamStatusError(f"Error code: {resp.status_code} - {text[:500]}", resp.status_code, resp)
+
+    async def _create(self, messages, model: str, timeout: float = None, stream: bool = False, **kwargs):
+        payload = dict(kwargs, messages=messages, model=model, stream=stream)
+        if stream:
+            return self._stream(payload, timeout)
+        try:
+            resp = await self._http.post("/chat/completions", json=payload, timeout=timeout)
+        except self._transport_error as e:
+            raise ConnectionError(f"Connection to {self._http.base_url} failed: {e}") from e
+        self._check(resp, resp.text)
+        return _namespace(resp.json())
+
+    async def _list_models(self, timeout: float = None):
+        try:
+            resp = await self._http.get("/models", timeout=timeout)
+        except self._transport_error as e:
+            raise ConnectionError(f"Connection to {self._http.base_url} failed: {e}") from e
+        self._check(resp, resp.text)
+        return _namespace(resp.json())
+
+    async def _stream(self, payload: dict, timeout: float):
+        try:
+            async with self._http.stream("POST", "/chat/completions", json=payload, timeout=timeout) as resp:
+                if resp.status_code >= 400:
+                    self._check(resp, (await resp.aread()).decode("utf-8", "replace"))
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    yield _namespace(json.loads(data))
+        except self._transport_error as e:
+            raise ConnectionError(f"Connection to {self._http.base_url} failed: {e}") from e
+
+
+class LLMClient:
+    """Blocking facade over an async chat client running on a private event loop.
+
+    Request threads submit coroutines to the loop and wait on the result, so the
+    number of open upstream calls is bounded by the semaphore rather than by the
+    number of worker threads. provider="groq" uses AsyncGroq; "openai" speaks the
+    plain OpenAI-compatible API (e.g. a local Ollama server).
+    """
+
+    def __init__(self, api_key: str, base_url: str = None, max_inflight: int = LLM_MAX_INFLIGHT, max_queue: int = LLM_MAX_QUEUE,
+                 provider: str = "groq"):
+        self.api_key = api_key
+        self.base_url = base_url or None
+        self.provider = provider
+        self.max_inflight = max(1, max_inflight)
+        self.max_queue = max(0, max_queue)
+        self._loop = None
+        self._client = None
+        self._sem = None
+        self._start_lock = threading.Lock()
+        self.inflight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def _ensure_loop(self):
+        # Started lazily so each gunicorn worker process gets its own loop thread
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    self._sem = asyncio.Semaphore(self.max_inflight)
+                    self._client = self._new_client()
+                    ready.set()
+                    loop.run_forever()
+
+                threading.Thread(target=run, name="llm-loop", daemon=True).start()
+                ready.wait()
+                self._loop = loop
+        return self._loop
+
+    def _new_client(self):
+        if self.provider == "openai":
+            return OpenAICompatClient(self.base_url, self.api_key)
+        # retries happen in routing.py, where the breaker and rate limiter see every attempt
+        return AsyncGroq(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+
+    async def _acquire(self, timeout: float):
+        if self.waiting >= self.max_queue and self._sem.locked():
+            self.rejected += 1
+            raise LLMBusyError("Upstream queue is full, try again shortly")
+        self.waiting += 1
+        # Shielded so giving up can't race a permit that was just handed over: if the
+        # acquire completes anyway after a timeout or cancel, the permit goes straight back
+        acquire = asyncio.ensure_future(self._sem.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(acquire), timeout=max(0.0, timeout))
+        except BaseException:
+            acquire.add_done_callback(self._release_abandoned)
+            acquire.cancel()
+            raise
+        finally:
+            self.waiting -= 1
+
+    def _release_abandoned(self, acquire):
+        if not acquire.cancelled() and acquire.exception() is None:
+            self._sem.release()
+
+    async def _run(self, make_call, deadline: float):
+        await self._acquire(deadline - time.monotonic())
+        self.inflight += 1
+        try:
+            remaining = max(0.01, deadline - time.monotonic())
+            return await asyncio.wait_for(make_call(self._client, remaining), timeout=remaining)
+        finally:
+            self.inflight -= 1
+            self._sem.release()
+
+    def submit(self, make_call, endpoint: str = "default", deadline: float = None):
+        # make_call(client, remaining_seconds) -> awaitable; returns a concurrent Future
+        loop = self._ensure_loop()
+        if deadline is None:
+            deadline = time.monotonic() + deadline_for(endpoint)
+        return asyncio.run_coroutine_threadsafe(self._run(make_call, deadline), loop), deadline
+
+    def _timed_out(self, fut, endpoint: str):
+        fut.cancel()
+        self.timeouts += 1
+        return LLMTimeoutError(f"Upstream call for '{endpoint}' exceeded its {deadline_for(endpoint):g}s deadline")
+
+    def _result(self, fut, endpoint: str):
+        try:
+            return fut.result()
+        except (asyncio.TimeoutError, concurrent.futures.CancelledError):
+            raise self._timed_out(fut, endpoint)
+
+    def _check_client(self, fut, client_gone):
+        if client_gone is not None and client_gone():
+            fut.cancel()
+            self.cancelled += 1
+            raise LLMCancelledError("Client disconnected")
+
+    def wait(self, fut, deadline: float, client_gone=None, endpoint: str = "default"):
+        # Poll so we can notice a disconnected client and cancel the upstream call
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise self._timed_out(fut, endpoint)
+            done, _ = concurrent.futures.wait([fut], timeout=min(0.25, remaining))
+            if done:
+                return self._result(fut, endpoint)
+            self._check_client(fut, client_gone)
+
+    def submit_chat(self, messages, model: str, endpoint: str = "default", deadline: float = None, **kwargs):
+        async def make_call(client, remaining):
+            return await client.chat.completions.create(messages=messages, model=model, timeout=remaining, **kwargs)
+        return self.submit(make_call, endpoint, deadline)
+
+    def chat(self, messages, model: str, endpoint: str = "default", client_gone=None, deadline: float = None, **kwargs):
+        fut, deadline = self.submit_chat(messages, model, endpoint, deadline, **kwargs)
+        return self.wait(fut, deadline, client_gone, endpoint)
+
+    def list_models(self, timeout: float) -> list:
+        # Health probe: model ids from GET /models. Skips the slot semaphore so a
+        # saturated client still answers, and spends no tokens or request quota.
+        loop = self._ensure_loop()
+
+        async def call():
+            return await asyncio.wait_for(self._client.models.list(), timeout=timeout)
+
+        fut = asyncio.run_coroutine_threadsafe(call(), loop)
+        try:
+            page = fut.result(timeout + 1)
+        except (asyncio.TimeoutError, concurrent.futures.TimeoutError):
+            fut.cancel()
+            raise LLMTimeoutError(f"Model list took longer than {timeout:g}s")
+        return [m.id for m in getattr(page, "data", None) or []]
+
+    def stream_chat(self, messages, model: str, endpoint: str = "default", client_gone=None, deadline: float = None,
+                    on_usage=None, **kwargs):
+        # Generator of content deltas; the upstream slot is held until the stream ends or is abandoned.
+        # on_usage gets the token usage if the provider reports it (Groq on x_groq, OpenAI-style on the last chunk)
+        chunks = queue.Queue()
+        finished = object()
+
+        async def make_call(client, remaining):
+            stream = await client.chat.completions.create(messages=messages, model=model, stream=True, timeout=remaining, **kwargs)
+            async for chunk in stream:
+                # the closing chunk of OpenAI-style streams carries an empty delta
+                delta = getattr(chunk.choices[0].delta, "content", None) if chunk.choices else None
+                if delta:
+                    chunks.put(delta)
+                usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                if usage is not None and on_usage is not None:
+                    on_usage(usage)
+
+        fut, deadline = self.submit(make_call, endpoint, deadline)
+        fut.add_done_callback(lambda _: chunks.put(finished))
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._timed_out(fut, endpoint)
+                try:
+                    item = chunks.get(timeout=min(0.25, remaining))
+                except queue.Empty:
+                    self._check_client(fut, client_gone)
+                    continue
+                if item is finished:
+                    self._result(fut, endpoint)
+                    return
+                yield item
+        finally:
+            if not fut.done():
+                fut.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.provider,
+            "max_inflight": self.max_inflight,
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+        }
@@ -0,0 +1,193 @@
+import json
+import re
+from collections import Counter
+
+
+# Text is split into lowercase alphanumeric tokens ("c++"/"c#" keep their
+# suffix), so "ui" no longer fires inside "build" and "ml" not inside "html".
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+
+class KeywordMatcher:
+    """Keyword vocabulary prepared once, matched with a single pass over the text.
+
+    present() tokenizes the text once and intersects the token set with the
+    vocabulary, so the cost no longer grows with the number of keywords.
+    Keywords that span several tokens ("power bi", "ci/cd", ".net") are only
+    checked with their own pattern when every token they need is present.
+    """
+
+    def __init__(self, keywords):
+        vocab = {str(k).strip().lower() for k in keywords if str(k).strip()}
+        self.keywords = sorted(vocab)
+        self._simple = {}  # token -> keyword (plural "s" folded in)
+        self._compound = []  # (keyword, required tokens, pattern, needs left boundary)
+        for k in self.keywords:
+            if _TOKEN_RE.fullmatch(k):
+                self._simple[k] = k
+                self._simple.setdefault(k + "s", k)
+                continue
+            parts = _TOKEN_RE.findall(k)
+            # literal punctuation, any run of whitespace between words
+            body = r"\s+".join(re.escape(w) for w in k.split())
+            # Left boundary is checked by hand: a leading lookbehind would stop re
+            # from using its fast literal-prefix search. A leading "." is its own
+            # boundary, so "asp.net" still counts for ".net".
+            self._compound.append((k, frozenset(parts), re.compile(body + r"s?(?![a-z0-9])"), k[0].isalnum()))
+
+    def counts(self, text) -> Counter:
+        # keyword -> number of occurrences; used where term frequency matters (BM25)
+        low = str(text or "").lower()
+        tokens = Counter(_TOKEN_RE.findall(low))
+        out = Counter()
+        for t in tokens.keys() & self._simple.keys():
+            out[self._simple[t]] += tokens[t]
+        for k, parts, pattern, bounded in self._compound:
+            if parts <= tokens.keys():
+                n = sum(1 for m in pattern.finditer(low) if not bounded or m.start() == 0 or not low[m.start() - 1].isalnum())
+                if n:
+                    out[k] = n
+        return out
+
+    def present(self, text) -> set:
+        low = str(text or "").lower()
+        tokens = set(_TOKEN_RE.findall(low))
+        found = {self._simple[t] for t in tokens.intersection(self._simple)}
+        for k, parts, pattern, bounded in self._compound:
+            if parts <= tokens and any(
+                not bounded or m.start() == 0 or not low[m.start() - 1].isalnum() for m in pattern.finditer(low)
+            ):
+                found.add(k)
+        return found
+
+    def score_groups(self, text, groups: dict) -> dict:
+        # groups: name -> keyword list; returns name -> {"score": int, "hits": [keywords]}
+        found = self.present(text)
+        out = {}
+        for name, keys in groups.items():
+            hits = [k for k in keys if k in found]
+            out[name] = {"score": len(hits), "hits": hits}
+        return out
+
+
+def _gate_groups(raw) -> list:
+    # ["a", "b"] -> [["a", "b"]]; [["a"], ["b", "c"]] stays a list of groups
+    raw = list(raw or [])
+    groups = raw if raw and all(isinstance(g, (list, tuple)) for g in raw) else [raw] if raw else []
+    return [[str(k).strip().lower() for k in g] for g in groups if g]
+
+
+def _load_file(path: str) -> dict:
+    if path.endswith(".toml"):
+        import tomllib
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RoleTaxonomy:
+    """Role definitions loaded from data (data/roles.json or a .toml file).
+
+    Each role has keyword weights (a plain list means weight 1), optional
+    `requires_any` gate keywords (a list of lists needs a hit from every list),
+    `suppressed_by` titles, a `max_score` cap and title `aliases`, and the
+    personality/skills/why text the heuristics show. The role x keyword matrix
+    is stored sparse, column-wise (keyword -> [(role, weight)]), so scoring is
+    one product with the text's keyword-presence vector and only touches the
+    columns of keywords that actually occur -- 500 roles cost about what 10 do.
+
+    The optional `quiz` table (title -> keywords, in tie-break order) is what
+    rank() scores quiz answers with: a plain hit count, no gates.
+    """
+
+    def __init__(self, roles, fallback=None, extra_keywords=(), quiz=None):
+        self.roles = []
+        self._columns = {}  # keyword -> [(role index, weight)]
+        for raw in roles or []:
+            title = str((raw or {}).get("title") or "").strip()
+            kws = raw.get("keywords") or {}
+            if isinstance(kws, (list, tuple)):
+                kws = {k: 1 for k in kws}
+            weights = {str(k).strip().lower(): float(w) for k, w in kws.items() if str(k).strip()}
+            if not title or not weights:
+                continue
+            idx = len(self.roles)
+            self.roles.append({
+                "title": title,
+                "why": raw.get("why") or f"{title} keywords present",
+                "keywords": list(weights),
+                "weights": weights,
+                "aliases": [str(a).strip() for a in raw.get("aliases") or [] if str(a).strip()],
+                "requires_any": _gate_groups(raw.get("requires_any")),
+                "suppressed_by": list(raw.get("suppressed_by") or []),
+                "max_score": float(raw["max_score"]) if raw.get("max_score") else None,
+                "personality": list(raw.get("personality") or []),
+                "skills": list(raw.get("skills") or []),
+            })
+            for k, w in weights.items():
+                self._columns.setdefault(k, []).append((idx, w))
+        self.fallback = fallback or {"title": "Generalist (Explore)", "personality": ["Curious"], "skills": ["Communication", "Basics"]}
+        by_title = {r["title"]: idx for idx, r in enumerate(self.roles)}
+        self._quiz = [(by_title[t], [str(k).strip().lower() for k in kws]) for t, kws in (quiz or {}).items() if t in by_title]
+        self._gate_columns = {}  # gate keyword -> role indexes; a role that passes its gates is listed even at score 0
+        for idx, r in enumerate(self.roles):
+            for k in {k for group in r["requires_any"] for k in group}:
+                self._gate_columns.setdefault(k, []).append(idx)
+        gates = list(self._gate_columns)
+        quiz_kws = [k for _, kws in self._quiz for k in kws]
+        self.matcher = KeywordMatcher(list(self._columns) + gates + quiz_kws + list(extra_keywords))
+
+    @classmethod
+    def load(cls, path: str, extra_keywords=()):
+        raw = _load_file(path)
+        return cls(raw.get("roles"), raw.get("fallback"), extra_keywords, raw.get("quiz"))
+
+    @property
+    def titles(self):
+        return [r["title"] for r in self.roles]
+
+    def __len__(self):
+        return len(self.roles)
+
+    def present(self, text) -> set:
+        return self.matcher.present(text)
+
+    def score(self, found) -> list:
+        # found: keyword set from present(); returns [(score, role, hits)] best first
+        scores = {}
+        for k in found:
+            for idx, w in self._columns.get(k, ()):
+                scores[idx] = scores.get(idx, 0) + w
+            for idx in self._gate_columns.get(k, ()):
+                scores.setdefault(idx, 0)
+        ranked = []
+        for idx, sc in scores.items():
+            role = self.roles[idx]
+            if not all(any(k in found for k in group) for group in role["requires_any"]):
+                continue
+            if role["max_score"] is not None:
+                sc = min(sc, role["max_score"])
+            ranked.append((sc, idx))
+        ranked.sort(key=lambda x: (-x[0], x[1]))
+        titles = {self.roles[idx]["title"] for _, idx in ranked}
+        out = []
+        for sc, idx in ranked:
+            role = self.roles[idx]
+            if any(t in titles for t in role["suppressed_by"]):
+                continue
+            out.append((sc, role, [k for k in role["keywords"] if k in found]))
+        return out
+
+    def rank(self, text, limit: int = None) -> list:
+        found = self.present(text)
+        if not self._quiz:
+            out = self.score(found)
+        else:
+            out = []
+            for idx, kws in self._quiz:
+                hits = [k for k in kws if k in found]
+                if hits:
+                    out.append((len(hits), self.roles[idx], hits))
+            out.sort(key=lambda x: -x[0])  # stable: ties keep the quiz table's order
+        return out if limit is None else out[:limit]
@@ -0,0 +1,241 @@
+import bisect
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Latency buckets in seconds: static hits land in the first few, model calls in the last
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Share of routine request logs that are written; errors and slow requests always are
+LOG_SAMPLE = float(os.environ.get("LOG_SAMPLE", "0.1"))
+LOG_SLOW_MS = float(os.environ.get("LOG_SLOW_MS", "2000"))
+_PHASES = ("upstream", "parse", "serialize")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, value: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def lines(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labels, labels)} {_num(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, value: float = 1):
+        self.inc(*labels, value=-value)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def lines(self):
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in items:
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = 'le="%s"' % _num(bound)
+                yield f"{self.name}_bucket{_labels(self.labels, labels, le)} {running}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {round(total, 6)}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {running}"
+
+
+class Registry:
+    """Metrics in the Prometheus text format (0.0.4), without the client library.
+
+    Counters/gauges/histograms are updated in place; collectors are callables
+    run at scrape time that yield (name, kind, help, [(labels dict, value)])
+    for numbers other components already keep (cache hits, upstream slots).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels=()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels=(), buckets=_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        out = []
+        for m in self._metrics:
+            out += [f"# HELP {m.name} {m.help}", f"# TYPE {m.name} {m.kind}"]
+            out.extend(m.lines())
+        for fn in self._collectors:
+            try:
+                for name, kind, help, samples in fn():
+                    out += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                    for labels, value in samples:
+                        if value is not None:
+                            out.append(f"{name}{_labels(labels.keys(), labels.values())} {_num(value)}")
+            except Exception as e:
+                out.append(f"# collector {getattr(fn, '__name__', fn)} failed: {_escape(e)}")
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+HTTP_REQUESTS = REGISTRY.counter("careerlens_http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status"))
+HTTP_DURATION = REGISTRY.histogram("careerlens_http_request_duration_seconds", "Wall time per request", ("route",))
+HTTP_PHASE = REGISTRY.histogram("careerlens_http_request_phase_seconds",
+                                "Time per API request spent waiting on the model (upstream), parsing its reply and serializing the response",
+                                ("route", "phase"))
+HTTP_INFLIGHT = REGISTRY.gauge("careerlens_http_requests_in_flight", "Requests being handled right now", ("route",))
+LLM_CALLS = REGISTRY.histogram("careerlens_llm_call_duration_seconds", "Blocking model calls, including fallbacks and retries", ("endpoint", "outcome"))
+LLM_TOKENS = REGISTRY.counter("careerlens_llm_tokens_total", "Tokens reported in the upstream usage field", ("endpoint", "model", "kind"))
+
+
+class RequestTimer:
+    __slots__ = ("route", "method", "started", "status", "phases", "prompt_tokens", "completion_tokens")
+
+    def __init__(self, route: str, method: str):
+        self.route = route
+        self.method = method
+        self.started = time.perf_counter()
+        self.status = None
+        self.phases = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+def current():
+    # The RequestTimer of the request this thread is serving, if any (pool threads have none)
+    return getattr(_local, "request", None)
+
+
+def add_phase(name: str, seconds: float):
+    req = current()
+    if req is not None:
+        req.phases[name] = req.phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(name, time.perf_counter() - started)
+
+
+def record_usage(endpoint: str, model, usage):
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", None) or 0
+    completion = getattr(usage, "completion_tokens", None) or 0
+    LLM_TOKENS.inc(endpoint, model or "unknown", "prompt", value=prompt)
+    LLM_TOKENS.inc(endpoint, model or "unknown", "completion", value=completion)
+    req = current()
+    if req is not None:
+        req.prompt_tokens += prompt
+        req.completion_tokens += completion
+
+
+def log_event(event: str, level: str = "info", sampled: bool = False, **fields):
+    # One JSON object per line on stderr (stdout may be carrying a CLI's output);
+    # sampled info events are kept at LOG_SAMPLE
+    if sampled and level == "info" and random.random() >= LOG_SAMPLE:
+        return
+    record = {"ts": round(time.time(), 3), "level": level, "event": event}
+    record.update(fields)
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        print(line, file=sys.stderr, flush=True)
+
+
+@contextmanager
+def track_request(route: str, method: str):
+    req = RequestTimer(route, method)
+    _local.request = req
+    HTTP_INFLIGHT.inc(route)
+    try:
+        yield req
+    except BaseException:
+        if req.status is None:
+            req.status = 500
+        raise
+    finally:
+        _local.request = None
+        HTTP_INFLIGHT.dec(route)
+        total = time.perf_counter() - req.started
+        status = req.status or 0
+        HTTP_REQUESTS.inc(route, method, str(status))
+        HTTP_DURATION.observe(total, route)
+        if route.startswith("/api/"):
+            for name in _PHASES:
+                HTTP_PHASE.observe(req.phases.get(name, 0.0), route, name)
+        ms = total * 1000
+        slow = ms >= LOG_SLOW_MS
+        log_event("request", level="warn" if status >= 500 or slow else "info", sampled=True,
+                  route=route, method=method, status=status, ms=round(ms, 1),
+                  **{f"{name}_ms": round(req.phases[name] * 1000, 1) for name in _PHASES if name in req.phases},
+                  **({"prompt_tokens": req.prompt_tokens, "completion_tokens": req.completion_tokens} if req.prompt_tokens else {}))
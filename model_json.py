@@ -0,0 +1,238 @@
+import json
+import re
+import threading
+
+
+# Helpers for pulling JSON out of model output
+
+# One token per match: a string (possibly cut off by the end of the text), a
+# comment, a structural character, or a run of anything else
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*(?:"|\Z)|//[^\n]*|/\*.*?(?:\*/|\Z)|[{}\[\],]|[^"/{}\[\],]+|/', re.S)
+_CLOSERS = {"{": "}", "[": "]"}
+_MAX_CANDIDATES = 8
+_DECODER = json.JSONDecoder(strict=False)
+
+
+def _closed_string(tok: str) -> bool:
+    # the closing quote must not itself be escaped
+    if len(tok) < 2 or tok[-1] != '"':
+        return False
+    return (len(tok) - 1 - len(tok[:-1].rstrip("\\"))) % 2 == 0
+
+
+def _scan(text: str, start: int):
+    # Copies the bracket-balanced value starting at text[start], dropping comments and
+    # trailing commas and closing whatever a cut-off completion left open.
+    # Returns (json text, outcome) with outcome "extracted" or "repaired".
+    out = []
+    stack = []
+    last = -1  # index in out of the last non-whitespace token
+    fixed = False
+    for m in _TOKEN_RE.finditer(text, start):
+        tok = m.group()
+        c = tok[0]
+        if c == "/" and tok[:2] in ("//", "/*"):
+            fixed = True
+            continue
+        if c in "}]":
+            if not stack or _CLOSERS[stack[-1]] != c:
+                return None, None
+            if last >= 0 and out[last] == ",":
+                out[last] = ""
+                fixed = True
+            stack.pop()
+            out.append(tok)
+            if not stack:
+                return "".join(out), "repaired" if fixed else "extracted"
+        else:
+            if c in "{[":
+                stack.append(c)
+            out.append(tok)
+        if not tok.isspace():
+            last = len(out) - 1
+    # ran out of text mid-value (max_tokens cut): close the string and brackets
+    if last >= 0 and out[last][0] == '"' and not _closed_string(out[last]):
+        out[last] += '"'
+    elif last >= 0 and out[last] == ",":
+        out[last] = ""
+    out.extend(_CLOSERS[b] for b in reversed(stack))
+    return "".join(out), "repaired"
+
+
+def extract_json(text):
+    """Parses the first JSON object/array in model output.
+
+    Prose and markdown fences around the value are skipped. A well-formed value
+    goes straight through the C decoder; only a broken one takes the single
+    repairing token scan, which drops // and /* */ comments and trailing commas
+    and closes a truncated tail. Returns
+    (value, outcome) where outcome is "clean" (the whole text was valid JSON),
+    "extracted" or "repaired"; raises ValueError when nothing parses.
+    """
+    text = str(text or "")
+    body = text.strip()
+    if body[:1] in ("{", "["):
+        try:
+            return json.loads(body, strict=False), "clean"
+        except ValueError:
+            pass
+    # objects first: every prompt asks for one, a bare array is the fallback
+    for opener in "{[":
+        start = text.find(opener)
+        for _ in range(_MAX_CANDIDATES):
+            if start == -1:
+                break
+            try:
+                # well-formed value wrapped in prose/fences: the C decoder stops where it ends
+                return _DECODER.raw_decode(text, start)[0], "extracted"
+            except ValueError:
+                pass
+            candidate, outcome = _scan(text, start)
+            if candidate is not None:
+                try:
+                    return json.loads(candidate, strict=False), outcome
+                except ValueError:
+                    pass
+            start = text.find(opener, start + 1)
+    raise ValueError("no JSON object or array in model output")
+
+
+def validate(value, schema, path: str = "$") -> list:
+    # Schema is a nested example: {"key": type | (types) | {...} | [item schema]}; every
+    # listed key is required, extra keys are fine. Returns a list of problems.
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            return [f"{path}: expected an object"]
+        problems = []
+        for key, sub in schema.items():
+            if key not in value:
+                problems.append(f"{path}.{key}: missing")
+            else:
+                problems.extend(validate(value[key], sub, f"{path}.{key}"))
+        return problems
+    if isinstance(schema, list):
+        if not isinstance(value, list):
+            return [f"{path}: expected an array"]
+        problems = []
+        for n, item in enumerate(value):
+            problems.extend(validate(item, schema[0], f"{path}[{n}]"))
+            if len(problems) >= 5:
+                break
+        return problems
+    if not isinstance(value, schema) or (isinstance(value, bool) and schema is not bool):
+        names = "/".join(t.__name__ for t in schema) if isinstance(schema, tuple) else schema.__name__
+        return [f"{path}: expected {names}"]
+    return []
+
+
+class JsonStats:
+    """Per-endpoint counters for how model output parsed and how often repairs were needed."""
+
+    _FIELDS = ("parsed", "clean", "extracted", "repaired", "failed", "schema_miss", "repair_requests", "repair_fixed",
+               "json_mode_rejected")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_endpoint = {}
+
+    def record(self, endpoint: str, field: str, seconds: float = 0.0):
+        with self._lock:
+            row = self._by_endpoint.setdefault(endpoint, dict.fromkeys(self._FIELDS, 0))
+            row[field] += 1
+            if field in ("clean", "extracted", "repaired", "failed"):
+                row["parsed"] += 1
+                row["parse_ms"] = row.get("parse_ms", 0.0) + seconds * 1000
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {}
+            for endpoint, row in self._by_endpoint.items():
+                row = dict(row)
+                n = row["parsed"] or 1
+                row["malformed_rate"] = round((row["parsed"] - row["clean"]) / n, 4)
+                row["failed_rate"] = round(row["failed"] / n, 4)
+                row["avg_parse_ms"] = round(row.pop("parse_ms", 0.0) / n, 3)
+                out[endpoint] = row
+            return out
+
+
+STATS = JsonStats()
+
+
+class ArrayItemStream:
+    """Incremental scanner that yields elements of top-level arrays as soon as they close.
+
+    Feed it completion text as it streams in; for an object like
+    {"weeks": [{...}, {...}]} each element of "weeks" is returned from feed()
+    the moment its closing brace arrives. Only arrays that are direct values of
+    the top-level object under one of `keys` are tracked.
+    """
+
+    def __init__(self, keys):
+        self.keys = set(keys)
+        self._stack = []
+        self._in_str = False
+        self._esc = False
+        self._key_buf = None
+        self._last_str = None
+        self._target = None
+        self._item = None
+
+    def feed(self, text: str):
+        out = []
+        for ch in text:
+            depth = len(self._stack)
+            if (self._target is not None and self._item is None and not self._in_str
+                    and depth == 2 and ch not in " \t\r\n,]"):
+                self._item = []
+            if self._item is not None:
+                self._item.append(ch)
+
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                    if self._key_buf is not None:
+                        self._last_str = "".join(self._key_buf)
+                        self._key_buf = None
+                elif self._key_buf is not None:
+                    self._key_buf.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_str = True
+                # strings directly inside the top-level object are candidate keys
+                if depth == 1 and self._stack[0] == "{":
+                    self._key_buf = []
+            elif ch in "{[":
+                if (ch == "[" and depth == 1 and self._stack[0] == "{"
+                        and self._target is None and self._last_str in self.keys):
+                    self._target = self._last_str
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                depth = len(self._stack)
+                if self._target is not None and depth == 1:
+                    # the tracked array itself closed; flush a trailing scalar element
+                    if self._item is not None and self._item[0] not in "{[":
+                        self._emit(out, self._item[:-1])
+                    self._item = None
+                    self._target = None
+                elif self._item is not None and depth == 2:
+                    self._emit(out, self._item)
+                    self._item = None
+            elif ch == ",":
+                if self._item is not None and depth == 2 and self._item[0] not in "{[":
+                    self._emit(out, self._item[:-1])
+                    self._item = None
+        return out
+
+    def _emit(self, out, chars):
+        try:
+            out.append((self._target, json.loads("".join(chars))))
+        except ValueError:
+            pass
@@ -0,0 +1,170 @@
+import math
+import os
+import re
+
+
+# Shrinks pasted resumes/JDs before they go into a prompt: normalize whitespace,
+# drop repeated lines and sections, then keep the most useful sections until a
+# token budget is met. Token counts are a local estimate (no tokenizer download).
+
+RESUME_TOKEN_BUDGET = int(os.environ.get("RESUME_TOKEN_BUDGET", "2500"))
+JD_TOKEN_BUDGET = int(os.environ.get("JD_TOKEN_BUDGET", "1200"))
+
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_INVISIBLE_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\u200b-\u200d\u2060\ufeff]")
+_SPACES_RE = re.compile(r"[ \t\u00a0]+")
+_PAGE_RE = re.compile(r"^(page\s*)?\d+\s*(/|of)\s*\d+$|^page\s*\d+$", re.I)
+
+# Section headings we recognize, mapped to a canonical name
+_HEADINGS = {
+    "summary": "summary", "profile": "summary", "professional summary": "summary", "objective": "summary",
+    "about me": "summary", "career objective": "summary",
+    "skills": "skills", "technical skills": "skills", "core skills": "skills", "key skills": "skills",
+    "tools": "skills", "technologies": "skills", "tech stack": "skills", "core competencies": "skills",
+    "experience": "experience", "work experience": "experience", "professional experience": "experience",
+    "employment": "experience", "employment history": "experience", "work history": "experience",
+    "internships": "experience", "internship": "experience",
+    "projects": "projects", "personal projects": "projects", "academic projects": "projects",
+    "education": "education", "academics": "education", "qualifications": "education",
+    "certifications": "certifications", "certificates": "certifications", "courses": "certifications",
+    "awards": "awards", "achievements": "awards", "honors": "awards", "publications": "awards",
+    "languages": "other", "interests": "interests", "hobbies": "interests", "volunteering": "other",
+    "references": "references", "declaration": "references", "personal details": "references",
+    "responsibilities": "responsibilities", "what you will do": "responsibilities", "the role": "responsibilities",
+    "requirements": "requirements", "what you bring": "requirements", "who you are": "requirements",
+    "minimum qualifications": "requirements", "preferred qualifications": "requirements",
+    "nice to have": "requirements", "must have": "requirements",
+    "about us": "company", "about the company": "company", "who we are": "company",
+    "benefits": "benefits", "perks": "benefits", "what we offer": "benefits", "compensation": "benefits",
+    "equal opportunity": "benefits", "how to apply": "benefits",
+}
+
+# Salience order used when over budget; unlisted sections rank just above the last two
+_PRIORITY = {
+    "resume": ["skills", "summary", "experience", "projects", "certifications", "education", "awards", "other",
+               "interests", "references"],
+    "job": ["requirements", "responsibilities", "skills", "summary", "other", "company", "benefits"],
+}
+
+
+def estimate_tokens(text) -> int:
+    # BPE-ish estimate: words split into ~4-letter pieces, digits in 3s, punctuation alone
+    n = 0
+    for piece in _PIECE_RE.findall(str(text or "")):
+        if piece.isalpha():
+            n += math.ceil(len(piece) / 4)
+        elif piece.isdigit():
+            n += math.ceil(len(piece) / 3)
+        else:
+            n += 1
+    return n
+
+
+def normalize_whitespace(text) -> str:
+    text = _INVISIBLE_RE.sub("", str(text or "").replace("\r\n", "\n").replace("\r", "\n"))
+    lines = [_SPACES_RE.sub(" ", line).strip() for line in text.split("\n")]
+    out = []
+    for line in lines:
+        if not line and (not out or not out[-1]):
+            continue  # at most one blank line in a row
+        out.append(line)
+    return "\n".join(out).strip()
+
+
+def _heading(line: str, known_only: bool):
+    bare = line.strip().strip(":").strip("#*-=_ ").strip()
+    key = bare.lower()
+    if key in _HEADINGS:
+        return _HEADINGS[key]
+    if known_only:
+        return None
+    words = bare.split()
+    # short ALL-CAPS line or short "Something:" line reads as a heading too
+    if 0 < len(words) <= 4 and len(bare) <= 40 and (bare.isupper() or line.rstrip().endswith(":")):
+        return key
+    return None
+
+
+def split_sections(text: str):
+    # [(name, [lines])]; text before the first heading is the "header" section
+    sections = [("header", [])]
+    for line in text.split("\n"):
+        # until a known heading shows up, an ALL-CAPS line is more likely the candidate's name
+        name = _heading(line, known_only=len(sections) == 1) if line else None
+        if name is not None:
+            sections.append((name, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, lines) for name, lines in sections if any(lines)]
+
+
+def dedupe(sections):
+    # Repeated headers merge into the first occurrence; repeated lines (page headers/footers,
+    # pasted-twice blocks) and page numbers are dropped
+    seen = set()
+    merged = {}
+    order = []
+    for name, lines in sections:
+        if name not in merged:
+            merged[name] = []
+            order.append(name)
+        body = lines if not merged[name] else lines[1:]  # repeated heading line itself goes
+        for line in body:
+            key = line.casefold()
+            if line and (_PAGE_RE.match(line) or (len(line) >= 12 and key in seen)):
+                continue
+            seen.add(key)
+            merged[name].append(line)
+    return [(name, merged[name]) for name in order]
+
+
+def fit_budget(sections, budget: int, kind: str = "resume"):
+    # Sections are taken in salience order; the first that doesn't fit is cut line by line into
+    # what is left, and after that only whole sections that still fit get in. Output keeps the
+    # original section order. Returns (sections, names of sections that were cut or dropped).
+    ranks = _PRIORITY.get(kind, _PRIORITY["resume"])
+    tail = len(ranks) - 2
+
+    def rank(idx):
+        name = sections[idx][0]
+        if name == "header":
+            return -1  # name/contact line and the untitled opener are short and anchor the rest
+        return ranks.index(name) if name in ranks else tail
+
+    kept = {}
+    left = budget
+    for idx in sorted(range(len(sections)), key=rank):
+        lines = sections[idx][1]
+        cost = estimate_tokens("\n".join(lines)) + 1
+        if cost <= left:
+            kept[idx] = lines
+            left -= cost
+            continue
+        part, spent = [], 0
+        for line in lines:
+            line_cost = estimate_tokens(line) + 1
+            if spent + line_cost > left:
+                break
+            part.append(line)
+            spent += line_cost
+        if sum(1 for line in part if line) >= 2:  # a bare heading is not worth its tokens
+            kept[idx] = part
+            left = 0
+    out = [(name, kept[idx]) for idx, (name, _) in enumerate(sections) if idx in kept]
+    dropped = [name for idx, (name, lines) in enumerate(sections) if len(kept.get(idx, ())) < len(lines)]
+    return out, dropped
+
+
+def trim_for_prompt(text, budget: int = RESUME_TOKEN_BUDGET, kind: str = "resume"):
+    # Returns (trimmed text, meta) with meta = original/trimmed token estimates and cut sections
+    raw = str(text or "")
+    original = estimate_tokens(raw)
+    sections = dedupe(split_sections(normalize_whitespace(raw)))
+    dropped = []
+    if budget and sum(estimate_tokens("\n".join(lines)) + 1 for _, lines in sections) > budget:
+        sections, dropped = fit_budget(sections, budget, kind)
+    trimmed = "\n".join(line for _, lines in sections for line in lines).strip()
+    meta = {"original_tokens": original, "trimmed_tokens": estimate_tokens(trimmed)}
+    if dropped:
+        meta["cut_sections"] = dropped
+    return trimmed, meta
@@ -0,0 +1,229 @@
+import os
+import random
+import threading
+import time
+
+
+# Jittered exponential backoff between attempts on the same model
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", "2"))
+LLM_RETRY_BASE = float(os.environ.get("LLM_RETRY_BASE", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.environ.get("LLM_RETRY_MAX_DELAY", "8"))
+# Consecutive upstream failures that open a model's breaker, and how long it stays open
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", "30"))
+# Client-side quota per model as requests/tokens per minute, e.g. the Groq free tier:
+#   LLM_RATE_LIMITS="llama-3.1-8b-instant=30/6000,llama-3.3-70b-versatile=30/12000"
+# Off by default. Budgets are kept in memory per process, so with several gunicorn
+# workers (or a batch run next to the server) give each its share of the account quota.
+LLM_RATE_LIMITS = os.environ.get("LLM_RATE_LIMITS", "")
+
+_RETRY_STATUSES = (408, 409, 429, 500, 502, 503, 504)
+
+
+class RateLimitedError(RuntimeError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def parse_rate_limits(spec: str) -> dict:
+    # "model=rpm/tpm,..." -> {model: (rpm, tpm)}; 0 leaves that dimension unlimited
+    limits = {}
+    for part in (spec or "").split(","):
+        model, _, rate = part.strip().rpartition("=")
+        try:
+            rpm, _, tpm = rate.partition("/")
+            limits[model.strip()] = (float(rpm or 0), float(tpm or 0))
+        except ValueError:
+            if part.strip():
+                print(f"[WARN] Ignoring bad LLM_RATE_LIMITS entry: {part}")
+    limits.pop("", None)
+    return limits
+
+
+def status_of(e):
+    return getattr(e, "status_code", None)
+
+
+def retry_after(e):
+    # Seconds from a 429/503 Retry-After header, if the error carries one
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(e) -> bool:
+    # Worth another try: throttling, 5xx, dropped connections
+    if status_of(e) in _RETRY_STATUSES:
+        return True
+    return isinstance(e, ConnectionError) or type(e).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def backoff(attempt: int, e=None) -> float:
+    # Full jitter, but never sooner than the server asked for
+    delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE * 2 ** attempt))
+    wait = retry_after(e) if e is not None else None
+    return max(delay, wait) if wait is not None else delay
+
+
+class TokenBucket:
+    """Refills at per_minute/60 per second up to one minute's worth.
+
+    reserve(n, max_wait) takes n now and returns how long the caller must wait
+    before using them, or None (taking nothing) when that would exceed max_wait.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.level = per_minute
+        self.stamp = time.monotonic()
+        self.waits = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def reserve(self, n: float, max_wait: float):
+        n = min(n, self.capacity)
+        with self._lock:
+            self._refill()
+            wait = max(0.0, (n - self.level) / self.rate)
+            if wait > max_wait:
+                self.rejected += 1
+                return None
+            self.level -= n
+            if wait > 0:
+                self.waits += 1
+            return wait
+
+    def refund(self, n: float):
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level + n)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refill()
+            return {"per_minute": self.per_minute, "available": round(self.level, 1), "waits": self.waits, "rejected": self.rejected}
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one model."""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.paused_until = 0.0
+        self.pauses = 0
+
+    def acquire(self, tokens: int, max_wait: float) -> float:
+        # Seconds to wait before sending; RateLimitedError if the quota can't cover it in time
+        wait = max(0.0, self.paused_until - time.monotonic())
+        if wait > max_wait:
+            raise RateLimitedError("Upstream asked us to back off from this model")
+        if self.requests is not None:
+            request_wait = self.requests.reserve(1, max_wait)
+            if request_wait is None:
+                raise RateLimitedError("Local request quota exhausted for this model")
+            wait = max(wait, request_wait)
+        if self.tokens is not None:
+            token_wait = self.tokens.reserve(tokens, max_wait)
+            if token_wait is None:
+                if self.requests is not None:
+                    self.requests.refund(1)
+                raise RateLimitedError("Local token quota exhausted for this model")
+            wait = max(wait, token_wait)
+        return wait
+
+    def settle(self, reserved: int, used):
+        # True up once the real usage is known: give back an over-reservation, and charge
+        # an overrun (the level may dip below zero, so later callers wait it off)
+        if self.tokens is not None and used is not None and used != reserved:
+            self.tokens.refund(reserved - used)
+
+    def pause(self, seconds: float):
+        # A 429's Retry-After holds every caller of this model, not just the one that got it
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.pauses += 1
+
+    def stats(self) -> dict:
+        return {"requests": self.requests.stats() if self.requests else None,
+                "tokens": self.tokens.stats() if self.tokens else None,
+                "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 1), "pauses": self.pauses}
+
+
+class CircuitBreaker:
+    """Classic closed/open/half-open breaker for one upstream model.
+
+    Opens after `failures` consecutive upstream failures; after `cooldown`
+    seconds a single probe request is let through, and its outcome closes the
+    breaker or opens it again.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = max(1, failures)
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self.short_circuited = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def blocked(self) -> bool:
+        # Open and still cooling down; unlike allow() this never claims the probe
+        with self._lock:
+            blocked = self.state == "open" and time.monotonic() - self.opened_at < self.cooldown
+            if blocked:
+                self.short_circuited += 1
+            return blocked
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        # A probe that ended without a verdict (cancelled, rejected locally) frees the slot
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            retry_in = max(0.0, self.cooldown - (time.monotonic() - self.opened_at)) if self.state == "open" else 0.0
+            return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.opened,
+                    "short_circuited": self.short_circuited, "retry_in": round(retry_in, 1)}
@@ -0,0 +1,147 @@
+import math
+import re
+from collections import Counter
+
+
+# Local keyword retrieval for resume analysis: BM25 over the role taxonomy
+# with IDF precomputed at startup. ATS score, coverage and missing keywords are
+# computed here deterministically; the LLM only writes the prose around them.
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9+#]{2,}")
+
+# Words that show up in every job ad and say nothing about the skill set
+_STOPWORDS = frozenset("""
+    a about above across after all also an and any are as at be been being both but by can could
+    do does each either etc for from get had has have how if in into is it its may more most must
+    no not of on or other our out over own per plus should so some such than that the their them
+    then there these they this those through to under up upon us very via was we were what when
+    where which while who will with within without would you your
+    ability able across applicant applicants apply based benefits best candidate candidates career
+    company competitive culture day degree demonstrated desired environment equal excellent
+    experience experienced familiarity fast good great help high highly ideal including job join
+    knowledge least level looking new nice opportunity paced plus position preferred proficiency
+    proficient proven related relevant required requirements responsibilities responsible role
+    salary skill skills solid strong team teams understanding using work working world year years
+""".split())
+
+# How many non-vocabulary JD terms to consider, and how often they must repeat
+JD_EXTRA_TERMS = 10
+JD_EXTRA_MIN_TF = 2
+
+
+class SkillIndex:
+    """BM25 index whose documents are the role profiles of a RoleTaxonomy.
+
+    Vocabulary terms are the taxonomy keywords, counted with its matcher; a
+    profile is a sparse {term: weight} dict. idf() is a precomputed table, so
+    scoring a resume is a couple of dict passes regardless of corpus size.
+    """
+
+    def __init__(self, taxonomy, normalize=None, k1: float = 1.2, b: float = 0.75):
+        self.taxonomy = taxonomy
+        self.normalize = normalize or (lambda s: " ".join(str(s or "").lower().split()))
+        self.k1 = k1
+        self.b = b
+        self._postings = {}  # term -> [(role index, tf)]
+        self._doc_len = []
+        for idx, role in enumerate(taxonomy.roles):
+            for term, weight in role["weights"].items():
+                self._postings.setdefault(term, []).append((idx, weight))
+            self._doc_len.append(sum(role["weights"].values()))
+        n = len(self._doc_len)
+        self._avg_len = (sum(self._doc_len) / n) if n else 1.0
+        self._idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self._postings.items()}
+        # terms outside the corpus are treated as rarer than anything in it
+        self._max_idf = math.log(1 + (n + 0.5) / 0.5)
+        self._titles = {}  # normalized title/alias -> role
+        for role in taxonomy.roles:
+            for name in [role["title"]] + role["aliases"]:
+                self._titles.setdefault(self.normalize(name), role)
+
+    def idf(self, term: str) -> float:
+        return self._idf.get(term, self._max_idf)
+
+    def rank_roles(self, text, limit: int = 5) -> list:
+        # BM25 with the text as the query; returns [(score, role)] best first
+        query = self.taxonomy.matcher.counts(text)
+        scores = {}
+        for term in query:
+            idf = self.idf(term)
+            for idx, tf in self._postings.get(term, ()):
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[idx] / self._avg_len)
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:limit]
+        return [(round(sc, 3), self.taxonomy.roles[idx]) for idx, sc in ranked]
+
+    def resolve_role(self, title: str):
+        # Exact title/alias match first, then the longest title/alias contained in it
+        # ("senior data analyst" -> Data Analyst)
+        norm = self.normalize(title)
+        if not norm:
+            return None
+        if norm in self._titles:
+            return self._titles[norm]
+        padded = f" {norm} "
+        best = None
+        for name, role in self._titles.items():
+            if f" {name} " in padded and (best is None or len(name) > len(best[0])):
+                best = (name, role)
+        return best[1] if best else None
+
+    def role_profile(self, role) -> dict:
+        return {t: w * self.idf(t) for t, w in role["weights"].items()}
+
+    def text_profile(self, text) -> dict:
+        # Vocabulary terms found in the text, plus its most repeated other words
+        low = str(text or "").lower()
+        counts = self.taxonomy.matcher.counts(low)
+        # "testing" inside "a/b testing" is not a term of its own
+        for t in [t for t in counts if " " in t or "/" in t]:
+            for w in _WORD_RE.findall(t):
+                if w in counts and counts[w] <= counts[t]:
+                    del counts[w]
+        # taxonomy words like "requirements" are also JD headings; a JD can't ask for those
+        profile = {t: (1 + math.log(tf)) * self.idf(t) for t, tf in counts.items() if t not in _STOPWORDS}
+        covered = {w for t in profile for w in _WORD_RE.findall(t)}
+        extra = Counter(w for w in _WORD_RE.findall(low) if w not in _STOPWORDS and w not in covered)
+        for w, tf in extra.most_common(JD_EXTRA_TERMS):
+            if tf < JD_EXTRA_MIN_TF:
+                break
+            # weighted below vocabulary terms: we can't tell a skill from filler here
+            profile[w] = 0.5 * (1 + math.log(tf)) * self.idf(w)
+        return profile
+
+    def match(self, resume_text, profile: dict, max_missing: int = 7) -> dict:
+        if not profile:
+            return {}
+        low = str(resume_text or "").lower()
+        found = self.taxonomy.matcher.present(low)
+        words = set(_WORD_RE.findall(low))
+        matched = [t for t in profile if t in found or t in words]
+        missing = sorted((t for t in profile if t not in found and t not in words), key=lambda t: -profile[t])
+        total = sum(profile.values())
+        covered = sum(profile[t] for t in matched)
+        return {
+            "ats_score_percent": int(round(100 * covered / total)) if total else 0,
+            "missing_keywords": missing[:max_missing],
+            "keyword_coverage": {
+                "matched": sorted(matched, key=lambda t: -profile[t]),
+                "matched_count": len(matched),
+                "total": len(profile),
+            },
+        }
+
+    def score_resume(self, resume_text, target_role: str = "", job_description: str = "") -> dict:
+        # Returns {} when there is nothing to score against (no JD and an unknown role)
+        if str(job_description or "").strip():
+            out = self.match(resume_text, self.text_profile(job_description))
+            if out:
+                out["basis"] = "job_description"
+                return out
+        role = self.resolve_role(target_role)
+        if role is None:
+            return {}
+        out = self.match(resume_text, self.role_profile(role))
+        out["basis"] = "role_profile"
+        out["profile_role"] = role["title"]
+        return out
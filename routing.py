@@ -0,0 +1,381 @@
+import concurrent.futures
+import os
+import threading
+import time
+from collections import deque
+
+from llm import LLMBusyError, LLMCancelledError, LLMTimeoutError, deadline_for
+from prompt_budget import estimate_tokens
+from resilience import (LLM_RATE_LIMITS, LLM_RETRIES, CircuitBreaker, CircuitOpenError, RateLimitedError, RateLimiter,
+                        backoff, is_transient, parse_rate_limits, retry_after, status_of)
+
+
+# Ordered model chain per endpoint: the first target serves, the rest are fallbacks.
+# Entries are aliases from the router's model table ("small", "large", "local") or
+# "provider:model". Override individually, e.g. LLM_ROUTE_COMPARE=small,local
+_ROUTES = {
+    "ping": "small",
+    "adaptive_quiz_start": "small,large",
+    "adaptive_quiz_next": "small,large",
+    "quiz": "small,large",
+    "roadmap": "small,large",
+    "market": "small,large",
+    "recommend": "small,large",
+    "resume": "large,small",
+    "compare": "large,small",
+}
+LLM_DEFAULT_ROUTE = os.environ.get("LLM_ROUTE", "small,large")
+# Share of the remaining deadline an attempt may use while another target is left to try
+LLM_ATTEMPT_SHARE = float(os.environ.get("LLM_ATTEMPT_SHARE", "0.6"))
+
+# Hedged requests: once the primary has run past its recent p95 latency a second copy
+# goes out and the first answer wins. Only for short replies that are cheap to duplicate.
+LLM_HEDGE_ENDPOINTS = [e.strip() for e in os.environ.get("LLM_HEDGE_ENDPOINTS", "adaptive_quiz_start,adaptive_quiz_next,quiz").split(",") if e.strip()]
+LLM_HEDGE_QUANTILE = float(os.environ.get("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_MIN = float(os.environ.get("LLM_HEDGE_MIN", "0.5"))
+# Delay used until an endpoint has enough latency samples for a quantile
+LLM_HEDGE_INITIAL = float(os.environ.get("LLM_HEDGE_INITIAL", "3"))
+# Never hedge more than this fraction of an endpoint's requests
+LLM_HEDGE_MAX_RATIO = float(os.environ.get("LLM_HEDGE_MAX_RATIO", "0.1"))
+_HEDGE_MIN_SAMPLES = 20
+
+# Errors about the request itself fail the same way on every target, so they are not retried elsewhere
+_REQUEST_ERRORS = ("json_validate_failed", "context_length_exceeded", "request_too_large")
+# Reserved against a model's tokens-per-minute quota when a call sets no max_tokens
+_DEFAULT_COMPLETION_TOKENS = 1024
+
+
+def route_for(endpoint: str) -> str:
+    return os.environ.get("LLM_ROUTE_" + endpoint.upper()) or _ROUTES.get(endpoint, LLM_DEFAULT_ROUTE)
+
+
+def _name(target) -> str:
+    return f"{target[0]}:{target[1]}"
+
+
+def _falls_back(e) -> bool:
+    return not any(code in str(e) for code in _REQUEST_ERRORS)
+
+
+def _prompt_tokens(messages) -> int:
+    return sum(estimate_tokens(m.get("content") or "") for m in messages)
+
+
+def _reserve_tokens(messages, kwargs) -> int:
+    return _prompt_tokens(messages) + int(kwargs.get("max_tokens") or _DEFAULT_COMPLETION_TOKENS)
+
+
+class ModelRouter:
+    """Sends each endpoint's completions down an ordered chain of (provider, model) targets.
+
+    chat() tries the chain in order; every attempt but the last gets only a share
+    of the endpoint's deadline, so a hung primary still leaves time for the
+    fallback. Within an attempt, transient errors (429, 5xx, dropped
+    connections) are retried with jittered backoff. Each target has a circuit
+    breaker and an optional requests/tokens-per-minute limiter; targets whose
+    breaker is open are skipped, and when all of them are CircuitOpenError is
+    raised at once so callers go straight to their heuristic fallbacks. On
+    hedged endpoints a second copy of the primary request goes out when it runs
+    past its recent p95 and the first answer wins. stream_chat() falls back
+    only before the first delta has been sent on.
+    """
+
+    def __init__(self, clients: dict, models: dict, rate_limits: dict = None):
+        self.clients = clients  # provider -> LLMClient
+        self.models = models  # alias -> (provider, model)
+        self.rate_limits = parse_rate_limits(LLM_RATE_LIMITS) if rate_limits is None else rate_limits  # model -> (rpm, tpm)
+        self._chains = {}
+        self._lock = threading.Lock()
+        self._latency = {}  # (endpoint, target) -> recent seconds
+        self._stats = {}
+        self._breakers = {}
+        self._limiters = {}
+
+    def _resolve(self, spec: str):
+        targets = []
+        for part in spec.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            target = self.models.get(part)
+            if target is None and ":" in part:
+                provider, model = part.split(":", 1)  # Ollama tags ("llama3.1:8b") keep their colon
+                target = (provider.strip().lower(), model.strip())
+            if target is None or target[0] not in self.clients:
+                print(f"[WARN] Ignoring unknown model route target: {part}")
+                continue
+            if target not in targets:
+                targets.append(target)
+        return targets
+
+    def chain(self, endpoint: str, escalate: bool = False):
+        chain = self._chains.get(endpoint)
+        if chain is None:
+            chain = self._resolve(route_for(endpoint)) or self._resolve("small")
+            self._chains[endpoint] = chain
+        large = self.models.get("large")
+        if escalate and large is not None and large[0] in self.clients:
+            # "only when needed": a retry after a bad reply goes to the large model first
+            return [large] + [t for t in chain if t != large]
+        return chain
+
+    def targets(self) -> list:
+        # Every (provider, model) an endpoint's chain or a JSON-repair escalation can reach
+        out = []
+        for endpoint in _ROUTES:
+            for target in self.chain(endpoint, escalate=True):
+                if target not in out:
+                    out.append(target)
+        return out
+
+    def breaker(self, target) -> CircuitBreaker:
+        with self._lock:
+            if target not in self._breakers:
+                self._breakers[target] = CircuitBreaker()
+            return self._breakers[target]
+
+    def limiter(self, target):
+        # Groq quotas are per model; local models are not limited unless listed by provider:model
+        with self._lock:
+            if target not in self._limiters:
+                rpm, tpm = self.rate_limits.get(_name(target)) or (self.rate_limits.get(target[1]) if target[0] == "groq" else None) or (0, 0)
+                self._limiters[target] = RateLimiter(rpm, tpm) if rpm or tpm else None
+            return self._limiters[target]
+
+    def _counters(self, endpoint: str) -> dict:
+        # caller holds the lock
+        return self._stats.setdefault(endpoint, {"requests": 0, "retries": 0, "fallbacks": 0, "short_circuited": 0, "rate_limited": 0,
+                                                 "hedged": 0, "hedge_wins": 0, "failed": 0, "served": {}})
+
+    def _count(self, endpoint: str, field: str):
+        with self._lock:
+            self._counters(endpoint)[field] += 1
+
+    def _record(self, endpoint: str, target, seconds: float, hedge_win: bool = False):
+        with self._lock:
+            counters = self._counters(endpoint)
+            counters["served"][_name(target)] = counters["served"].get(_name(target), 0) + 1
+            if hedge_win:
+                counters["hedge_wins"] += 1
+            self._latency.setdefault((endpoint, target), deque(maxlen=200)).append(seconds)
+
+    def hedge_delay(self, endpoint: str, target):
+        # Seconds to wait before hedging, or None when this request should not hedge
+        if endpoint not in LLM_HEDGE_ENDPOINTS:
+            return None
+        with self._lock:
+            counters = self._counters(endpoint)
+            if counters["hedged"] >= LLM_HEDGE_MAX_RATIO * counters["requests"]:
+                return None
+            samples = sorted(self._latency.get((endpoint, target), ()))
+        if len(samples) < _HEDGE_MIN_SAMPLES:
+            return max(LLM_HEDGE_MIN, LLM_HEDGE_INITIAL)
+        return max(LLM_HEDGE_MIN, samples[min(len(samples) - 1, int(LLM_HEDGE_QUANTILE * len(samples)))])
+
+    def _sleep(self, seconds: float, client_gone):
+        end = time.monotonic() + seconds
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            if client_gone is not None and client_gone():
+                raise LLMCancelledError("Client disconnected")
+            time.sleep(min(0.25, remaining))
+
+    def _admit(self, target, endpoint: str, reserve: int, deadline: float, client_gone):
+        # Wait for local quota; RateLimitedError when it can't be had before the deadline
+        limiter = self.limiter(target)
+        if limiter is None:
+            return
+        try:
+            wait = limiter.acquire(reserve, deadline - time.monotonic())
+        except RateLimitedError:
+            self._count(endpoint, "rate_limited")
+            raise
+        if wait:
+            self._sleep(wait, client_gone)
+
+    def _attempt(self, target, messages, endpoint: str, deadline: float, client_gone, hedge: bool, kwargs):
+        breaker, limiter = self.breaker(target), self.limiter(target)
+        reserve = _reserve_tokens(messages, kwargs)
+        attempt = 0
+        while True:
+            try:
+                self._admit(target, endpoint, reserve, deadline, client_gone)
+                result = self._call(target, messages, endpoint, deadline, client_gone, hedge and attempt == 0, kwargs)
+            except (LLMCancelledError, LLMBusyError, RateLimitedError):
+                breaker.release()
+                raise
+            except Exception as e:
+                transient = is_transient(e) or isinstance(e, LLMTimeoutError)
+                if transient:
+                    breaker.failure()
+                else:
+                    breaker.success()  # the upstream answered; the request itself was the problem
+                if limiter is not None and status_of(e) is not None:
+                    limiter.settle(reserve, 0)  # rejected upstream, so no tokens were spent
+                    if status_of(e) == 429:
+                        limiter.pause(retry_after(e) or 1.0)
+                delay = backoff(attempt, e)
+                if (not transient or isinstance(e, LLMTimeoutError) or attempt >= LLM_RETRIES
+                        or time.monotonic() + delay >= deadline or not breaker.allow()):
+                    raise
+                attempt += 1
+                self._count(endpoint, "retries")
+                self._sleep(delay, client_gone)
+                continue
+            breaker.success()
+            if limiter is not None:
+                usage = getattr(result, "usage", None)
+                limiter.settle(reserve, getattr(usage, "total_tokens", None))
+            return result
+
+    def _call(self, target, messages, endpoint: str, deadline: float, client_gone, hedge: bool, kwargs):
+        client = self.clients[target[0]]
+        started = time.monotonic()
+        delay = self.hedge_delay(endpoint, target) if hedge else None
+        limiter = self.limiter(target)
+        pending = {client.submit_chat(messages, target[1], endpoint, deadline, **kwargs)[0]: False}
+        error = None
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline:
+                    client.timeouts += 1
+                    raise LLMTimeoutError(f"Upstream call for '{endpoint}' to {_name(target)} exceeded its {deadline - started:.3g}s budget")
+                wait = min(0.25, deadline - now)
+                if delay is not None:
+                    wait = min(wait, max(0.0, started + delay - now))
+                done, _ = concurrent.futures.wait(pending, timeout=wait, return_when=concurrent.futures.FIRST_COMPLETED)
+                for fut in done:
+                    is_hedge = pending.pop(fut)
+                    try:
+                        result = client._result(fut, endpoint)
+                    except Exception as e:
+                        error = e  # the other copy may still answer
+                        continue
+                    self._record(endpoint, target, time.monotonic() - started, hedge_win=is_hedge)
+                    return result
+                if client_gone is not None and client_gone():
+                    client.cancelled += 1
+                    raise LLMCancelledError("Client disconnected")
+                if delay is not None and pending and time.monotonic() - started >= delay:
+                    delay = None
+                    if limiter is not None and limiter.requests is not None and limiter.requests.reserve(1, 0) is None:
+                        continue  # no spare quota for a duplicate
+                    self._count(endpoint, "hedged")
+                    pending[client.submit_chat(messages, target[1], endpoint, deadline, **kwargs)[0]] = True
+            raise error
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+    def chat(self, messages, endpoint: str = "default", client_gone=None, escalate: bool = False, **kwargs):
+        chain = self.chain(endpoint, escalate)
+        if not chain:
+            raise RuntimeError(f"No model route configured for '{endpoint}'")
+        self._count(endpoint, "requests")
+        deadline = time.monotonic() + deadline_for(endpoint)
+        # targets whose breaker is open are skipped without spending any of the deadline
+        chain = [t for t in chain if not self.breaker(t).blocked()]
+        error = None
+        for i, target in enumerate(chain):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                error = error or LLMTimeoutError(f"Upstream call for '{endpoint}' exceeded its {deadline_for(endpoint):g}s deadline")
+                break
+            if not self.breaker(target).allow():
+                continue  # another request holds the half-open probe
+            last = i == len(chain) - 1
+            budget = remaining if last else remaining * LLM_ATTEMPT_SHARE
+            try:
+                return self._attempt(target, messages, endpoint, time.monotonic() + budget, client_gone, i == 0, kwargs)
+            except LLMCancelledError:
+                raise
+            except Exception as e:
+                error = e
+                if last or not _falls_back(e):
+                    break
+                self._count(endpoint, "fallbacks")
+                print(f"[WARN] {endpoint}: {_name(target)} failed ({e}); falling back to {_name(chain[i + 1])}")
+        if error is None:
+            self._count(endpoint, "short_circuited")
+            raise CircuitOpenError(f"All models for '{endpoint}' are failing; circuit open")
+        self._count(endpoint, "failed")
+        raise error
+
+    def stream_chat(self, messages, endpoint: str = "default", client_gone=None, **kwargs):
+        # Streams keep the whole deadline per attempt (a cut-off stream can't be resumed elsewhere),
+        # so only failures before the first delta fall back
+        chain = self.chain(endpoint)
+        if not chain:
+            raise RuntimeError(f"No model route configured for '{endpoint}'")
+        self._count(endpoint, "requests")
+        deadline = time.monotonic() + deadline_for(endpoint)
+        reserve = _reserve_tokens(messages, kwargs)
+        chain = [t for t in chain if not self.breaker(t).blocked()]
+        error = None
+        for i, target in enumerate(chain):
+            breaker = self.breaker(target)
+            if not breaker.allow():
+                continue
+            started = time.monotonic()
+            sent, admitted, streamed, usage = False, False, [], []
+            try:
+                self._admit(target, endpoint, reserve, deadline, client_gone)
+                admitted = True
+                for delta in self.clients[target[0]].stream_chat(messages, target[1], endpoint, client_gone,
+                                                                 on_usage=usage.append, **kwargs):
+                    sent = True
+                    streamed.append(delta)
+                    yield delta
+                breaker.success()
+                self._record(endpoint, target, time.monotonic() - started)
+                return
+            except (LLMCancelledError, GeneratorExit):
+                breaker.release()
+                raise
+            except Exception as e:
+                error = e
+                if is_transient(e) or isinstance(e, LLMTimeoutError):
+                    breaker.failure()
+                else:
+                    breaker.release()
+                if status_of(e) is not None and not sent:
+                    streamed = None  # rejected upstream, so no tokens were spent
+                if sent or i == len(chain) - 1 or not _falls_back(e):
+                    break
+                self._count(endpoint, "fallbacks")
+                print(f"[WARN] {endpoint}: {_name(target)} failed ({e}); falling back to {_name(chain[i + 1])}")
+            finally:
+                if admitted:
+                    self._settle_stream(target, messages, reserve, streamed, usage)
+        if error is None:
+            self._count(endpoint, "short_circuited")
+            raise CircuitOpenError(f"All models for '{endpoint}' are failing; circuit open")
+        self._count(endpoint, "failed")
+        raise error
+
+    def _settle_stream(self, target, messages, reserve: int, streamed, usage):
+        # Streams settle like chat(): the reported usage if the provider sent it, else the
+        # prompt plus what was actually streamed (a cut-off stream only spent that much)
+        limiter = self.limiter(target)
+        if limiter is None:
+            return
+        if streamed is None:
+            used = 0
+        elif usage and getattr(usage[-1], "total_tokens", None) is not None:
+            used = usage[-1].total_tokens
+        else:
+            used = _prompt_tokens(messages) + estimate_tokens("".join(streamed))
+        limiter.settle(reserve, used)
+
+    def stats(self) -> dict:
+        with self._lock:
+            endpoints = {ep: dict(c, served=dict(c["served"]), route=[_name(t) for t in self._chains.get(ep, ())])
+                         for ep, c in self._stats.items()}
+            breakers = {_name(t): b for t, b in self._breakers.items()}
+            limiters = {_name(t): lim for t, lim in self._limiters.items() if lim is not None}
+        return {"providers": {name: c.stats() for name, c in self.clients.items()}, "endpoints": endpoints,
+                "breakers": {name: b.stats() for name, b in breakers.items()},
+                "rate_limits": {name: lim.stats() for name, lim in limiters.items()}}
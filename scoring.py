@@ -0,0 +1,132 @@
+import os
+import re
+import sys
+from matching import RoleTaxonomy
+from retrieval import SkillIndex
+
+
+# Local, model-free scoring: role-title normalization, the role taxonomy, ATS keyword
+# scoring and the heuristic role suggestions. Kept apart from server.py so batch
+# workers can score resumes without building LLM clients, caches or background threads.
+
+# Cache-key normalization: case/whitespace folding plus role-title aliasing, so
+# "Sr. Data Analyst" and "senior   data analyst" land on the same entry.
+_ROLE_ALIASES = {
+    "sr": "senior",
+    "snr": "senior",
+    "jr": "junior",
+    "mgr": "manager",
+    "mngr": "manager",
+    "eng": "engineer",
+    "engr": "engineer",
+    "dev": "developer",
+    "devs": "developer",
+    "swe": "software engineer",
+    "sde": "software engineer",
+    "ml": "machine learning",
+    "qa": "quality assurance",
+    "ux": "user experience",
+    "ui": "user interface",
+    "assoc": "associate",
+    "asst": "assistant",
+    "admin": "administrator",
+}
+_ROLE_PHRASES = [
+    (" front end ", " frontend "),
+    (" back end ", " backend "),
+    (" full stack ", " fullstack "),
+    (" dev ops ", " devops "),
+]
+_ROLE_TOKEN_RE = re.compile(r"[\w+#]+")
+
+
+def norm_text(text) -> str:
+    return " ".join(str(text or "").casefold().split())
+
+
+def norm_role(role) -> str:
+    text = norm_text(role)
+    tokens = _ROLE_TOKEN_RE.findall(text)
+    if not tokens:
+        # punctuation-only titles still get a key of their own
+        return text
+    out = " " + " ".join(_ROLE_ALIASES.get(t, t) for t in tokens) + " "
+    for phrase, repl in _ROLE_PHRASES:
+        out = out.replace(phrase, repl)
+    return out.strip()
+
+
+# Role taxonomy shared by both heuristic scorers; adding a role is a data-only change
+ROLE_TAXONOMY_PATH = os.environ.get("ROLE_TAXONOMY_PATH", os.path.join("data", "roles.json"))
+_LEVEL_KW = ("intern", "internship")
+try:
+    TAXONOMY = RoleTaxonomy.load(ROLE_TAXONOMY_PATH, extra_keywords=_LEVEL_KW)
+except Exception as e:
+    # stderr: batch workers share stdout with the CLI's JSONL output
+    print(f"[WARN] Role taxonomy not loaded from {ROLE_TAXONOMY_PATH}: {e}", file=sys.stderr)
+    TAXONOMY = RoleTaxonomy([], extra_keywords=_LEVEL_KW)
+_YEARS_RE = re.compile(r"(\d+)\+?\s*(years|yrs)")
+# Local ATS scoring (BM25/IDF over the taxonomy); titles resolve through the same role normalizer as cache keys
+SKILLS = SkillIndex(TAXONOMY, normalize=norm_role)
+
+
+def job_suggestions(resume_text: str, target_role: str = ""):
+    txt = (resume_text or "")
+    low = txt.lower()
+    # one pass over the text; scoring every role is a sparse product over the hits
+    found = TAXONOMY.present(low)
+    # Rough experience level detection
+    level = "entry"
+    if any(k in found for k in _LEVEL_KW):
+        level = "entry"
+    else:
+        m = _YEARS_RE.search(low)
+        years = int(m.group(1)) if m else 0
+        if years >= 7:
+            level = "senior"
+        elif years >= 4:
+            level = "mid"
+        elif years >= 2:
+            level = "junior"
+        else:
+            level = "entry"
+
+    out = []
+    for score, role, hits in TAXONOMY.score(found)[:4]:
+        out.append({"title": role["title"], "level": level, "why_fit": f"{role['why']} ({', '.join(hits[:5])})"})
+
+    # Include target role if provided, absent and there is room
+    tr = (target_role or "").strip()
+    if tr and len(out) < 4 and not any(r["title"].lower() == tr.lower() for r in out):
+        out.append({"title": tr, "level": level, "why_fit": "Matches your target role"})
+    return out
+
+
+def matches_from_answers(answers):
+    try:
+        txt = " \n ".join([str(a) for a in (answers or [])])
+    except Exception:
+        txt = str(answers)
+    found = []
+    for score, role, hits in TAXONOMY.rank(txt, limit=3):
+        found.append({
+            "title": role["title"],
+            "score": score,
+            "personality": role["personality"],
+            "skills": [k.upper() for k in hits][:5] or role["skills"],
+        })
+    if not found:
+        # default generic
+        fb = TAXONOMY.fallback
+        found.append({"title": fb["title"], "score": 1, "personality": fb["personality"], "skills": fb["skills"]})
+    matches = []
+    for f in found:
+        conf = int(min(90, 40 + f["score"] * 10))
+        matches.append({
+            "role": f["title"],
+            "confidence": conf,
+            "reasoning": f"Signals found in your answers (e.g., {', '.join(f['skills'])}).",
+            "personality_fit": f["personality"],
+            "skills_fit": f["skills"],
+        })
+    return matches
@@ -7,8 +7,25 @@ import urllib.parse
 import threading
 import time
 import hashlib
-from groq import Groq
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import http.client
+from wsgiref.util import is_hop_by_hop
+from cache import DiskCache, TTLCache
+from llm import LLMClient, LLMCancelledError, deadline_for, socket_closed
+from resilience import CircuitOpenError
+from routing import ModelRouter
+from health import HealthProber
+from model_json import STATS as _JSON_STATS, ArrayItemStream, extract_json, validate
+from scoring import (SKILLS as _SKILLS, TAXONOMY as _TAXONOMY, job_suggestions as _heuristic_job_suggestions,
+                     matches_from_answers as _heuristic_matches_from_answers, norm_role as _norm_role, norm_text as _norm_text)
+from speculate import Speculator
+from static_assets import Asset, StaticAssets
+from sessions import SessionStore
+from prompt_budget import JD_TOKEN_BUDGET, RESUME_TOKEN_BUDGET, trim_for_prompt
+from prompts import PROMPTS, fingerprint
+import batch
+import metrics
+from insights_index import MarketIndex, MARKET_INDEX_PATH
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -16,254 +33,691 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+# LLM_PROVIDER=ollama runs every endpoint against a local Ollama server (no Groq key needed)
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "groq").strip().lower()
+
 # Configure Groq API
-GROQ_API_KEY = os.environ["GROQ_API_KEY"]
-if not GROQ_API_KEY:
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
+if not GROQ_API_KEY and LLM_PROVIDER != "ollama":
     raise ValueError("GROQ_API_KEY environment variable not set!")
-client = Groq(api_key=GROQ_API_KEY)
 GROQ_MODEL = os.environ.get("GROQ_MODEL", "llama-3.1-8b-instant")
+GROQ_MODEL_LARGE = os.environ.get("GROQ_MODEL_LARGE", "llama-3.3-70b-versatile")
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://127.0.0.1:11434/v1")
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.1")
+
+_LLM_CLIENTS = {
+    # A local model serves one or two generations at a time; more just queue inside Ollama
+    "ollama": LLMClient(api_key="ollama", base_url=OLLAMA_BASE_URL, provider="openai",
+                        max_inflight=int(os.environ.get("OLLAMA_MAX_INFLIGHT", "2"))),
+}
+if GROQ_API_KEY:
+    # GROQ_BASE_URL points the client at another Groq-compatible server (e.g. bench/stub_groq.py)
+    _LLM_CLIENTS["groq"] = LLMClient(api_key=GROQ_API_KEY, base_url=os.environ.get("GROQ_BASE_URL"))
+_LOCAL = ("ollama", OLLAMA_MODEL)
+if LLM_PROVIDER == "ollama":
+    _MODELS = {"small": _LOCAL, "large": ("ollama", os.environ.get("OLLAMA_MODEL_LARGE", OLLAMA_MODEL)), "local": _LOCAL}
+else:
+    _MODELS = {"small": ("groq", GROQ_MODEL), "large": ("groq", GROQ_MODEL_LARGE), "local": _LOCAL}
+# Per-endpoint model chains with fallback and hedging (routing.py; LLM_ROUTE_<ENDPOINT> to override)
+_ROUTER = ModelRouter(_LLM_CLIENTS, _MODELS)
+# A reply that isn't valid JSON or misses its endpoint's schema gets one repair request,
+# sent to the large model first when JSON_REPAIR_ESCALATE is on
+JSON_REPAIR = os.environ.get("JSON_REPAIR", "1") == "1"
+JSON_REPAIR_ESCALATE = os.environ.get("JSON_REPAIR_ESCALATE", "1") == "1"
+# /api/ready and /api/ping answer from an upstream status a background thread refreshes
+# every HEALTH_PROBE_INTERVAL seconds by listing models (health.py), not from a completion.
+# The thread starts with the first request, so CLIs and batch workers importing server don't probe.
+_HEALTH_MODELS = {}
+for _provider, _model in _ROUTER.targets():
+    _HEALTH_MODELS.setdefault(_provider, []).append(_model)
+_HEALTH = HealthProber(_LLM_CLIENTS, _HEALTH_MODELS)
 
 # Host and Port configuration (for local development)
 # In production, Gunicorn will handle this.
 HOST = os.environ.get("HOST", "127.0.0.1")
 PORT = int(os.environ.get("PORT", "8000"))
 HOST = "0.0.0.0"
-print("GROQ KEY FOUND:", bool(os.environ.get("GROQ_API_KEY")))
 
-def call_groq(prompt: str) -> str:
+def call_groq(prompt: str = None, where: str = "default", client_gone=None, messages=None, escalate: bool = False, **gen) -> str:
+    # Blocking call down the endpoint's model chain (bounded slots + per-endpoint deadline);
+    # gen is the endpoint's generation profile (max_tokens, temperature, response_format, stop)
+    if messages is None:
+        messages = [
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ]
+    started = time.perf_counter()
+    outcome = "error"
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model=GROQ_MODEL,
-        )
+        with metrics.phase("upstream"):
+            chat_completion = _ROUTER.chat(messages, endpoint=where, client_gone=client_gone, escalate=escalate, **gen)
+        outcome = "ok"
+        metrics.record_usage(where, getattr(chat_completion, "model", None), getattr(chat_completion, "usage", None))
         return chat_completion.choices[0].message.content
+    except LLMCancelledError:
+        outcome = "cancelled"
+        raise
+    except CircuitOpenError:
+        outcome = "circuit_open"
+        raise
     except Exception as e:
         raise RuntimeError(f"Groq API call failed: {e}")
+    finally:
+        metrics.LLM_CALLS.observe(time.perf_counter() - started, where, outcome)
+
 
+_END = object()
 
-def ensure_json_response(text: str):
-    # Remove markdown code block fences if present
-    if text.strip().startswith("```json"):
-        text = text.strip()[len("```json"):].strip()
-        if text.strip().endswith("```"):
-            text = text.strip()[:-len("```")].strip()
-    elif text.strip().startswith("```"):
-        text = text.strip()[len("```"):].strip()
-        if text.strip().endswith("```"):
-            text = text.strip()[:-len("```")].strip()
 
-    # Try to parse model output as JSON, otherwise attempt extraction of object or array
-    # 1) Direct parse
+def stream_groq(prompt: str = None, where: str = "default", client_gone=None, messages=None, **gen):
+    # Same as call_groq, but yields content deltas as the model produces them
+    if messages is None:
+        messages = [{"role": "user", "content": prompt}]
     try:
-        return json.loads(text)
-    except Exception:
-        pass
-    # 2) Extract first {{...}}
-    start = text.find("{")
-    end = text.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        snippet = text[start : end + 1]
-        try:
-            return json.loads(snippet)
-        except Exception:
-            pass
-    # 3) Extract first [...]
-    lb = text.find("[")
-    rb = text.rfind("]")
-    if lb != -1 and rb != -1 and rb > lb:
-        snippet = text[lb : rb + 1]
-        try:
-            return json.loads(snippet)
-        except Exception:
-            pass
-    return {"error": "Model did not return valid JSON", "raw": text}
+        # only the waits for the next delta count as upstream time, not what the caller does with it
+        deltas = iter(_ROUTER.stream_chat(messages, endpoint=where, client_gone=client_gone, **gen))
+        while True:
+            with metrics.phase("upstream"):
+                delta = next(deltas, _END)
+            if delta is _END:
+                break
+            yield delta
+    except (LLMCancelledError, CircuitOpenError):
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Groq API call failed: {e}")
+
 
+def ensure_json_response(text: str, where: str = "default"):
+    # One scan for the first JSON value (fences, prose, comments, trailing commas and a cut-off tail handled)
+    started = time.perf_counter()
+    try:
+        data, outcome = extract_json(text)
+    except ValueError:
+        _JSON_STATS.record(where, "failed", time.perf_counter() - started)
+        metrics.add_phase("parse", time.perf_counter() - started)
+        return {"error": "Model did not return valid JSON", "raw": text}
+    _JSON_STATS.record(where, outcome, time.perf_counter() - started)
+    metrics.add_phase("parse", time.perf_counter() - started)
+    return data
+
+
+def _wrap_question(data):
+    # Quiz replies sometimes come back as the bare question object
+    if isinstance(data, dict) and "question" not in data:
+        return {"question": data}
+    return data
+
+
+def call_groq_json(messages, where: str, schema=None, client_gone=None, prepare=None, gen=None):
+    # Parsed, schema-checked JSON reply. A reply that doesn't parse or misses the schema gets
+    # one follow-up turn naming the problems (same prompt prefix, so it is cheap to resend);
+    # if that is no better the first reply is returned and the caller's fallbacks apply.
+    gen = dict(gen or {})
+    try:
+        txt = call_groq(messages=messages, where=where, client_gone=client_gone, **gen)
+    except RuntimeError as e:
+        # Groq rejects a JSON-mode completion that isn't valid JSON; ask again without JSON mode
+        if "response_format" not in gen or "json_validate_failed" not in str(e):
+            raise
+        _JSON_STATS.record(where, "json_mode_rejected")
+        gen.pop("response_format")
+        txt = call_groq(messages=messages, where=where, client_gone=client_gone, **gen)
+    data = ensure_json_response(txt, where)
+    if prepare is not None and not (isinstance(data, dict) and data.get("error")):
+        data = prepare(data)
+    with metrics.phase("parse"):
+        problems = _json_problems(data, schema)
+    if not problems:
+        return data
+    _JSON_STATS.record(where, "schema_miss")
+    if not JSON_REPAIR:
+        return data
+    _JSON_STATS.record(where, "repair_requests")
+    fix = messages + [
+        {"role": "assistant", "content": txt[:4000]},
+        {"role": "user", "content": "Your reply did not match the required JSON schema:\n- " + "\n- ".join(problems[:5])
+                                    + "\nReply again with only the corrected JSON object."},
+    ]
+    try:
+        fixed = ensure_json_response(call_groq(messages=fix, where=where, client_gone=client_gone,
+                                               escalate=JSON_REPAIR_ESCALATE, **gen), where)
+    except LLMCancelledError:
+        raise
+    except Exception as e:
+        print(f"[WARN] JSON repair request failed ({where}): {e}")
+        return data
+    if prepare is not None and not (isinstance(fixed, dict) and fixed.get("error")):
+        fixed = prepare(fixed)
+    if not _json_problems(fixed, schema):
+        _JSON_STATS.record(where, "repair_fixed")
+        return fixed
+    return fixed if isinstance(data, dict) and data.get("error") else data
+
+
+def _json_problems(data, schema):
+    if isinstance(data, dict) and data.get("error"):
+        return ["the reply was not valid JSON"]
+    return validate(data, schema) if schema else []
+
+
+# In-memory LRU cache with TTL for faster repeat responses.
+# Bounded by entry count and by approximate payload bytes (market/compare payloads are large).
+_CACHE = TTLCache(
+    max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.environ.get("CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+)
+
+# Persistent tier under the memory cache: survives restarts and is shared by all
+# gunicorn workers on the host. Set CACHE_DB="" to disable.
+CACHE_DB = os.environ.get("CACHE_DB", os.path.join(".cache", "careerlens.sqlite3"))
+_DISK_CACHE = None
+if CACHE_DB:
+    try:
+        _DISK_CACHE = DiskCache(CACHE_DB, compact_interval=float(os.environ.get("CACHE_DB_COMPACT_INTERVAL", "600")))
+    except Exception as e:
+        print(f"[WARN] Disk cache disabled: {e}")
 
-# Simple in-memory cache with TTL for faster repeat responses
-_CACHE: dict = {}
-_CACHE_LIMIT = 256
+_CACHE_LOOKUPS = metrics.REGISTRY.counter("careerlens_response_cache_lookups_total",
+                                          "Response cache lookups by the tier that answered (memory, disk or miss)", ("result",))
 
 def _cache_get(key: str):
-    now = time.time()
-    entry = _CACHE.get(key)
-    if not entry:
-        return None
-    exp, val = entry
-    if exp < now:
-        try:
-            del _CACHE[key]
-        except Exception:
-            pass
+    val = _CACHE.get(key)
+    if val is not None or _DISK_CACHE is None:
+        _CACHE_LOOKUPS.inc("memory" if val is not None else "miss")
+        return val
+    entry = _DISK_CACHE.get_entry(key)
+    if entry is None:
+        _CACHE_LOOKUPS.inc("miss")
         return None
+    _CACHE_LOOKUPS.inc("disk")
+    val, exp = entry
+    # promote into memory for the rest of its lifetime
+    _CACHE.set(key, val, ttl=max(1, exp - time.time()))
     return val
 
-def _cache_set(key: str, value, ttl: int = 900):
-    # TTL defaults to 15 minutes; tighter or looser per endpoint below
+def _cache_set(key: str, value, ttl: int = 900, persist: bool = True, schema=None):
+    # TTL defaults to 15 minutes; tighter or looser per endpoint below.
+    # persist=False keeps an entry out of the disk tier (e.g. resume-derived output).
+    # Error payloads, and replies still missing their schema after the repair turn,
+    # are never cached so a bad completion is retried next time.
+    if _json_problems(value, schema):
+        return
     try:
-        if len(_CACHE) > _CACHE_LIMIT:
-            # naive purge: remove expired or oldest items
-            for k in list(_CACHE.keys())[: len(_CACHE)//2]:
-                _CACHE.pop(k, None)
-        _CACHE[key] = (time.time() + ttl, value)
+        _CACHE.set(key, value, ttl=ttl)
+        if persist and _DISK_CACHE is not None:
+            _DISK_CACHE.set(key, value, ttl=ttl)
     except Exception:
         pass
 
 
-def _heuristic_job_suggestions(resume_text: str, target_role: str = ""):
-    txt = (resume_text or "")
-    low = txt.lower()
-    def has(*keys):
-        return any(k in low for k in keys)
-    # Rough experience level detection
-    level = "entry"
-    if "intern" in low or "internship" in low:
-        level = "entry"
-    else:
-        import re
-        m = re.search(r"(\d+)\+?\s*(years|yrs)", low)
-        years = int(m.group(1)) if m else 0
-        if years >= 7:
-            level = "senior"
-        elif years >= 4:
-            level = "mid"
-        elif years >= 2:
-            level = "junior"
-        else:
-            level = "entry"
-
-    roles = []
-    def add(title, why, score):
-        roles.append({"title": title, "level": level, "why_fit": why, "_score": score})
-
-    # Keyword-based scoring
-    score = 0
-    if has("python", "pandas", "numpy", "sklearn", "sql"):
-        score = sum(1 for k in ["python","pandas","numpy","sql","excel","tableau","power bi"] if k in low)
-        if has("tensorflow","pytorch","scikit"):
-            add("Data Scientist", "ML libraries and data tools present", score + 2)
-        add("Data Analyst", "Data tools (" + ", ".join([k for k in ["sql","excel","tableau","power bi","python"] if k in low]) + ")", score)
-    if has("react", "javascript", "typescript"):
-        score = sum(1 for k in ["react","typescript","javascript","next.js"] if k in low)
-        add("Frontend Developer", "Web stack (" + ", ".join([k for k in ["react","typescript","javascript"] if k in low]) + ")", score)
-    if has("node", "express", "java", "spring", "django", "flask"):
-        score = sum(1 for k in ["node","express","java","spring","django","flask","go",".net"] if k in low)
-        add("Backend Developer", "Backend frameworks present", score)
-    if has("aws", "azure", "gcp", "docker", "kubernetes", "terraform", "ci/cd"):
-        score = sum(1 for k in ["aws","azure","gcp","docker","kubernetes","terraform","jenkins","ci/cd"] if k in low)
-        add("Cloud/DevOps Engineer", "Cloud/DevOps tooling experience", score)
-    if has("figma", "ux", "ui", "sketch"):
-        score = sum(1 for k in ["figma","ux","ui","sketch","wireframe"] if k in low)
-        add("UI/UX Designer", "Design tools and UX keywords", score)
-    if has("excel", "tableau", "power bi") and not any(r["title"].startswith("Data") for r in roles):
-        score = sum(1 for k in ["excel","tableau","power bi","sql"] if k in low)
-        add("Business Analyst", "BI/analytics tools present", score)
-    if has("qa", "testing", "selenium", "cypress"):
-        score = sum(1 for k in ["qa","testing","selenium","cypress","jest"] if k in low)
-        add("QA Engineer", "Test frameworks and QA focus", score)
-    if has("security", "cyber", "soc"):
-        score = sum(1 for k in ["security","cyber","siem","soc","splunk"] if k in low)
-        add("Security Analyst", "Security keywords present", score)
-    if has("marketing", "seo", "content", "social"):
-        score = sum(1 for k in ["marketing","seo","content","social"] if k in low)
-        add("Digital Marketing Specialist", "Marketing stack keywords present", score)
-    if has("salesforce"):
-        add("Salesforce Administrator", "Salesforce keyword present", 1)
-    if has("project management", "scrum", "jira"):
-        add("Project Coordinator", "Project management tools present", 1)
-
-    # Include target role if provided and absent
-    if (target_role or "").strip():
-        tr = (target_role or "").strip()
-        if not any(r["title"].lower() == tr.lower() for r in roles):
-            add(tr, "Matches your target role", 0)
-
-    # De-duplicate by title and sort by score desc
-    uniq = {}
-    for r in roles:
-        t = r["title"].strip()
-        if t and (t not in uniq or r.get("_score", 0) > uniq[t].get("_score", 0)):
-            uniq[t] = r
-    out = list(uniq.values())
-    out.sort(key=lambda x: x.get("_score", 0), reverse=True)
-    # Strip internal keys
-    for r in out:
-        r.pop("_score", None)
-    return out[:4]
-
-
-def _heuristic_matches_from_answers(answers):
+# Cached payloads are also kept serialized and gzipped, so a cache hit is a byte copy with a
+# content-hash ETag. An encoding is reused while the cached object it came from is unchanged.
+API_CACHE_MAX_AGE = int(os.environ.get("API_CACHE_MAX_AGE", "300"))
+_ENCODED = TTLCache(max_entries=int(os.environ.get("ENCODED_CACHE_MAX_ENTRIES", "512")),
+                    max_bytes=int(os.environ.get("ENCODED_CACHE_MAX_BYTES", str(16 * 1024 * 1024))), default_ttl=3600)
+
+
+def _encoded(key: str, source, view=None) -> Asset:
+    hit = _ENCODED.get(key)
+    if hit is not None and hit[0] is source:
+        return hit[1]
+    with metrics.phase("serialize"):
+        data = view(source) if view is not None else source
+        asset = Asset("response.json", json.dumps(data).encode("utf-8"), gzip_level=6, brotli_quality=None)
+    _ENCODED.set(key, (source, asset), size=sum(len(b) for b in asset.bodies.values()))
+    return asset
+
+
+def _cache_key(kind: str, *parts) -> str:
+    raw = "|".join(str(p) for p in parts)
+    return kind + "|" + hashlib.sha1(raw.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def _content_hash(text) -> str:
+    # Stable digest of free text so keys never carry raw resume/JD contents
+    return hashlib.sha256(_norm_text(text).encode("utf-8", errors="ignore")).hexdigest()
+
+
+def _orient_compare(data, swapped: bool):
+    # Flip the two role entries of a compare payload without touching the shared cached copy
+    if not swapped or not isinstance(data, dict) or not isinstance(data.get("roles"), list):
+        return data
+    out = dict(data)
+    out["roles"] = list(reversed(data["roles"]))
+    return out
+
+
+def _swapped_compare(data):
+    # B/A view of a cached A/B payload (its own encoded variant in _send_cached)
+    return _orient_compare(data, True)
+
+
+# Every visitor gets the same opening question for this long (seconds)
+QUIZ_START_TTL = int(os.environ.get("QUIZ_START_TTL", "600"))
+QUIZ_QUESTIONS = 10
+# QUIZ_SPECULATE=1 pre-generates the follow-up question for every option of the current one
+QUIZ_SPECULATE = os.environ.get("QUIZ_SPECULATE", "0") == "1"
+_QUIZ_SPECULATOR = None
+if QUIZ_SPECULATE:
+    _QUIZ_SPECULATOR = Speculator(
+        lambda history, client_gone: generate_quiz_next(history, client_gone),
+        max_inflight=int(os.environ.get("QUIZ_SPECULATE_MAX_INFLIGHT", "4")),
+        max_pending=int(os.environ.get("QUIZ_SPECULATE_MAX_PENDING", "32")),
+        ttl=float(os.environ.get("QUIZ_SPECULATE_TTL", "300")),
+    )
+
+# Adaptive-quiz state lives server-side: after /start the browser only sends {session_id, answer}.
+# QUIZ_SESSION_PERSIST=1 also keeps sessions in the disk cache so they survive a restart.
+QUIZ_SESSION_TTL = int(os.environ.get("QUIZ_SESSION_TTL", "3600"))
+QUIZ_SESSION_PERSIST = os.environ.get("QUIZ_SESSION_PERSIST", "0") == "1"
+_QUIZ_SESSIONS = SessionStore(
+    "quiz_session", ttl=QUIZ_SESSION_TTL,
+    max_entries=int(os.environ.get("QUIZ_SESSION_MAX", "5000")),
+    disk=_DISK_CACHE if QUIZ_SESSION_PERSIST else None,
+)
+# Only the last few question/answer pairs go to the model verbatim; older ones are
+# condensed into a short recap so every step's prompt stays about the same size
+QUIZ_VERBATIM_TURNS = int(os.environ.get("QUIZ_VERBATIM_TURNS", "2"))
+_QUIZ_ANSWER_CHARS = 300
+
+
+# Single-flight: concurrent requests for the same cache key share one upstream call
+_INFLIGHT: dict = {}
+_INFLIGHT_LOCK = threading.Lock()
+_STATS = {"coalesced": 0}
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def _single_flight(key: str, fn, client_gone=None):
+    while True:
+        with _INFLIGHT_LOCK:
+            flight = _INFLIGHT.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                _INFLIGHT[key] = flight
+            else:
+                _STATS["coalesced"] += 1
+        if leader:
+            try:
+                # a leader that just finished may have filled the cache after our caller missed it
+                cached = _cache_get(key)
+                flight.value = cached if cached is not None else fn()
+                return flight.value
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with _INFLIGHT_LOCK:
+                    _INFLIGHT.pop(key, None)
+                flight.done.set()
+        while not flight.done.wait(0.25):
+            if client_gone is not None and client_gone():
+                raise LLMCancelledError("Client disconnected")
+        if isinstance(flight.error, LLMCancelledError):
+            # the leader's client went away; take over rather than inherit its cancellation
+            continue
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+
+def _normalize_recommend(data, role: str):
+    # Normalize common key variants to the expected structure; returns (payload, cacheable)
+    if not isinstance(data, dict):
+        return data, False
+    normalized = {
+        "role": data.get("role") or role,
+        "learning_paths": data.get("learning_paths") or data.get("learning_path") or data.get("paths") or [],
+        "roadmap_weeks": data.get("roadmap_weeks") or data.get("roadmap") or data.get("plan") or [],
+        "resume_tips": data.get("resume_tips") or data.get("resume_advice") or data.get("tips") or [],
+    }
+    # Coerce types
+    if not isinstance(normalized["learning_paths"], list):
+        normalized["learning_paths"] = [normalized["learning_paths"]]
+    if not isinstance(normalized["roadmap_weeks"], list):
+        normalized["roadmap_weeks"] = [normalized["roadmap_weeks"]]
+    if not isinstance(normalized["resume_tips"], list):
+        normalized["resume_tips"] = [normalized["resume_tips"]]
+    return normalized, bool(normalized["roadmap_weeks"])
+
+
+def _normalize_roadmap_week(w):
     try:
-        txt = " \n ".join([str(a) for a in (answers or [])])
+        wk = int(w.get("week"))
+        skills = w.get("skills") or []
+        if not isinstance(skills, list):
+            skills = [skills]
+        # coerce to short strings
+        skills = [str(s).strip() for s in skills if str(s).strip()]
+        out = {"week": wk, "skills": skills[:4]}
+        focus = str(w.get("focus_description") or "").strip()
+        if focus:
+            out["focus_description"] = focus
+        return out
     except Exception:
-        txt = str(answers)
-    low = txt.lower()
-    found = []
-    def score_for(keys):
-        return sum(1 for k in keys if k in low)
-    candidates = []
-    # Role candidate tuples: (title, keywords, personality, extra_skills)
-    candidates.append(("Data Analyst", ["python","sql","excel","tableau","power bi","statistics","pandas"], ["Analytical","Detail-oriented"], ["SQL","Excel"]))
-    candidates.append(("Data Scientist", ["tensorflow","pytorch","ml","machine learning","sklearn","deep learning"], ["Curious","Analytical"], ["ML","Python"]))
-    candidates.append(("Frontend Developer", ["react","javascript","typescript","css","html","ui"], ["Creative","User-focused"], ["React","JS"]))
-    candidates.append(("Backend Developer", ["node","express","java","spring","django","flask","api"], ["System-thinking","Problem-solving"], ["APIs","Databases"]))
-    candidates.append(("UI/UX Designer", ["figma","ui","ux","wireframe","prototype","design"], ["Empathy","Creative"], ["Figma","Prototyping"]))
-    candidates.append(("Business Analyst", ["excel","tableau","power bi","stakeholder","requirements"], ["Communicator","Analytical"], ["Dashboards","KPIs"]))
-    candidates.append(("Cloud/DevOps Engineer", ["aws","azure","gcp","docker","kubernetes","ci/cd","terraform"], ["Pragmatic","Reliable"], ["CI/CD","Cloud"]))
-    for title, keys, persona, extra in candidates:
-        sc = score_for(keys)
-        if sc:
-            found.append({
-                "title": title,
-                "score": sc,
-                "personality": persona,
-                "skills": [k.upper() for k in keys if k in low][:5] or extra,
-            })
-    if not found:
-        # default generic
-        found.append({"title": "Generalist (Explore)", "score": 1, "personality": ["Curious"], "skills": ["Communication","Basics"]})
-    found.sort(key=lambda x: x["score"], reverse=True)
-    matches = []
-    for f in found[:3]:
-        conf = min(90, 40 + f["score"] * 10)
-        matches.append({
-            "role": f["title"],
-            "confidence": conf,
-            "reasoning": f"Signals found in your answers (e.g., {', '.join(f['skills'])}).",
-            "personality_fit": f["personality"],
-            "skills_fit": f["skills"],
-        })
-    return matches
+        return None
+
+
+def _normalize_roadmap(data, job: str, weeks: int):
+    # Returns (payload, cacheable)
+    job_out = data.get("job") if isinstance(data, dict) else None
+    weeks_out = []
+    if isinstance(data, dict) and isinstance(data.get("weeks"), list):
+        for w in data.get("weeks"):
+            w = _normalize_roadmap_week(w)
+            if w is not None:
+                weeks_out.append(w)
+    # Fallback if model output was malformed
+    if not weeks_out:
+        weeks_out = [{"week": i+1, "skills": ["Research role", "Core fundamentals"]} for i in range(weeks)]
+        return {"job": job_out or job, "weeks": weeks_out}, False
+    return {"job": job_out or job, "weeks": weeks_out}, True
+
+
+def generate_market(role: str, region: str, client_gone=None):
+    # Market insights for one role/region straight from the model (no caching)
+    template = PROMPTS["market"]
+    data = call_groq_json(template.messages(role=role, region=region), "market", template.schema, client_gone,
+                          gen=template.generation())
+    # Remove skill_gaps if present to keep response consistent
+    if isinstance(data, dict) and "skill_gaps" in data:
+        try:
+            del data["skill_gaps"]
+        except Exception:
+            pass
+    return data
+
+
+def _market_key(role: str, region: str) -> str:
+    return _cache_key("market", PROMPTS["market"].hash, _norm_role(role), _norm_text(region or "global"))
+
+
+# Precomputed market insights (built with `python insights_index.py build`), loaded on the
+# first request. MARKET_INDEX_REFRESH=0 keeps its background refresher off in this process.
+MARKET_INDEX_REFRESH = os.environ.get("MARKET_INDEX_REFRESH", "1") != "0"
+_MARKET_INDEX = None
+
+# Threads, the static asset cache and the market index start with the first request, not at
+# import: CLIs and tests import server, and a spawned batch worker re-runs `python server.py`'s
+# module, so importing it has to stay cheap
+_BACKGROUND_STARTED = False
+_BACKGROUND_LOCK = threading.Lock()
+
+
+def _start_background():
+    # Idempotent and cheap after the first call; every request makes it
+    global _STATIC, _MARKET_INDEX, _BACKGROUND_STARTED
+    if _BACKGROUND_STARTED:
+        return
+    with _BACKGROUND_LOCK:
+        if _BACKGROUND_STARTED:
+            return
+        _HEALTH.start()
+        if STATIC_CACHE:
+            try:
+                _STATIC = StaticAssets(STATIC_ROOT, _PRETTY_ROUTES)
+            except Exception as e:
+                print(f"[WARN] Static asset cache disabled: {e}")
+        if MARKET_INDEX_PATH:
+            try:
+                index = MarketIndex(MARKET_INDEX_PATH, _market_key)
+                if MARKET_INDEX_REFRESH:
+                    index.start_refresher(generate_market)
+                _MARKET_INDEX = index
+            except Exception as e:
+                print(f"[WARN] Market index disabled: {e}")
+        _BACKGROUND_STARTED = True
+
+
+def analyze_resume(resume_text: str, target_role: str, job_desc: str = "", local: dict = None, client_gone=None):
+    # Numbers are computed locally when we have a JD or a known role; the model writes the prose (no caching)
+    if local is None:
+        local = _SKILLS.score_resume(resume_text, target_role, job_desc)
+    # The prompt gets a deduplicated copy cut to a token budget; scoring above saw the full text
+    prompt_resume, resume_meta = trim_for_prompt(resume_text, RESUME_TOKEN_BUDGET, "resume")
+    prompt_jd, jd_meta = trim_for_prompt(job_desc, JD_TOKEN_BUDGET, "job")
+    if local:
+        template = PROMPTS["resume_feedback"]
+        messages = template.messages(target_role=target_role, resume=prompt_resume, job_description=prompt_jd,
+                                     ats_score_percent=local["ats_score_percent"],
+                                     missing_keywords=", ".join(local["missing_keywords"]) or "none")
+    else:
+        template = PROMPTS["resume"]
+        messages = template.messages(target_role=target_role, resume=prompt_resume, job_description=prompt_jd)
+    data = call_groq_json(messages, "resume", template.schema, client_gone, gen=template.generation())
+    if isinstance(data, dict):
+        data.update(local)
+        if not data.get("job_suggestions"):
+            data["job_suggestions"] = _heuristic_job_suggestions(resume_text, target_role)
+        data["meta"] = {"resume": resume_meta, "job_description": jd_meta}
+    return data
+
+
+def _resume_key(resume_text: str, target_role: str, job_desc: str) -> str:
+    # Keyed by content digests so keys never carry resume/JD text
+    return _cache_key("resume", fingerprint("resume", "resume_feedback"), _content_hash(resume_text), _norm_role(target_role),
+                      _content_hash(job_desc))
+
+
+def _batch_cache_get(job: dict):
+    # batch.run_batch hooks: batch feedback shares /api/resume's cache entries
+    return _cache_get(_resume_key(job["resume_text"], job["target_role"], job["job_description"]))
+
+
+def _batch_cache_set(job: dict, data):
+    _cache_set(_resume_key(job["resume_text"], job["target_role"], job["job_description"]), data, ttl=1800, persist=False)
+
+
+def _clip(text, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "\u2026"
+
+
+def _compact_quiz_history(history):
+    # Older turns as one recap line per question ("Q3: <question> -> <answer>"), the rest verbatim
+    keep = max(0, QUIZ_VERBATIM_TURNS) * 2
+    cut = max(0, len(history) - keep)
+    cut -= cut % 2  # never split a question from its answer
+    older, recent = history[:cut], history[cut:]
+    messages = []
+    if older:
+        lines = []
+        for n in range(0, len(older), 2):
+            q = _clip(older[n].get("content"), 90)
+            a = _clip(older[n + 1].get("content"), 120) if n + 1 < len(older) else ""
+            lines.append(f"Q{n // 2 + 1}: {q} -> {a}")
+        messages.append({"role": "system", "content": "Earlier in this quiz (condensed):\n" + "\n".join(lines)})
+    for msg in recent:
+        messages.append({"role": msg["role"], "content": msg["content"]})
+    return messages
+
+
+def generate_quiz_next(history, client_gone=None):
+    # Next adaptive-quiz question for a conversation history straight from the model (no caching)
+    # Prepare the conversation for the AI
+    template = PROMPTS["adaptive_quiz_next"]
+    messages_for_groq = template.messages(_compact_quiz_history(history), number=len(history) // 2 + 1)
+    # Ensure the response adheres to the {"question": {...}} schema
+    return call_groq_json(messages_for_groq, "adaptive_quiz_next", template.schema, client_gone, prepare=_wrap_question,
+                          gen=template.generation())
+
+
+def _quiz_history_key(history) -> str:
+    turns = [[m.get("role"), " ".join(str(m.get("content") or "").split())] for m in history]
+    return _cache_key("quiz_next", PROMPTS["adaptive_quiz_next"].hash, json.dumps(turns))
+
+
+def _next_quiz_question(history, client_gone=None):
+    # A speculated answer for exactly this history if one was prepared, else a fresh completion
+    data = None
+    if _QUIZ_SPECULATOR is not None and len(history) >= 2:
+        data = _QUIZ_SPECULATOR.take(_quiz_history_key(history), _quiz_history_key(history[:-2]),
+                                     deadline_for("adaptive_quiz_next"), client_gone)
+    if data is None:
+        data = generate_quiz_next(history, client_gone)
+    return data
+
+
+def _start_quiz_session(data):
+    # Response for /start: the shared opening question plus a fresh session that remembers it
+    if not isinstance(data, dict) or not isinstance(data.get("question"), dict):
+        return data
+    sid = _QUIZ_SESSIONS.create({"history": [], "question": data["question"], "last": None})
+    return dict(data, session_id=sid, question_number=1)
+
+
+def _speculate_quiz_next(history, question):
+    # Opt-in: while the user reads question N, generate N+1 for each of its options
+    if _QUIZ_SPECULATOR is None or not isinstance(question, dict):
+        return
+    if len(history) // 2 + 1 >= QUIZ_QUESTIONS:
+        return
+    parent = _quiz_history_key(history)
+    for opt in (question.get("options") or [])[:5]:
+        nxt = list(history) + [{"role": "assistant", "content": str(question.get("text") or "")}, {"role": "user", "content": _clip(opt, _QUIZ_ANSWER_CHARS)}]
+        _QUIZ_SPECULATOR.launch(parent, _quiz_history_key(nxt), nxt)
+
+
+STATIC_ROOT = os.path.join(os.getcwd(), "static")
+# pretty routes -> static pages
+_PRETTY_ROUTES = {
+    "/": "index.html",
+    "/quiz": "quiz.html",
+    "/insights": "insights.html",
+    "/recommend": "recommend.html",
+    "/compare": "compare.html",
+    "/resume": "resume.html",
+    "/grow": "grow.html",
+}
+# Pages and assets are read, fingerprinted and compressed once (on the first request) and served
+# from memory. STATIC_CACHE=0 reads them from disk on every request instead (edits show up without a restart).
+STATIC_CACHE = os.environ.get("STATIC_CACHE", "1") != "0"
+_STATIC = None
+# Idle keep-alive connections are closed after this many seconds
+KEEPALIVE_TIMEOUT = float(os.environ.get("KEEPALIVE_TIMEOUT", "15"))
+# Unread request bodies up to this size are drained so the connection can be reused
+_MAX_DRAIN = 64 * 1024
+
+# Health routes that also answer HEAD
+_HEAD_ROUTES = frozenset({"/api/live", "/api/ready", "/api/ping"})
+
+# Route labels for /api/metrics stay bounded: known API paths, "/api/other" and "static"
+_API_ROUTES = frozenset({
+    "/api/ping", "/api/live", "/api/ready", "/api/stats", "/api/metrics", "/api/quiz", "/api/adaptive_quiz/start", "/api/adaptive_quiz/next",
+    "/api/market", "/api/recommend", "/api/compare", "/api/resume/analyze", "/api/resume/score",
+    "/api/resume/batch", "/api/roadmap",
+})
+
+
+def _route_label(path: str) -> str:
+    path = path.split("?", 1)[0].rstrip("/") or "/"
+    if path in _API_ROUTES:
+        return path
+    return "/api/other" if path.startswith("/api/") else "static"
+
+
+@metrics.REGISTRY.collector
+def _collect_metrics():
+    # Scrape-time numbers the caches, model clients and breakers already keep
+    tiers = {"memory": _CACHE.stats()}
+    if _DISK_CACHE is not None:
+        tiers["disk"] = _DISK_CACHE.stats()
+    yield ("careerlens_cache_hits_total", "counter", "Cache hits per tier", [({"tier": t}, s["hits"]) for t, s in tiers.items()])
+    yield ("careerlens_cache_misses_total", "counter", "Cache misses per tier", [({"tier": t}, s["misses"]) for t, s in tiers.items()])
+    yield ("careerlens_cache_hit_ratio", "gauge", "Hits over lookups per tier since start", [({"tier": t}, s["hit_ratio"]) for t, s in tiers.items()])
+    yield ("careerlens_cache_entries", "gauge", "Entries per cache tier", [({"tier": t}, s["entries"]) for t, s in tiers.items()])
+    yield ("careerlens_cache_bytes", "gauge", "Bytes held by the memory cache", [({"tier": "memory"}, tiers["memory"]["bytes"])])
+    yield ("careerlens_coalesced_total", "counter", "Requests that shared another request's in-flight upstream call",
+           [({}, _STATS["coalesced"])])
+    health = _HEALTH.status()["providers"].items()
+    yield ("careerlens_upstream_up", "gauge", "1 while the provider's last health probe succeeded and is fresh",
+           [({"provider": p}, int(s["ok"])) for p, s in health])
+    yield ("careerlens_upstream_last_success_age_seconds", "gauge", "Seconds since the provider last answered a health probe",
+           [({"provider": p}, s["last_success_age"]) for p, s in health])
+    llm = _ROUTER.stats()
+    providers = llm["providers"].items()
+    yield ("careerlens_llm_inflight", "gauge", "Upstream calls holding a slot", [({"provider": p}, s["inflight"]) for p, s in providers])
+    yield ("careerlens_llm_waiting", "gauge", "Upstream calls queued for a slot", [({"provider": p}, s["waiting"]) for p, s in providers])
+    yield ("careerlens_llm_timeouts_total", "counter", "Upstream calls that ran past their deadline", [({"provider": p}, s["timeouts"]) for p, s in providers])
+    yield ("careerlens_llm_breaker_open", "gauge", "1 while a model's circuit breaker is open or half-open",
+           [({"model": m}, int(b["state"] != "closed")) for m, b in llm["breakers"].items()])
+    endpoints = llm["endpoints"].items()
+    for key, help in (("retries", "Retries on the same model"), ("fallbacks", "Calls served by a later model in the chain"),
+                      ("hedged", "Hedge requests sent"), ("failed", "Calls every model in the chain failed")):
+        yield (f"careerlens_llm_{key}_total", "counter", help, [({"endpoint": ep}, c[key]) for ep, c in endpoints])
 
 
 class CareerLensHandler(SimpleHTTPRequestHandler):
+    # HTTP/1.1 keeps a connection open across a page's asset requests, so every
+    # response carries a Content-Length or closes the connection (SSE, batch)
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+    # headers and body go out in separate writes; without this, Nagle + delayed ACK adds ~40ms per reused connection
+    disable_nagle_algorithm = True
 
     def translate_path(self, path):
-        # Serve files from ./static by default
+        # Serve files from ./static by default (disk path, used when the memory cache is off or misses)
         path = path.split("?", 1)[0]
         path = path.split("#", 1)[0]
         path = posixpath.normpath(urllib.parse.unquote(path))
-        if path == "/":
-            return os.path.join(os.getcwd(), "static", "index.html")
-        # pretty routes -> static pages
-        pretty = {
-            "/quiz": "quiz.html",
-            "/insights": "insights.html",
-            "/recommend": "recommend.html",
-            "/compare": "compare.html",
-            "/resume": "resume.html",
-            "/grow": "grow.html",
-        }
-        if path in pretty:
-            return os.path.join(os.getcwd(), "static", pretty[path])
+        if path in _PRETTY_ROUTES:
+            return os.path.join(STATIC_ROOT, _PRETTY_ROUTES[path])
         if path.startswith("/static/"):
-            return os.path.join(os.getcwd(), path.lstrip("/"))
+            path = path[len("/static"):]
         # fallback to static
-        return os.path.join(os.getcwd(), "static", path.lstrip("/"))
+        return os.path.join(STATIC_ROOT, path.lstrip("/"))
+
+    def send_response(self, code, message=None):
+        req = metrics.current()
+        if req is not None:
+            req.status = code
+        super().send_response(code, message)
+
+    def log_request(self, code="-", size="-"):
+        # Access lines come from metrics.track_request as sampled JSON logs instead
+        pass
+
+    def log_error(self, format, *args):
+        metrics.log_event("http_error", level="warn", client=self.client_address[0], message=format % args)
+
+    def _send_static(self, head: bool = False) -> bool:
+        found = _STATIC.response(self.path, self.headers) if _STATIC is not None else None
+        if found is None:
+            return False
+        code, headers, body = found
+        try:
+            self.send_response(code)
+            for key, value in headers:
+                self.send_header(key, value)
+            self.end_headers()
+            if body and not head:
+                self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        return True
+
+    def do_HEAD(self):
+        _start_background()
+        if self.path.split("?", 1)[0].rstrip("/") in _HEAD_ROUTES:
+            # load balancers often probe with HEAD: same status and headers, no body
+            self._head_only = True
+            try:
+                return self.do_GET()
+            finally:
+                self._head_only = False
+        if self._send_static(head=True):
+            return
+        return super().do_HEAD()
 
     def do_OPTIONS(self):
         # basic CORS for potential local cross-origin use
@@ -271,153 +725,250 @@ class CareerLensHandler(SimpleHTTPRequestHandler):
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Content-Length", "0")
         self.end_headers()
 
     def _json(self, data: dict, code: int = 200):
-        out = json.dumps(data).encode("utf-8")
-        self.send_response(code)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Access-Control-Allow-Origin", "*")
+        with metrics.phase("serialize"):
+            out = json.dumps(data).encode("utf-8")
+        try:
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Length", str(len(out)))
+            if self.close_connection:
+                self.send_header("Connection", "close")
+            self.end_headers()
+            if not getattr(self, "_head_only", False):
+                self.wfile.write(out)
+        except (BrokenPipeError, ConnectionResetError):
+            # client hung up (e.g. its upstream call was cancelled); nothing left to deliver
+            self.close_connection = True
+
+    def _send_cached(self, key: str, source, view=None, verify: bool = False):
+        # A payload from the response cache (or market index): pre-encoded, ETag'd, short max-age, 304 when
+        # the client has it. verify=True is for fresh results: only what the endpoint actually cached qualifies.
+        if not isinstance(source, dict) or source.get("error") or (verify and _CACHE.peek(key) is not source):
+            self._json(view(source) if view is not None else source)
+            return
+        variant = key if view is None else f"{key}|{view.__name__}"
+        code, headers, body = _encoded(variant, source, view).respond(self.headers, f"public, max-age={API_CACHE_MAX_AGE}")
+        try:
+            self.send_response(code)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            for name, value in headers:
+                self.send_header(name, value)
+            if self.close_connection:
+                self.send_header("Connection", "close")
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _client_gone(self):
+        return socket_closed(getattr(self, "connection", None))
+
+    def _wants_stream(self, body: dict) -> bool:
+        return bool(body.get("stream")) or "text/event-stream" in (self.headers.get("Accept") or "")
+
+    def _sse_start(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
         self.send_header("Cache-Control", "no-store")
-        self.send_header("Content-Length", str(len(out)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        # stop reverse proxies from buffering the stream
+        self.send_header("X-Accel-Buffering", "no")
+        self.send_header("Connection", "close")
         self.end_headers()
-        self.wfile.write(out)
+        self.close_connection = True
+
+    def _sse(self, event: str, data):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _stream_weeks(self, where, messages, gen, cache_key, array_keys, out_key, normalize_item, finish):
+        # SSE: one "week" event per completed array element, then "done" with the full payload
+        try:
+            self._sse_start()
+            cached = _cache_get(cache_key)
+            if cached is not None:
+                for item in cached.get(out_key) or []:
+                    self._sse("week", item)
+                self._sse("done", cached)
+                return
+            parser = ArrayItemStream(array_keys)
+            parts = []
+            for delta in stream_groq(messages=messages, where=where, client_gone=self._client_gone, **gen):
+                parts.append(delta)
+                for _, item in parser.feed(delta):
+                    item = normalize_item(item)
+                    if item is not None:
+                        self._sse("week", item)
+            data, cacheable = finish(ensure_json_response("".join(parts), where))
+            if cacheable:
+                _cache_set(cache_key, data, ttl=3600, schema=PROMPTS[where].schema)
+            self._sse("done", data)
+        except (BrokenPipeError, ConnectionResetError, LLMCancelledError):
+            self.close_connection = True
+        except Exception as e:
+            traceback.print_exc()
+            try:
+                self._sse("error", {"error": str(e), "where": where})
+            except Exception:
+                pass
 
     def _body_json(self):
+        if self.command == "GET":
+            # GET /api/market?role=...&region=... so browsers can cache and revalidate the reply
+            query = urllib.parse.urlsplit(self.path).query
+            return {k: v[-1] for k, v in urllib.parse.parse_qs(query).items()}
         length = int(self.headers.get("Content-Length", "0"))
         raw = self.rfile.read(length) if length > 0 else b"{}"
+        self._body_read = True
         try:
             return json.loads(raw.decode("utf-8"))
         except Exception:
             return {}
 
     def handle_adaptive_quiz_start(self):
-        prompt = f"""
-        You are CareerLens AI, a friendly, encouraging, and creative career guide.
-        Your task is to initiate an adaptive career quiz by asking the very first question.
-        This question should be broad and engaging, suitable for all users to start.
-
-        Output your response as a STRICT JSON object, adhering precisely to the following schema.
-        DO NOT include any additional text, markdown, or commentary outside the JSON object.
-
-        Schema:
-        {{
-          "question": {{
-            "id": "string", // A short, unique identifier for the question (e.g., "start_interest")
-            "text": "string", // The engaging question text
-            "options": ["string", "string", "string", "string"] // 3-5 diverse and creative options. Include an implied "Other"
-          }}
-        }}
-
-        Example creative first question:
-        "If you could have a superpower that directly helped your career, what would it be? (e.g., Instantly Master Any Skill, Perfect Networking, Unlimited Energy, Future Vision for Trends)"
-        """
-        try:
-            txt = call_groq(prompt)
-            print(f"[DEBUG] Raw Groq response (start): {txt[:500]}") # Debug print
-            data = ensure_json_response(txt)
+        # The opening prompt is static, so its answer is shared for a short window
+        cache_key = _cache_key("adaptive_quiz_start", PROMPTS["adaptive_quiz_start"].hash)
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            self._json(_start_quiz_session(cached))
+            _speculate_quiz_next([], cached.get("question"))
+            return
+        def generate():
+            template = PROMPTS["adaptive_quiz_start"]
             # Ensure the response adheres to the {"question": {...}} schema
-            if "question" not in data and isinstance(data, dict):
-                data = {"question": data} # Wrap the question
-            self._json(data)
+            data = call_groq_json(template.messages(), "adaptive_quiz_start", template.schema, self._client_gone,
+                                  prepare=_wrap_question, gen=template.generation())
+            _cache_set(cache_key, data, ttl=QUIZ_START_TTL, schema=template.schema)
+            return data
+        try:
+            data = _single_flight(cache_key, generate, self._client_gone)
+            self._json(_start_quiz_session(data))
+            _speculate_quiz_next([], data.get("question") if isinstance(data, dict) else None)
         except Exception as e:
             traceback.print_exc()
             self._json({"error": str(e), "where": "adaptive_quiz_start"}, 200)
 
     def handle_adaptive_quiz_next(self):
         body = self._body_json()
-        conversation_history = body.get("history", [])
-
-        # Prepare the conversation for the AI
-        messages_for_groq = []
-        for msg in conversation_history:
-            messages_for_groq.append({"role": msg["role"], "content": msg["content"]})
-        
-        # Add a system message to guide the AI for the next question
-        messages_for_groq.append({
-            "role": "system",
-            "content": f"""
-            You are CareerLens AI, a friendly, encouraging, and creative career guide.
-            Your task is to ask the NEXT adaptive question in a 10-question career quiz.
-            Each question and its options should be creatively crafted and directly informed by the user's PREVIOUS answer and the ongoing conversation history.
-            Focus on uncovering career interests, skills, work preferences, and motivations.
-            Maintain a light, engaging, and curious tone.
-
-            Output your response as a STRICT JSON object, adhering precisely to the following schema.
-            DO NOT include any additional text, markdown, or commentary outside the JSON object.
-            Ensure the 'id' for the question is unique for this quiz session.
-
-            Schema:
-            {{
-              "question": {{
-                "id": "string", // A short, unique identifier for the question (e.g., "preferred_challenge", "skill_curiosity")
-                "text": "string", // The engaging, adaptive question text
-                "options": ["string", "string", "string", "string"] // 3-5 diverse and creative options. Include an implied "Other"
-              }}
-            }}
-
-            Constraint:
-            - Avoid asking questions that are too similar to previous ones.
-            - Progressively delve deeper into the user's profile with each question.
-            - You have 10 questions in total for the quiz. You are now being asked to generate question number {len(conversation_history) // 2 + 1}.
-            """
-        })
-        
-        # Append a user message to explicitly ask for the next question
-        messages_for_groq.append({
-            "role": "user",
-            "content": f"Given our conversation so far, what's the next creative question you have for me, along with some fun options? I am on question number {len(conversation_history) // 2 + 1}."
-        })
+        if body.get("session_id") and "history" not in body:
+            return self._adaptive_quiz_session_next(body)
+        # Legacy clients send the whole conversation every step
+        history = [{"role": m["role"], "content": m["content"]} for m in body.get("history", [])]
 
         try:
-            chat_completion = client.chat.completions.create(
-                messages=messages_for_groq,
-                model=GROQ_MODEL,
-            )
-            txt = chat_completion.choices[0].message.content
-            print(f"[DEBUG] Raw Groq response (next): {txt[:500]}") # Debug print
-            data = ensure_json_response(txt)
-            # Ensure the response adheres to the {"question": {...}} schema
-            if "question" not in data and isinstance(data, dict):
-                data = {"question": data} # Wrap the question
+            data = _next_quiz_question(history, self._client_gone)
             self._json(data)
+            _speculate_quiz_next(history, data.get("question") if isinstance(data, dict) else None)
         except Exception as e:
             traceback.print_exc()
             self._json({"error": str(e), "where": "adaptive_quiz_next"}, 200)
 
-
-
+    def _adaptive_quiz_session_next(self, body):
+        sid = str(body.get("session_id"))
+        answer = _clip(body.get("answer"), _QUIZ_ANSWER_CHARS)
+        if not answer:
+            return self._json({"error": "Missing answer", "where": "adaptive_quiz_next"}, 200)
+        with _QUIZ_SESSIONS.lock(sid):
+            session = _QUIZ_SESSIONS.get(sid)
+            if session is None:
+                # client falls back to resending its own history
+                return self._json({"error": "Quiz session expired", "where": "adaptive_quiz_next", "session_expired": True}, 200)
+            last = session.get("last")
+            if last and last.get("question_id") == body.get("question_id") and last.get("answer") == answer:
+                return self._json(last["reply"])  # retried request: same answer to the same question
+            question = session.get("question") or {}
+            if len(session["history"]) // 2 + 1 >= QUIZ_QUESTIONS:
+                return self._json({"error": "Quiz already complete", "where": "adaptive_quiz_next"}, 200)
+            history = session["history"] + [{"role": "assistant", "content": str(question.get("text") or "")},
+                                             {"role": "user", "content": answer}]
+            try:
+                data = _next_quiz_question(history, self._client_gone)
+            except Exception as e:
+                traceback.print_exc()
+                return self._json({"error": str(e), "where": "adaptive_quiz_next"}, 200)
+            if not isinstance(data, dict) or not isinstance(data.get("question"), dict):
+                return self._json(data)  # session unchanged, so the same answer can be resent
+            reply = dict(data, session_id=sid, question_number=len(history) // 2 + 1)
+            session.update(history=history, question=data["question"],
+                           last={"question_id": question.get("id"), "answer": answer, "reply": reply})
+            _QUIZ_SESSIONS.save(sid, session)
+        self._json(reply)
+        _speculate_quiz_next(history, data["question"])
 
     def do_GET(self):
-        if self.path == "/api/ping":
+        _start_background()
+        with metrics.track_request(_route_label(self.path), "GET"):
+            self._do_get()
+
+    def do_POST(self):
+        _start_background()
+        self._body_read = False
+        with metrics.track_request(_route_label(self.path), "POST"):
+            self._do_post()
+        if not self._body_read and not self.close_connection:
+            # A handler that never read its body (adaptive_quiz/start) would leave it on a
+            # keep-alive connection to be parsed as the next request line
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > _MAX_DRAIN:
+                self.close_connection = True
+            elif length > 0:
+                self.rfile.read(length)
+
+    def _do_get(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/api/live":
+            # Liveness: the process is up and serving; says nothing about the upstream
+            self._json({"ok": True, "uptime": round(_HEALTH.uptime(), 1)})
+            return
+        if path == "/api/ready":
+            _HEALTH.wait_first(deadline_for("ping"))
+            status = _HEALTH.status()
+            self._json(status, 200 if status["ready"] else 503)
+            return
+        if path == "/api/ping":
+            # Same cached status in the shape shared.js reads; no upstream call per request
+            _HEALTH.wait_first(deadline_for("ping"))
+            status = _HEALTH.status()
+            out = {"ok": status["ready"], "providers": status["providers"]}
+            if not status["ready"]:
+                out["error"] = status["error"]
+            self._json(out)
+            return
+        if path == "/api/metrics":
+            out = metrics.REGISTRY.render().encode("utf-8")
             self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Length", str(len(out)))
             self.end_headers()
-            print("[DEBUG] Pinging Groq API...") # Debug print
-            status = {"ok": False, "error": "AI connectivity check failed"}
-            try:
-                # Perform a lightweight call to check Groq API connectivity
-                _ = client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": "ping",
-                        }
-                    ],
-                    model=GROQ_MODEL,
-                    max_tokens=1 # Request minimal output
-                )
-                status = {"ok": True}
-                print("[DEBUG] Groq API ping successful.") # Debug print
-            except Exception as e:
-                status["error"] = str(e)
-                print(f"[DEBUG] Groq API ping failed: {e}") # Debug print
-            self.wfile.write(json.dumps(status).encode("utf-8"))
+            self.wfile.write(out)
+            return
+        if path == "/api/market":
+            self.handle_market()
+            return
+        if path == "/api/compare":
+            self.handle_compare()
+            return
+        if path == "/api/stats":
+            self._json({"coalesced": _STATS["coalesced"], "cache": _CACHE.stats(), "disk_cache": _DISK_CACHE.stats() if _DISK_CACHE else None,
+                        "market_index": _MARKET_INDEX.stats() if _MARKET_INDEX is not None else None, "llm": _ROUTER.stats(),
+                        "quiz_speculation": _QUIZ_SPECULATOR.stats() if _QUIZ_SPECULATOR is not None else None,
+                        "quiz_sessions": _QUIZ_SESSIONS.stats(), "model_json": _JSON_STATS.stats(),
+                        "static": _STATIC.stats() if _STATIC is not None else None, "encoded_responses": _ENCODED.stats(),
+                        "health": _HEALTH.status()})
+            return
+        if self._send_static():
             return
         return super().do_GET()
 
-    def do_POST(self):
+    def _do_post(self):
         # Normalize trailing slash for robustness
         path = self.path.rstrip('/') or '/'
         if path == "/api/quiz":
@@ -441,10 +992,17 @@ class CareerLensHandler(SimpleHTTPRequestHandler):
         if path == "/api/resume/analyze":
             self.handle_resume_analyze()
             return
+        if path == "/api/resume/score":
+            self.handle_resume_score()
+            return
+        if path.split("?", 1)[0].rstrip("/") == "/api/resume/batch":
+            self.handle_resume_batch()
+            return
         if path == "/api/roadmap":
             self.handle_roadmap()
             return
-        # not found
+        # not found; the body was never read, so don't reuse the connection
+        self.close_connection = True
         self._json({"error": "Not found"}, 404)
 
     def handle_quiz(self):
@@ -454,41 +1012,9 @@ class CareerLensHandler(SimpleHTTPRequestHandler):
         # Prepare heuristic matches early
         base_matches = _heuristic_matches_from_answers(answers)
 
-        prompt = f"""
-        You are CareerLens AI, an expert career advisor.
-        A student has completed an adaptive career quiz.
-        Your task is to analyze the provided quiz answers and map them to the top 3 most fitting career roles.
-
-        For EACH of the top 3 roles, provide:
-        - The `role` title (string).
-        - A `confidence` percentage (integer 0-100) reflecting how well the answers align with the role.
-        - `reasoning`: A concise (1-2 sentences) explanation of why this role fits, based *only* on the provided answers.
-        - `personality_fit`: A list of 1-3 personality traits (strings) evident from the answers that suit the role.
-        - `skills_fit`: A list of 1-3 skills (strings) evident from the answers that suit the role.
-
-        Output your response as a STRICT JSON object, adhering precisely to the following schema.
-        DO NOT include any additional text, markdown, or commentary outside the JSON.
-        DO NOT invent roles, traits, or skills not suggested by the answers.
-
-        Schema:
-        {{
-          "matches": [
-            {{
-              "role": "string",
-              "confidence": 0-100,
-              "reasoning": "string",
-              "personality_fit": ["string"],
-              "skills_fit": ["string"]
-            }},
-            // ... up to 3 similar objects
-          ]
-        }}
-
-        Quiz Answers: {answers}
-        """.strip()
+        messages = PROMPTS["quiz"].messages(answers="\n".join(f"- {a}" for a in answers))
         try:
-            txt = call_groq(prompt)
-            data = ensure_json_response(txt)
+            data = call_groq_json(messages, "quiz", PROMPTS["quiz"].schema, self._client_gone, gen=PROMPTS["quiz"].generation())
             if not isinstance(data, dict):
                 data = {"raw": data}
             # Ensure matches present
@@ -497,7 +1023,7 @@ class CareerLensHandler(SimpleHTTPRequestHandler):
             # Final safety: always return at least one match
             if not data.get("matches"):
                 data["matches"] = [{
-                    "role": "Generalist (Explore)",
+                    "role": _TAXONOMY.fallback["title"],
                     "confidence": 60,
                     "reasoning": "Based on your answers, exploring broad roles is recommended.",
                     "personality_fit": ["Curious"],
@@ -505,65 +1031,35 @@ class CareerLensHandler(SimpleHTTPRequestHandler):
                 }]
             self._json(data)
         except Exception as e:
-            traceback.print_exc()
-            self._json({"error": str(e), "where": "quiz"}, 200)
+            if not isinstance(e, CircuitOpenError):
+                traceback.print_exc()
+            # every model in the chain failed; the keyword matches still answer the quiz
+            self._json({"matches": base_matches, "warning": f"AI analysis unavailable: {e}"})
 
     def handle_market(self):
 
         body = self._body_json()
         role = body.get("role", "").strip()
         region = body.get("region", "global").strip() or "global"
-        prompt = f"""
-        You are an expert labor market analyst.
-        For the career role: "{role}" in region: "{region}", infer realistic and current market insights.
-        Base your insights strictly on widely known public knowledge and typical market patterns.
-        DO NOT invent sources or reference any proprietary or fictional data.
-        If specific data is not available, use your best professional judgment to provide reasonable estimates.
-
-        Output your response as a STRICT JSON object, adhering precisely to the following schema.
-        DO NOT include any additional text, markdown, or commentary outside the JSON.
-
-        Schema:
-        {{
-          "role": "{role}",
-          "region": "{region}",
-          "demand_trend": {{"years": [int, int, int, int, int], "demand_index": [int, int, int, int, int]}},
-          "salary_by_region": [{{"region": "string", "avg_salary": int}}],
-          "top_skills": ["string", "string", "string", "string", "string"],
-          "growth_forecast": {{
-            "five_year_outlook": "string",
-            "automation_risk_percent": int,
-            "notes": "string"
-          }}
-        }}
-
-        Requirements for accuracy and descriptiveness:
-        - `demand_trend.years` MUST be the last 5 calendar years in chronological order (e.g., [2020, 2021, 2022, 2023, 2024]).
-        - `demand_trend.demand_index` MUST be 5 integers on a 0-100 scale, corresponding to the `years`.
-        - `salary_by_region` should include 1-3 relevant regions, with `avg_salary` as a whole number in USD.
-        - `top_skills` MUST contain exactly 5 relevant and distinct skills.
-        - `growth_forecast.five_year_outlook` should be a detailed paragraph (3-5 sentences) summarizing the outlook, including contributing factors.
-        - `growth_forecast.automation_risk_percent` MUST be an integer between 0 and 100.
-        - `growth_forecast.notes` should be a comprehensive summary (3-5 sentences) discussing key challenges, opportunities, and emerging trends for the role.
-        """.strip()
         # cache key
-        cache_key = "market|" + hashlib.sha1(f"{role}|{region}".encode("utf-8", errors="ignore")).hexdigest()
+        cache_key = _market_key(role, region)
+        # precomputed index first: common role/region pairs never wait on upstream
+        indexed = _MARKET_INDEX.get(cache_key) if _MARKET_INDEX is not None else None
+        if indexed is not None:
+            self._send_cached(cache_key, indexed)
+            return
         cached = _cache_get(cache_key)
         if cached is not None:
-            self._json(cached)
+            self._send_cached(cache_key, cached)
             return
-        try:
-            txt = call_groq(prompt)
-            data = ensure_json_response(txt)
-            # Remove skill_gaps if present to keep response consistent
-            if isinstance(data, dict) and "skill_gaps" in data:
-                try:
-                    del data["skill_gaps"]
-                except Exception:
-                    pass
+        def generate():
+            data = generate_market(role, region, self._client_gone)
             # store in cache (1 hour in FAST mode, else 15 minutes)
-            _cache_set(cache_key, data, ttl=3600)
-            self._json(data)
+            _cache_set(cache_key, data, ttl=3600, schema=PROMPTS["market"].schema)
+            return data
+        try:
+            data = _single_flight(cache_key, generate, self._client_gone)
+            self._send_cached(cache_key, data, verify=True)
         except Exception as e:
             traceback.print_exc()
             self._json({"error": str(e), "where": "market"}, 200)
@@ -581,69 +1077,27 @@ class CareerLensHandler(SimpleHTTPRequestHandler):
             weeks = 8
         if weeks < 1 or weeks > 52:
             weeks = 8
-        prompt = f"""
-        You are an experienced and practical career mentor.
-        Your task is to build a comprehensive, detailed, and actionable learning plan for a learner targeting the career role "{role}".
-        The learner's background is: "{background}".
-        The learning plan should cover a duration of {weeks} weeks.
-
-        Important Constraints:
-        - Provide ONLY free or very low-cost resources (e.g., official documentation, open-source tutorials, popular MOOCs, reputable YouTube channels).
-        - DO NOT suggest specific paid platforms or courses unless they are widely recognized as having free tiers/content.
-        - Ensure all suggested URLs are valid and accessible HTTP/HTTPS links if specific links are provided, otherwise use a descriptive placeholder like "Search for [Topic] tutorial".
-
-        Output your response as a STRICT JSON object, adhering precisely to the following schema.
-        DO NOT include any additional text, markdown, or commentary outside the JSON object.
-
-        Schema:
-        {{
-          "role": "{role}",
-          "learning_paths": [
-            {{
-              "title": "string",
-              "resources": [{{"name":"string","url":"string"}}]
-            }}
-          ],
-          "roadmap_weeks": [
-            {{
-              "week": 1,
-              "focus": "string",
-              "outcomes": ["string"]
-            }}
-          ],
-          "resume_tips": ["string"]
-        }}
-
-        Requirements for accuracy and detail:
-        - `learning_paths`: Include 3 distinct, comprehensive learning paths.
-            - Each path should have a descriptive `title` (e.g., "Foundational Skills in [Area]", "Deep Dive into [Technology]").
-            - Each path should list 3-5 generic but highly relevant `resources`, each with a descriptive `name` and a placeholder `url` if a specific free URL is not globally well-known (e.g., "Google [Skill] Certification").
-        - `roadmap_weeks`: Provide exactly {weeks} weekly entries (week 1 to {weeks}).
-            - Each `week` MUST be an integer from 1 to {weeks}.
-            - `focus`: A detailed paragraph (2-4 sentences) describing the main topic, key concepts, and high-level activities for that week.
-            - `outcomes`: 3-4 specific, measurable skills or knowledge points the learner should achieve by the end of the week.
-        - `resume_tips`: Provide 5-7 highly actionable and practical tips (strings) relevant to optimizing a resume for the target role and the learner's background.
-        """.strip()
+        messages = PROMPTS["recommend"].messages(role=role, background=background, weeks=weeks)
+        cache_key = _cache_key("recommend", PROMPTS["recommend"].hash, _norm_role(role), _norm_text(background), weeks)
+        if self._wants_stream(body):
+            self._stream_weeks("recommend", messages, PROMPTS["recommend"].generation(stream=True, weeks=weeks), cache_key, ("roadmap_weeks", "roadmap", "plan"), "roadmap_weeks",
+                               lambda w: w if isinstance(w, dict) else None,
+                               lambda data: _normalize_recommend(data, role))
+            return
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            self._send_cached(cache_key, cached)
+            return
+        def generate():
+            data = call_groq_json(messages, "recommend", PROMPTS["recommend"].schema, self._client_gone,
+                                  gen=PROMPTS["recommend"].generation(weeks=weeks))
+            data, cacheable = _normalize_recommend(data, role)
+            if cacheable:
+                _cache_set(cache_key, data, ttl=3600, schema=PROMPTS["recommend"].schema)
+            return data
         try:
-            txt = call_groq(prompt)
-            data = ensure_json_response(txt)
-            # Normalize common key variants to the expected structure
-            if isinstance(data, dict):
-                normalized = {
-                    "role": data.get("role") or role,
-                    "learning_paths": data.get("learning_paths") or data.get("learning_path") or data.get("paths") or [],
-                    "roadmap_weeks": data.get("roadmap_weeks") or data.get("roadmap") or data.get("plan") or [],
-                    "resume_tips": data.get("resume_tips") or data.get("resume_advice") or data.get("tips") or [],
-                }
-                # Coerce types
-                if not isinstance(normalized["learning_paths"], list):
-                    normalized["learning_paths"] = [normalized["learning_paths"]]
-                if not isinstance(normalized["roadmap_weeks"], list):
-                    normalized["roadmap_weeks"] = [normalized["roadmap_weeks"]]
-                if not isinstance(normalized["resume_tips"], list):
-                    normalized["resume_tips"] = [normalized["resume_tips"]]
-                data = normalized
-            self._json(data)
+            data = _single_flight(cache_key, generate, self._client_gone)
+            self._send_cached(cache_key, data, verify=True)
         except Exception as e:
             traceback.print_exc()
             self._json({"error": str(e), "where": "recommend"}, 200)
@@ -654,105 +1108,140 @@ class CareerLensHandler(SimpleHTTPRequestHandler):
         role_a = body.get("role_a", "").strip()
         role_b = body.get("role_b", "").strip()
         region = body.get("region", "global").strip() or "global"
-        prompt = f"""
-        You are a highly skilled and detailed career analyst providing an in-depth comparative overview of job roles.
-        Your task is to thoroughly compare two distinct career roles: "{role_a}" and "{role_b}", considering the specified region "{region}".
-
-        For each role, provide:
-        - `role`: The precise title of the career role.
-        - `salary_range`: A detailed comparative description (2-3 sentences) of the typical annual salary range in numerical format (e.g., "$50,000 - $70,000 USD", "€45,000 - €60,000 EUR"). Include factors that might influence it (e.g., experience, location, industry, specific currency for the region).
-        - `demand_growth`: A detailed comparative description (2-3 sentences) of the demand trend over the next 5-10 years, including reasons for growth or decline and relevant market indicators.
-        - `work_life_balance`: A detailed comparative description (2-3 sentences) of the typical work-life balance, touching upon common hours, flexibility, and potential stress factors.
-        - `education`: A detailed description (2-3 sentences) of the typical education and certifications required or highly valued for entry and advancement in the role.
-        - `top_skills`: A list of 5 essential skills for the role. Each skill string should also briefly explain its importance (e.g., "Data Analysis: Crucial for interpreting market trends and user behavior").
-        - `automation_risk_percent`: An integer (0-100) representing the estimated risk of automation significantly impacting the role in the next 10-20 years, with 0 being no risk and 100 being high risk.
-
-        Finally, provide a `summary`: A comprehensive and objective comparison (4-6 sentences) highlighting the key differences, similarities, and strategic considerations for choosing between "{role_a}" and "{role_b}". This should offer a holistic perspective.
-
-        Output your response as a STRICT JSON object, adhering precisely to the following schema.
-        DO NOT include any additional text, markdown, or commentary outside the JSON.
-        Keep all descriptions detailed, comparative, and grounded strictly in widely-known, realistic patterns.
-        DO NOT invent data or make overly specific claims without broad public basis.
-
-        Schema:
-        {{
-          "roles": [
-            {{"role": "string", "salary_range": "string", "demand_growth": "string", "work_life_balance": "string", "education": "string", "top_skills": ["string"], "automation_risk_percent": int}},
-            {{"role": "string", "salary_range": "string", "demand_growth": "string", "work_life_balance": "string", "education": "string", "top_skills": ["string"], "automation_risk_percent": int}}
-          ],
-          "summary": "string"
-        }}
-        """.strip()
+        messages = PROMPTS["compare"].messages(role_a=role_a, role_b=role_b, region=region)
         # cache key
-        cache_key = "compare|" + hashlib.sha1(f"{role_a}|{role_b}|{region}".encode("utf-8", errors="ignore")).hexdigest()
+        # A/B and B/A share one entry: cached payloads keep roles in sorted order
+        norm_a, norm_b = _norm_role(role_a), _norm_role(role_b)
+        swapped = norm_a > norm_b
+        cache_key = _cache_key("compare", PROMPTS["compare"].hash, *sorted([norm_a, norm_b]), _norm_text(region))
         cached = _cache_get(cache_key)
         if cached is not None:
-            self._json(cached)
+            self._send_cached(cache_key, cached, _swapped_compare if swapped else None)
             return
-        try:
-            txt = call_groq(prompt)
-            print(f"[DEBUG] Raw Groq response (compare): {txt[:1000]}") # Debug print
-            data = ensure_json_response(txt)
+        def generate():
+            data = call_groq_json(messages, "compare", PROMPTS["compare"].schema, self._client_gone,
+                                  gen=PROMPTS["compare"].generation())
+            data = _orient_compare(data, swapped)
             # cache results (1 hour in FAST mode, else 15 minutes)
-            _cache_set(cache_key, data, ttl=3600)
-            self._json(data)
+            _cache_set(cache_key, data, ttl=3600, schema=PROMPTS["compare"].schema)
+            return data
+        try:
+            data = _single_flight(cache_key, generate, self._client_gone)
+            self._send_cached(cache_key, data, _swapped_compare if swapped else None, verify=True)
         except Exception as e:
             traceback.print_exc()
             self._json({"error": str(e), "where": "compare"}, 200)
 
+    def handle_resume_score(self):
+        # Local numbers only (no LLM): ATS score, keyword coverage, missing keywords, role suggestions
+        body = self._body_json()
+        resume_text = (body.get("resume_text") or "").strip()
+        target_role = (body.get("target_role") or "").strip()
+        if not resume_text:
+            self._json({"error": "Missing resume text", "where": "resume_score"})
+            return
+        data = _SKILLS.score_resume(resume_text, target_role, (body.get("job_description") or "").strip())
+        data["target_role"] = target_role
+        data["job_suggestions"] = _heuristic_job_suggestions(resume_text, target_role)
+        self._json(data)
+
+    def handle_resume_batch(self):
+        # JSONL in (or {"items": [...]}), JSONL out as each resume/role pair finishes, then a summary line
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > batch.BATCH_MAX_BYTES:
+            self.close_connection = True  # body left unread
+            self._json({"error": "Batch body too large", "where": "resume_batch"}, 413)
+            return
+        raw = self.rfile.read(length) if length > 0 else b""
+        self._body_read = True
+        ctype = (self.headers.get("Content-Type") or "").lower()
+        if "ndjson" in ctype or "jsonl" in ctype:
+            # options ride in the query string: ?roles=Data+Analyst,QA+Engineer&feedback=1
+            opts = {k: v[-1] for k, v in urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query).items()}
+            items = []
+            for line in raw.decode("utf-8", errors="replace").splitlines():
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    continue
+        else:
+            try:
+                opts = json.loads(raw.decode("utf-8") or "{}")
+            except Exception:
+                opts = {}
+            items = opts.get("items") if isinstance(opts, dict) else None
+            if not isinstance(opts, dict):
+                opts = {}
+        roles = opts.get("target_roles") or opts.get("roles") or []
+        if isinstance(roles, str):
+            roles = [r.strip() for r in roles.split(",") if r.strip()]
+        feedback = str(opts.get("feedback", "")).lower() in ("1", "true", "yes")
+        jobs = list(batch.make_jobs(items or [], roles, opts.get("job_description") or ""))
+        if not jobs:
+            self._json({"error": "No resumes to score", "where": "resume_batch"})
+            return
+        if len(jobs) > batch.BATCH_MAX_ITEMS:
+            self._json({"error": f"Batch exceeds {batch.BATCH_MAX_ITEMS} resume/role pairs", "where": "resume_batch"}, 413)
+            return
+
+        started = time.time()
+        count = errors = 0
+        hooks = {"analyze": analyze_resume, "cache_get": _batch_cache_get, "cache_set": _batch_cache_set} if feedback else {}
+        results = batch.run_batch(jobs, pool=batch.shared_pool(), **hooks)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("X-Accel-Buffering", "no")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            for rec in results:
+                self.wfile.write((json.dumps(rec) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                count += 1
+                errors += 1 if rec.get("error") else 0
+                if self._client_gone():
+                    return
+            summary = {"items": len(jobs), "results": count, "errors": errors, "seconds": round(time.time() - started, 3)}
+            self.wfile.write((json.dumps({"summary": summary}) + "\n").encode("utf-8"))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            results.close()
+
     def handle_resume_analyze(self):
 
         body = self._body_json()
         resume_text = body.get("resume_text", "").strip()
         target_role = body.get("target_role", "").strip()
         job_desc = body.get("job_description", "").strip()
-        prompt = f"""
-        You are an expert ATS (Applicant Tracking System) and resume specialist, providing comprehensive and actionable feedback.
-        Your task is to thoroughly analyze the provided resume text against the target role "{target_role}".
-        If a job description is provided, meticulously compare the resume to it.
-
-        Resume text:
-        ---
-        {resume_text}
-        ---
-
-        Job Description (if provided, otherwise ignore):
-        ---
-        {job_desc}
-        ---
-
-        Output your response as a STRICT JSON object, adhering precisely to the following schema.
-        DO NOT include any additional text, markdown, or commentary outside the JSON.
-        Keep all feedback and suggestions detailed, actionable, and strictly grounded in the supplied resume text and job description.
-        DO NOT invent or hallucinate information not present in the provided texts.
-
-        Schema:
-        {{
-          "target_role": "{target_role}",
-          "ats_score_percent": 0-100,
-          "missing_keywords": ["string"],
-          "sections_feedback": {{"summary": "string", "experience": "string", "skills": "string", "education": "string"}},
-          "bullet_improvements": ["string"],
-          "suggested_projects": ["string"],
-          "certification_suggestions": ["string"],
-          "job_suggestions": [{{"title": "string", "level": "entry|junior|mid|senior", "why_fit": "string"}}]
-        }}
-
-        Requirements for accuracy and detail:
-        - `ats_score_percent`: An integer (0-100) indicating how well the resume matches the target role/job description.
-        - `missing_keywords`: A list of 5-7 crucial keywords or phrases from the job description (or common for the target role) that are missing or underrepresented. For each, suggest *where* in the resume it could be strategically added (e.g., "Keyword: Description (suggested section: Summary)").
-        - `sections_feedback`: Provide 2-3 detailed and actionable sentences of feedback for EACH of the 'summary', 'experience', 'skills', and 'education' sections. Include specific examples or recommendations for improvement tailored to the target role.
-        - `bullet_improvements`: A list of 3-5 specific suggestions for improving existing bullet points in the experience section. For each suggestion, provide an example of how a generic bullet point could be rephrased to be more impactful (e.g., "Weak: 'Managed projects.' -> Strong: 'Led cross-functional teams to deliver X project, resulting in Y% efficiency gain.'").
-        - `suggested_projects`: A list of 2-4 relevant project ideas. For each project, include a 1-sentence description of what it entails and how it would strengthen the candidate's profile for the target role.
-        - `certification_suggestions`: A list of 2-3 certifications that would significantly boost the candidate's eligibility. Briefly explain the relevance of each certification.
-        - `job_suggestions`: A list of 2-4 alternative job titles. For each, provide a 2-sentence explanation for `why_fit`, elaborating on how the candidate's current profile aligns and the estimated `level`.
-        """.strip()
+        # computed up front so they survive a failed model call
+        local = _SKILLS.score_resume(resume_text, target_role, job_desc)
+        # Results stay in memory only (no resume-derived data on disk)
+        cache_key = _resume_key(resume_text, target_role, job_desc)
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            self._json(cached)
+            return
+        def generate():
+            data = analyze_resume(resume_text, target_role, job_desc, local, self._client_gone)
+            _cache_set(cache_key, data, ttl=1800, persist=False)
+            return data
         try:
-            txt = call_groq(prompt)
-            data = ensure_json_response(txt)
+            data = _single_flight(cache_key, generate, self._client_gone)
             self._json(data)
         except Exception as e:
-            traceback.print_exc()
+            if not isinstance(e, CircuitOpenError):
+                traceback.print_exc()
+            if local or isinstance(e, CircuitOpenError):
+                # The numbers don't need the model; return them with a warning instead of an error
+                data = dict(local, target_role=target_role, job_suggestions=_heuristic_job_suggestions(resume_text, target_role))
+                data["warning"] = f"AI feedback unavailable: {e}"
+                self._json(data)
+                return
             self._json({"error": str(e), "where": "resume"}, 200)
 
     def handle_roadmap(self):
@@ -767,69 +1256,124 @@ class CareerLensHandler(SimpleHTTPRequestHandler):
         if not job:
             self._json({"error": "Missing job title"})
             return
-        prompt = f"""
-        You are an expert and highly practical career coach.
-        Your task is to create a detailed, weekly skill development roadmap for someone pursuing the dream job: "{job}".
-        The roadmap should span exactly {weeks} weeks.
-
-        Output your response as a STRICT JSON object, adhering precisely to the following schema.
-        DO NOT include any additional text, markdown, or commentary outside the JSON.
-
-        Schema:
-        {{
-          "job": "{job}",
-          "weeks": [
-            {{
-              "week": 1,
-              "focus_description": "string", // Added this field
-              "skills": ["string", "string", "string"]
-            }},
-            // ... up to {weeks} similar objects
-          ]
-        }}
-
-        Requirements for accuracy and detail:
-        - The "weeks" array MUST contain exactly {weeks} objects, representing week 1 through week {weeks}.
-        - For each week:
-            - "week": An integer representing the week number (1 to {weeks}).
-            - "focus_description": A detailed paragraph (2-3 sentences) explaining the main theme of the week, the goals, and how it contributes to overall job readiness.
-            - "skills": A list of 3 to 5 distinct skills, tools, or concepts.
-              - Each item in the list should be a descriptive string, combining the skill name with a brief explanation of its importance or application (e.g., "SQL Fundamentals: Mastering database queries for data extraction and manipulation").
-              - The skills must be highly specific, practical, and show a clear logical progression, building upon knowledge from previous weeks.
-              - Avoid vague terms.
-        """.strip()
+        messages = PROMPTS["roadmap"].messages(job=job, weeks=weeks)
+        cache_key = _cache_key("roadmap", PROMPTS["roadmap"].hash, _norm_role(job), weeks)
+        if self._wants_stream(body):
+            self._stream_weeks("roadmap", messages, PROMPTS["roadmap"].generation(stream=True, weeks=weeks), cache_key, ("weeks",), "weeks",
+                               _normalize_roadmap_week,
+                               lambda data: _normalize_roadmap(data, job, weeks))
+            return
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            self._send_cached(cache_key, cached)
+            return
+        def generate():
+            data = call_groq_json(messages, "roadmap", PROMPTS["roadmap"].schema, self._client_gone,
+                                  gen=PROMPTS["roadmap"].generation(weeks=weeks))
+            data, cacheable = _normalize_roadmap(data, job, weeks)
+            if cacheable:
+                _cache_set(cache_key, data, ttl=3600, schema=PROMPTS["roadmap"].schema)
+            return data
         try:
-            txt = call_groq(prompt)
-            data = ensure_json_response(txt)
-            # Normalize
-            job_out = data.get("job") if isinstance(data, dict) else None
-            weeks_out = []
-            if isinstance(data, dict) and isinstance(data.get("weeks"), list):
-                for w in data.get("weeks"):
-                    try:
-                        wk = int(w.get("week"))
-                        skills = w.get("skills") or []
-                        if not isinstance(skills, list):
-                            skills = [skills]
-                        # coerce to short strings
-                        skills = [str(s).strip() for s in skills if str(s).strip()]
-                        weeks_out.append({"week": wk, "skills": skills[:4]})
-                    except Exception:
-                        continue
-            # Fallback if model output was malformed
-            if not weeks_out:
-                weeks_out = [{"week": i+1, "skills": ["Research role", "Core fundamentals"]} for i in range(weeks)]
-            self._json({"job": job_out or job, "weeks": weeks_out})
+            self._send_cached(cache_key, _single_flight(cache_key, generate, self._client_gone), verify=True)
         except Exception as e:
             traceback.print_exc()
             self._json({"error": str(e), "where": "roadmap"}, 200)
 
 
 
-# Create an app instance for Gunicorn
-app = HTTPServer((HOST, PORT), CareerLensHandler)
+class _WSGIWriter:
+    # File-like shim so handlers can keep using self.wfile.write under WSGI
+    def __init__(self, handler):
+        self.handler = handler
+
+    def write(self, data):
+        if self.handler._write is None:
+            self.handler.end_headers()
+        self.handler._write(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+class _WSGIHandler(CareerLensHandler):
+    """Runs CareerLensHandler against a WSGI environ instead of a raw socket."""
+
+    def __init__(self, environ, start_response):
+        # Deliberately skip BaseRequestHandler.__init__ (it expects a socket)
+        self.environ = environ
+        self._start_response = start_response
+        self._status = None
+        self._headers = []
+        self._write = None
+        self.client_address = (environ.get("REMOTE_ADDR", "-"), 0)
+        self.command = (environ.get("REQUEST_METHOD") or "GET").upper()
+        path = environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", "")
+        # PEP 3333 hands PATH_INFO over decoded as latin-1; re-quote it for translate_path
+        path = urllib.parse.quote(path.encode("latin-1").decode("utf-8", "replace"), safe="/:@!$&'()*+,;=")
+        if environ.get("QUERY_STRING"):
+            path += "?" + environ["QUERY_STRING"]
+        self.path = path or "/"
+        self.request_version = environ.get("SERVER_PROTOCOL", "HTTP/1.1")
+        self.requestline = f"{self.command} {self.path} {self.request_version}"
+        self.directory = os.getcwd()
+        self.close_connection = True
+        self.headers = http.client.HTTPMessage()
+        for key, value in environ.items():
+            if key.startswith("HTTP_"):
+                self.headers[key[5:].replace("_", "-").title()] = value
+        if environ.get("CONTENT_TYPE"):
+            self.headers["Content-Type"] = environ["CONTENT_TYPE"]
+        if environ.get("CONTENT_LENGTH"):
+            self.headers["Content-Length"] = environ["CONTENT_LENGTH"]
+        self.rfile = environ["wsgi.input"]
+        self.wfile = _WSGIWriter(self)
+        self.connection = environ.get("gunicorn.socket")
+
+    def send_response(self, code, message=None):
+        req = metrics.current()
+        if req is not None:
+            req.status = code
+        if message is None:
+            message = self.responses.get(code, ("",))[0]
+        self._status = f"{int(code)} {message}"
+        self._headers = []
+
+    def send_header(self, keyword, value):
+        # WSGI servers own the connection; hop-by-hop headers are not ours to send
+        if not is_hop_by_hop(keyword):
+            self._headers.append((keyword, str(value)))
+
+    def end_headers(self):
+        if self._write is None:
+            self._write = self._start_response(self._status or "500 Internal Server Error", self._headers)
+
+    def run(self):
+        method = getattr(self, "do_" + self.command, None)
+        try:
+            if method is None:
+                self.send_error(501, f"Unsupported method ({self.command!r})")
+            else:
+                method()
+        except Exception:
+            traceback.print_exc()
+            if self._write is None:
+                self.send_error(500)
+        if self._write is None:
+            self.end_headers()
+        return []
+
+
+def app(environ, start_response):
+    # WSGI entry point (gunicorn server:app); each request runs on its own worker thread
+    return _WSGIHandler(environ, start_response).run()
+
 
 # Kept for local development; Gunicorn will not use this.
 if __name__ == "__main__":
+    print("GROQ KEY FOUND:", bool(os.environ.get("GROQ_API_KEY")))
+    httpd = ThreadingHTTPServer((HOST, PORT), CareerLensHandler)
+    _start_background()
     print(f"CareerLens server running locally on http://{HOST}:{PORT}")
-    app.serve_forever()
+    httpd.serve_forever()
@@ -0,0 +1,74 @@
+import secrets
+import threading
+import time
+
+from cache import TTLCache
+
+
+class SessionStore:
+    """Small server-side session store: an LRU/TTL memory tier over an optional DiskCache.
+
+    Sessions are plain JSON-able dicts keyed by an opaque random id. Every save
+    refreshes the TTL, so an active session never expires mid-use; idle ones are
+    evicted from memory first and from disk when their TTL runs out. lock(sid)
+    serializes updates to one session (e.g. a double-clicked "Next").
+    """
+
+    def __init__(self, prefix: str, ttl: float = 3600, max_entries: int = 5000, disk=None):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.disk = disk
+        self._mem = TTLCache(max_entries=max_entries, max_bytes=64 * 1024 * 1024, default_ttl=ttl)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.created = 0
+        self.restored = 0
+        self.expired = 0
+
+    def _key(self, sid: str) -> str:
+        return f"{self.prefix}|{sid}"
+
+    def create(self, data: dict) -> str:
+        sid = secrets.token_urlsafe(16)
+        data = dict(data, id=sid, created=time.time())
+        self.save(sid, data)
+        self.created += 1
+        return sid
+
+    def get(self, sid):
+        if not sid or not isinstance(sid, str):
+            return None
+        data = self._mem.get(self._key(sid))
+        if data is None and self.disk is not None:
+            data = self.disk.get(self._key(sid))
+            if data is not None:
+                self.restored += 1
+                self._mem.set(self._key(sid), data)
+        if data is None:
+            self.expired += 1
+        return data
+
+    def save(self, sid: str, data: dict):
+        data["updated"] = time.time()
+        self._mem.set(self._key(sid), data, ttl=self.ttl)
+        if self.disk is not None:
+            try:
+                self.disk.set(self._key(sid), data, ttl=self.ttl)
+            except Exception as e:
+                print(f"[WARN] Session store write failed: {e}")
+
+    def lock(self, sid: str):
+        with self._locks_guard:
+            if len(self._locks) > 4 * self._mem.max_entries:
+                # drop locks nobody holds; sessions they guarded are long gone
+                self._locks = {k: v for k, v in self._locks.items() if v.locked()}
+            return self._locks.setdefault(sid, threading.Lock())
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._mem),
+            "created": self.created,
+            "restored_from_disk": self.restored,
+            "expired_lookups": self.expired,
+            "persistent": self.disk is not None,
+        }
@@ -0,0 +1,139 @@
+import concurrent.futures
+import threading
+import time
+
+
+class _Spec:
+    __slots__ = ("parent", "future", "cancel", "started", "done_at")
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.future = None
+        self.cancel = threading.Event()
+        self.started = False
+        self.done_at = None
+
+
+class Speculator:
+    """Runs likely follow-up requests in the background so the real one is served from memory.
+
+    launch(parent, key, payload) starts generate(payload, client_gone) on a small
+    pool; take(key, parent) hands over that result (waiting if it is still
+    running) and cancels the sibling guesses made for the same parent. Running
+    guesses are cancelled through the client_gone hook, so the LLM layer drops
+    their upstream calls too.
+    """
+
+    def __init__(self, generate, max_inflight: int = 4, max_pending: int = 16, ttl: float = 300):
+        self.generate = generate
+        self.max_pending = max(1, max_pending)
+        self.ttl = ttl
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_inflight), thread_name_prefix="speculate")
+        self._lock = threading.Lock()
+        self._specs = {}  # key -> _Spec
+        self._children = {}  # parent -> {keys}
+        self.launched = 0
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+        self.skipped = 0
+        self.failed = 0
+        self.wasted = 0
+
+    def _drop(self, key):
+        # caller holds the lock; a guess that already ran (or is running) is a wasted upstream call
+        spec = self._specs.pop(key, None)
+        if spec is None:
+            return
+        kids = self._children.get(spec.parent)
+        if kids is not None:
+            kids.discard(key)
+            if not kids:
+                del self._children[spec.parent]
+        spec.cancel.set()
+        if spec.future is not None and spec.future.cancel():
+            self.cancelled += 1
+        elif spec.started:
+            self.wasted += 1
+
+    def _expire(self):
+        now = time.time()
+        for key, spec in list(self._specs.items()):
+            if spec.done_at is not None and now - spec.done_at > self.ttl:
+                self._drop(key)
+
+    def launch(self, parent, key, payload):
+        with self._lock:
+            self._expire()
+            if key in self._specs:
+                return False
+            if sum(1 for s in self._specs.values() if s.done_at is None) >= self.max_pending:
+                self.skipped += 1
+                return False
+            spec = _Spec(parent)
+            self._specs[key] = spec
+            self._children.setdefault(parent, set()).add(key)
+            self.launched += 1
+        spec.future = self._pool.submit(self._run, spec, payload)
+        return True
+
+    def _run(self, spec, payload):
+        if spec.cancel.is_set():
+            return None
+        spec.started = True
+        self.started += 1
+        try:
+            return self.generate(payload, spec.cancel.is_set)
+        except Exception:
+            if not spec.cancel.is_set():
+                self.failed += 1
+            return None
+        finally:
+            spec.done_at = time.time()
+
+    def take(self, key, parent, timeout: float, client_gone=None):
+        # Returns the speculated result or None (caller then generates it the normal way)
+        with self._lock:
+            spec = self._specs.pop(key, None)
+            if spec is not None:
+                self._children.get(spec.parent, set()).discard(key)
+            for other in list(self._children.get(parent, ())):
+                self._drop(other)
+            self._children.pop(parent, None)
+        if spec is None or spec.future is None:
+            self.misses += 1
+            return None
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            done, _ = concurrent.futures.wait([spec.future], timeout=max(0.0, min(0.25, remaining)))
+            if done:
+                break
+            if remaining <= 0 or (client_gone is not None and client_gone()):
+                spec.cancel.set()
+                self.misses += 1
+                return None
+        result = spec.future.result()
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            held = len(self._specs)
+        lookups = self.hits + self.misses
+        return {
+            "launched": self.launched,
+            "started": self.started,
+            "held": held,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "cancelled_before_start": self.cancelled,
+            "wasted_upstream_calls": self.wasted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
@@ -77,7 +77,7 @@ function renderRoadmap(roadmap) {
   roadmap.weeks.forEach((week, weekIndex) => {
     html += `
       <div class="roadmap-week">
-        <h4>Week ${week.week}: ${week.focus_description}</h4>
+        <h4>Week ${week.week}: ${week.focus_description || ''}</h4>
         <ul>`;
     week.skills.forEach((skillItem, skillIndex) => {
       // skillItem should already be { name: string, completed: boolean }
@@ -137,8 +137,23 @@ growGenButton.onclick = async () => {
   growOutputDiv.innerHTML = '<div class="muted dynLoader"></div>';
   const stopLoader = CL.startCycler(growOutputDiv.querySelector('.dynLoader'));
 
+  // Preview weeks as they stream in; replaced by the interactive roadmap once complete
+  let previewCount = 0;
+  const onWeek = (week) => {
+    if (!previewCount) {
+      stopLoader();
+      growOutputDiv.innerHTML = `<h3>Roadmap for ${job}</h3><div id="growPreview"></div>`;
+    }
+    previewCount++;
+    growOutputDiv.querySelector('#growPreview').insertAdjacentHTML('beforeend', `
+      <div class="roadmap-week">
+        <h4>Week ${week.week}: ${week.focus_description || ''}</h4>
+        <ul>${(week.skills || []).map(s => `<li class="task-item">${s}</li>`).join('')}</ul>
+      </div>`);
+  };
+
   try {
-    const res = await CL.API.roadmap(job, weeks);
+    const res = await CL.API.roadmapStream(job, weeks, onWeek);
     stopLoader();
     growGenButton.disabled = false;
     resetRoadmapButton.disabled = false;
@@ -93,6 +93,7 @@ function runAdaptiveQuiz() {
     currentQuestionNum: 0,
     answers: [], // Stores user's answers for final submission
     currentQuestion: null, // Stores the last question asked by AI
+    sessionId: null, // Server keeps the conversation; we only send the latest answer
   };
   const MAX_QUESTIONS = 10;
 
@@ -164,8 +165,17 @@ function runAdaptiveQuiz() {
         response = await CL.API.adaptiveQuizStart();
       } else {
         // Subsequent questions
-        response = await CL.API.adaptiveQuizNext(state.conversationHistory);
+        const answer = state.conversationHistory[state.conversationHistory.length - 1].content;
+        if (state.sessionId) {
+          response = await CL.API.adaptiveQuizNext({ session_id: state.sessionId, question_id: state.currentQuestion.id, answer });
+          if (response && response.session_expired) state.sessionId = null;
+        }
+        if (!state.sessionId) {
+          // No session (older server or it expired): resend the full conversation
+          response = await CL.API.adaptiveQuizNext(state.conversationHistory);
+        }
       }
+      if (response && response.session_id) state.sessionId = response.session_id;
 
       if (response && response.question) {
         state.conversationHistory.push({ role: 'assistant', content: response.question.text }); // Use only the question text
@@ -10,9 +10,19 @@ CL.$('#genRecommendations').addEventListener('click', async () => {
   const box = CL.$('#recOutput');
   box.innerHTML = '<div class="muted dynLoader"></div>';
   const stop = CL.startCycler(box.querySelector('.dynLoader'));
+  // Render weeks as they stream in; the full plan replaces this once it's complete
+  let streamed = 0;
+  const onWeek = (w) => {
+    if (!streamed) {
+      stop();
+      box.innerHTML = '<div><strong>Roadmap (building…)</strong><ul class="list" id="recPartial"></ul></div>';
+    }
+    streamed++;
+    box.querySelector('#recPartial').insertAdjacentHTML('beforeend', `<li>Week ${w.week}: ${w.focus || ''} — ${(w.outcomes||[]).join('; ')}</li>`);
+  };
   let res;
   try {
-    res = await CL.API.recommend(role, background, weeks);
+    res = await CL.API.recommendStream(role, background, weeks, onWeek);
   } finally {
     stop();
   }
@@ -15,6 +15,20 @@ CL.$('#resFile').addEventListener('change', async (e) => {
   }
 });
 
+function scoreHtml(res) {
+  const cov = res.keyword_coverage;
+  return `
+    <div class="cols">
+      <div><strong>ATS Score</strong><div class="pill">${res.ats_score_percent ?? '?'}%</div></div>
+      <div><strong>Target Role</strong><div class="muted">${res.target_role||''}</div></div>
+    </div>
+    ${cov ? `<div class="muted" style="margin-top:4px">Keyword coverage: ${cov.matched_count}/${cov.total}${cov.matched?.length ? ` (${cov.matched.join(', ')})` : ''}</div>` : ''}
+    <div style="margin-top:8px"><strong>Missing Keywords</strong>
+      <ul class="list">${(res.missing_keywords||[]).map(k=>`<li>${k}</li>`).join('')}</ul>
+    </div>
+  `;
+}
+
 CL.$('#analyzeResume').addEventListener('click', async () => {
   const resume_text = CL.$('#resText').value.trim();
   const target_role = CL.$('#resRole').value.trim();
@@ -23,6 +37,12 @@ CL.$('#analyzeResume').addEventListener('click', async () => {
   const box = CL.$('#resOutput');
   box.innerHTML = '<div class="muted dynLoader"></div>';
   const stop = CL.startCycler(box.querySelector('.dynLoader'));
+  // Local score comes back in milliseconds; show it while the AI feedback is written
+  CL.API.scoreResume(resume_text, target_role, job_description).then(score => {
+    if (score && !score.error && score.ats_score_percent != null && box.querySelector('.dynLoader')) {
+      box.insertAdjacentHTML('afterbegin', scoreHtml(score));
+    }
+  }).catch(() => {});
   let res;
   try {
     res = await CL.API.analyzeResume(resume_text, target_role, job_description);
@@ -34,13 +54,8 @@ CL.$('#analyzeResume').addEventListener('click', async () => {
     return;
   }
   const html = `
-    <div class="cols">
-      <div><strong>ATS Score</strong><div class="pill">${res.ats_score_percent ?? '?'}%</div></div>
-      <div><strong>Target Role</strong><div class="muted">${res.target_role||''}</div></div>
-    </div>
-    <div style="margin-top:8px"><strong>Missing Keywords</strong>
-      <ul class="list">${(res.missing_keywords||[]).map(k=>`<li>${k}</li>`).join('')}</ul>
-    </div>
+    ${res.warning ? `<div class="warn">${res.warning}</div>` : ''}
+    ${scoreHtml(res)}
     <div style="margin-top:8px"><strong>Section Feedback</strong>
       <ul class="list">
         <li><em>Summary:</em> ${res.sections_feedback?.summary||''}</li>
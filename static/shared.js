@@ -6,19 +6,61 @@
   const API = {
     ping: () => fetch('/api/ping').then(r => r.json()),
     adaptiveQuizStart: () => fetch('/api/adaptive_quiz/start', { method: 'POST' }).then(r => r.json()),
-    adaptiveQuizNext: (conversationHistory) => fetch('/api/adaptive_quiz/next', {
+    // payload: { session_id, question_id, answer } or, without a live session, { history }
+    adaptiveQuizNext: (payload) => fetch('/api/adaptive_quiz/next', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ history: conversationHistory })
+      body: JSON.stringify(Array.isArray(payload) ? { history: payload } : payload)
     }).then(r => r.json()),
     quiz: (answers) => fetch('/api/quiz', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ answers }) }).then(r => r.json()),
-    market: (role, region) => fetch('/api/market', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ role, region }) }).then(r => r.json()),
+    // GET so the browser keeps the reply and revalidates it with its ETag (304) on the next visit
+    market: (role, region) => fetch('/api/market?' + new URLSearchParams({ role, region })).then(r => r.json()),
     recommend: (role, background, weeks) => fetch('/api/recommend', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ role, background, weeks }) }).then(r => r.json()),
-    compare: (role_a, role_b, region) => fetch('/api/compare', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ role_a, role_b, region }) }).then(r => r.json()),
+    compare: (role_a, role_b, region) => fetch('/api/compare?' + new URLSearchParams({ role_a, role_b, region })).then(r => r.json()),
+    scoreResume: (resume_text, target_role, job_description) => fetch('/api/resume/score', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ resume_text, target_role, job_description }) }).then(r => r.json()),
     analyzeResume: (resume_text, target_role, job_description) => fetch('/api/resume/analyze', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ resume_text, target_role, job_description }) }).then(r => r.json()),
     roadmap: (job, weeks) => fetch('/api/roadmap', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ job, weeks }) }).then(r => r.json()),
+    // Streaming variants: onWeek(week) fires as each week is generated; resolves with the full payload
+    recommendStream: (role, background, weeks, onWeek) => postStream('/api/recommend', { role, background, weeks }, (ev, d) => { if (ev === 'week' && onWeek) onWeek(d); }),
+    roadmapStream: (job, weeks, onWeek) => postStream('/api/roadmap', { job, weeks }, (ev, d) => { if (ev === 'week' && onWeek) onWeek(d); }),
   };
 
+  // POST and consume a text/event-stream reply. Calls onEvent(name, data) for each event and
+  // resolves with the "done" (or "error") payload. Falls back to plain JSON if the server didn't stream.
+  async function postStream(url, body, onEvent) {
+    const r = await fetch(url, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+      body: JSON.stringify({ ...body, stream: true })
+    });
+    if (!(r.headers.get('Content-Type') || '').includes('text/event-stream') || !r.body) return r.json();
+    const reader = r.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = '';
+    let result = null;
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buf += decoder.decode(value, { stream: true });
+      let idx;
+      while ((idx = buf.indexOf('\n\n')) !== -1) {
+        const frame = buf.slice(0, idx);
+        buf = buf.slice(idx + 2);
+        let event = 'message';
+        let data = '';
+        frame.split('\n').forEach(line => {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+        let parsed;
+        try { parsed = JSON.parse(data); } catch (e) { continue; }
+        if (event === 'done' || event === 'error') result = parsed;
+        else if (onEvent) onEvent(event, parsed);
+      }
+    }
+    return result || { error: 'Stream ended unexpectedly' };
+  }
+
   // Dynamic loader text that cycles through phrases to keep UI lively
   const LOADER_PHRASES = [
     'Thinking…',
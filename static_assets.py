@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+import urllib.parse
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+
+# Fingerprinted URLs never change content, so browsers may keep them for a year
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", str(365 * 24 * 3600)))
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+_MIN_COMPRESS = 512
+# "/static/<file>" references inside HTML, rewritten to their fingerprinted names
+_REF_RE = re.compile(r"""(["'])/static/([^"'?#]+)\1""")
+
+
+def _fingerprinted(name: str, digest: str) -> str:
+    base, ext = posixpath.splitext(name)
+    return f"{base}.{digest}{ext}"
+
+
+def _accepted(header) -> set:
+    # Codings the client takes (q=0 means "not this one")
+    out = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().lower().partition(";")
+        q = params.strip()
+        if coding and not (q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000")):
+            out.add(coding.strip())
+    return out
+
+
+class Asset:
+    """One response body, hashed for its ETag and compressed once.
+
+    Static files use the slowest, smallest settings since they are encoded at
+    startup; API payloads encoded on the request path pass a lower gzip level
+    and skip brotli.
+    """
+
+    __slots__ = ("name", "content_type", "etag", "bodies")
+
+    def __init__(self, name: str, data: bytes, gzip_level: int = 9, brotli_quality=11):
+        self.name = name
+        ctype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        compressible = ctype.startswith(_COMPRESSIBLE)
+        self.content_type = ctype + "; charset=utf-8" if compressible and ctype != "image/svg+xml" else ctype
+        self.etag = hashlib.sha1(data).hexdigest()[:16]
+        self.bodies = {"identity": data}
+        if compressible and len(data) >= _MIN_COMPRESS:
+            # kept only when they save at least 10%
+            gz = gzip.compress(data, gzip_level, mtime=0)
+            if len(gz) < len(data) * 0.9:
+                self.bodies["gzip"] = gz
+            if brotli is not None and brotli_quality is not None:
+                br = brotli.compress(data, quality=brotli_quality)
+                if len(br) < len(data) * 0.9:
+                    self.bodies["br"] = br
+
+    def tag(self, encoding: str) -> str:
+        return f'"{self.etag}"' if encoding == "identity" else f'"{self.etag}-{encoding}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        # Any variant's tag counts: they all carry the same content
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag.strip('"').split("-", 1)[0] == self.etag:
+                return True
+        return False
+
+    def respond(self, headers, cache_control: str):
+        # (status, headers, body): the br/gzip/identity variant the client takes, or a 304 when it has it already
+        accepted = _accepted(headers.get("Accept-Encoding"))
+        encoding = next((e for e in ("br", "gzip") if e in accepted and e in self.bodies), "identity")
+        out = [("ETag", self.tag(encoding)), ("Cache-Control", cache_control), ("Vary", "Accept-Encoding")]
+        inm = headers.get("If-None-Match")
+        if inm and self.matches(inm):
+            return 304, out, b""
+        body = self.bodies[encoding]
+        out += [("Content-Type", self.content_type), ("Content-Length", str(len(body)))]
+        if encoding != "identity":
+            out.append(("Content-Encoding", encoding))
+        return 200, out, body
+
+
+class StaticAssets:
+    """Every file under root read, hashed and compressed once at startup.
+
+    response(path, headers) resolves "/", the pretty routes, "/static/<file>",
+    bare "/<file>" and fingerprinted "/static/<name>.<hash>.<ext>" with one dict
+    lookup and returns (status, headers, body): the br/gzip/identity variant the
+    client accepts, or a 304 when If-None-Match already has it. HTML is rewritten
+    to reference fingerprinted URLs, which are served with a year-long immutable
+    Cache-Control; everything else revalidates through its ETag.
+    """
+
+    def __init__(self, root: str, routes: dict):
+        self.root = root
+        self.routes = routes  # pretty path -> file name under root
+        self._assets = {}  # url path -> (Asset, immutable)
+        self._lock = threading.Lock()
+        self.served = {"br": 0, "gzip": 0, "identity": 0}
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.load()
+
+    def load(self):
+        files = {}
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                full = os.path.join(dirpath, name)
+                with open(full, "rb") as f:
+                    files[os.path.relpath(full, self.root).replace(os.sep, "/")] = f.read()
+        fingerprints = {rel: _fingerprinted(rel, hashlib.sha1(data).hexdigest()[:10])
+                        for rel, data in files.items() if not rel.endswith(".html")}
+        assets = {}
+        for rel, data in files.items():
+            if rel.endswith(".html"):
+                text = data.decode("utf-8", "replace")
+                text = _REF_RE.sub(lambda m: f"{m.group(1)}/static/{fingerprints.get(m.group(2), m.group(2))}{m.group(1)}", text)
+                data = text.encode("utf-8")
+            asset = Asset(rel, data)
+            assets["/static/" + rel] = (asset, False)
+            assets["/" + rel] = (asset, False)
+            if rel in fingerprints:
+                assets["/static/" + fingerprints[rel]] = (asset, True)
+        for route, rel in self.routes.items():
+            if "/" + rel in assets:
+                assets[route] = (assets["/" + rel][0], False)
+        self._assets = assets
+
+    def lookup(self, path: str):
+        path = path.split("?", 1)[0].split("#", 1)[0]
+        hit = self._assets.get(path)
+        if hit is None:
+            # same normalization translate_path applies ("/quiz/", "/static/../static/x.js", %-escapes)
+            hit = self._assets.get(posixpath.normpath(urllib.parse.unquote(path)))
+        return hit
+
+    def response(self, path: str, headers):
+        hit = self.lookup(path)
+        if hit is None:
+            return None
+        asset, immutable = hit
+        code, out, body = asset.respond(headers, f"public, max-age={STATIC_MAX_AGE}, immutable" if immutable else "no-cache")
+        with self._lock:
+            if code == 304:
+                self.not_modified += 1
+            else:
+                self.served[dict(out).get("Content-Encoding", "identity")] += 1
+                self.bytes_sent += len(body)
+        return code, out, body
+
+    def stats(self) -> dict:
+        assets = {id(a): a for a, _ in self._assets.values()}.values()
+        with self._lock:
+            return {
+                "files": len(assets),
+                "bytes": sum(len(a.bodies["identity"]) for a in assets),
+                "gzip_bytes": sum(len(a.bodies.get("gzip", a.bodies["identity"])) for a in assets),
+                "brotli": brotli is not None,
+                "served": dict(self.served),
+                "not_modified": self.not_modified,
+                "bytes_sent": self.bytes_sent,
+            }
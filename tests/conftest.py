@@ -0,0 +1,12 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # data/ and static/ are resolved from the working directory
+
+# Tests never talk to Groq or write the shared caches; background refreshers stay off
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("CACHE_DB", "")
+os.environ.setdefault("MARKET_INDEX_REFRESH", "0")
+os.environ.setdefault("LOG_SAMPLE", "0")
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+
+import batch
+from conftest import ROOT
+
+RESUME = "Data analyst with SQL, Python, pandas, Excel and Tableau dashboards."
+
+
+def _has_module(name):
+    return name in sys.modules
+
+
+def test_workers_do_not_import_server():
+    pool = batch.make_pool(1)
+    try:
+        [rec] = pool.submit(batch._score_chunk, list(batch.make_jobs([{"id": "a", "resume_text": RESUME}], ["Data Analyst"]))).result()
+        assert rec["ats_score_percent"] is not None
+        assert pool.submit(_has_module, "scoring").result()
+        assert not pool.submit(_has_module, "server").result()
+    finally:
+        pool.shutdown()
+
+
+def test_server_module_rerun_by_a_spawned_worker_starts_nothing():
+    # what spawn does with `python server.py` as the parent's main module
+    code = ("import runpy, threading; ns = runpy.run_path('server.py', run_name='__mp_main__'); "
+            "print(threading.active_count(), ns['_STATIC'], ns['_MARKET_INDEX'])")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == ["1", "None", "None"]
+
+
+def test_feedback_goes_through_the_callers_hooks():
+    cache = {}
+
+    def analyze(resume_text, target_role, job_description, local):
+        return {"sections_feedback": {"summary": "ok"}, "ats_score_percent": local.get("ats_score_percent")}
+
+    jobs = batch.make_jobs([{"id": "a", "resume_text": RESUME}], ["Data Analyst"])
+    [rec] = batch.run_batch(jobs, workers=1, analyze=analyze, cache_get=lambda job: cache.get(job["id"]),
+                            cache_set=lambda job, data: cache.__setitem__(job["id"], data))
+    assert rec["feedback"]["sections_feedback"] == {"summary": "ok"}
+    assert "a" in cache
@@ -0,0 +1,31 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from bench.bench_generation import REPLIES
+from bench.stub_groq import serve
+from conftest import ROOT
+
+
+def test_refresh_regenerates_expired_entries_against_the_stub(tmp_path):
+    stub = serve("127.0.0.1", 0, replies=REPLIES)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    path = tmp_path / "market_index.json"
+    stale = {"role": "Data Analyst", "region": "global", "data": {"role": "Data Analyst"},
+             "generated_at": time.time() - 3 * 86400, "expires_at": time.time() - 86400}
+    path.write_text(json.dumps({"version": 1, "entries": [stale]}))
+    env = dict(os.environ, GROQ_API_KEY="stub", GROQ_BASE_URL=f"http://127.0.0.1:{stub.server_address[1]}",
+               CACHE_DB="", LLM_RATE_LIMITS="")
+    try:
+        out = subprocess.run([sys.executable, "insights_index.py", "refresh", "--path", str(path)],
+                             cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    finally:
+        stub.shutdown()
+    assert out.returncode == 0, out.stderr
+    assert "refreshed 1 entries" in out.stdout
+    [entry] = json.loads(path.read_text())["entries"]
+    assert entry["expires_at"] > time.time()
+    assert entry["data"]["top_skills"][0] == "SQL"
@@ -0,0 +1,48 @@
+import scoring
+from matching import RoleTaxonomy
+
+
+def _titles(items, key="title"):
+    return [item[key] for item in items]
+
+
+def test_taxonomy_keeps_the_baseline_roles():
+    assert scoring.TAXONOMY.titles == [
+        "Data Analyst", "Data Scientist", "Frontend Developer", "Backend Developer", "Cloud/DevOps Engineer",
+        "UI/UX Designer", "Business Analyst", "QA Engineer", "Security Analyst", "Digital Marketing Specialist",
+        "Salesforce Administrator", "Project Coordinator",
+    ]
+
+
+def test_quiz_answers_are_not_gated():
+    matches = scoring.matches_from_answers(["I build dashboards in excel", "tableau every day"])
+    assert _titles(matches, "role") == ["Data Analyst", "Business Analyst"]
+    assert [m["confidence"] for m in matches] == [60, 60]
+
+
+def test_quiz_answers_only_score_quiz_roles():
+    assert _titles(scoring.matches_from_answers(["selenium and jira"]), "role") == ["Generalist (Explore)"]
+    assert _titles(scoring.matches_from_answers(["html", "css"]), "role") == ["Frontend Developer"]
+
+
+def test_suggestions_gate_on_data_tools():
+    # excel/tableau alone read as BI work; any data tool makes it Data Analyst and hides Business Analyst
+    assert _titles(scoring.job_suggestions("excel, tableau, statistics")) == ["Business Analyst"]
+    assert _titles(scoring.job_suggestions("excel, tableau, sql")) == ["Data Analyst"]
+    # a gate keyword alone is enough, even with nothing to score
+    assert _titles(scoring.job_suggestions("sklearn")) == ["Data Analyst"]
+
+
+def test_data_scientist_needs_data_and_ml():
+    assert "Data Scientist" not in _titles(scoring.job_suggestions("tensorflow, pytorch"))
+    assert _titles(scoring.job_suggestions("python, tensorflow"))[:2] == ["Data Scientist", "Data Analyst"]
+
+
+def test_capped_score_keeps_project_coordinator_below_real_matches():
+    out = _titles(scoring.job_suggestions("express, jira, scrum, project management"))
+    assert out == ["Backend Developer", "Project Coordinator"]
+
+
+def test_taxonomy_without_quiz_table_ranks_answers_like_resumes():
+    tax = RoleTaxonomy([{"title": "A", "keywords": ["x", "y"]}, {"title": "B", "keywords": ["y"], "requires_any": ["z"]}])
+    assert [(sc, role["title"]) for sc, role, _ in tax.rank("x y")] == [(2, "A")]
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+
+from prompt_budget import estimate_tokens
+from routing import ModelRouter
+
+MESSAGES = [{"role": "user", "content": "Suggest three roles for a python developer"}]
+RESERVE = estimate_tokens(MESSAGES[0]["content"]) + 100
+
+
+class StreamingClient:
+    def __init__(self, deltas, usage=None, error=None):
+        self.deltas, self.usage, self.error = deltas, usage, error
+
+    def stream_chat(self, messages, model, endpoint="default", client_gone=None, on_usage=None, **kwargs):
+        if self.error is not None:
+            raise self.error
+        yield from self.deltas
+        if self.usage is not None:
+            on_usage(SimpleNamespace(total_tokens=self.usage))
+
+
+def _router(client):
+    router = ModelRouter({"groq": client}, {"small": ("groq", "m")}, rate_limits={"m": (0, 6000)})
+    router._chains["roadmap"] = [("groq", "m")]
+    return router
+
+
+def _available(router):
+    return router.limiter(("groq", "m")).tokens.level
+
+
+def test_stream_settles_with_reported_usage():
+    router = _router(StreamingClient(["a ", "b"], usage=40))
+    assert list(router.stream_chat(MESSAGES, "roadmap", max_tokens=100)) == ["a ", "b"]
+    assert _available(router) == pytest.approx(6000 - 40, abs=1)
+
+
+def test_stream_charges_an_overrun():
+    router = _router(StreamingClient(["a"], usage=RESERVE + 500))
+    list(router.stream_chat(MESSAGES, "roadmap", max_tokens=100))
+    assert _available(router) == pytest.approx(6000 - RESERVE - 500, abs=1)
+
+
+def test_abandoned_stream_settles_what_was_streamed():
+    router = _router(StreamingClient(["first chunk ", "never read"]))
+    stream = router.stream_chat(MESSAGES, "roadmap", max_tokens=100)
+    assert next(stream) == "first chunk "
+    stream.close()
+    used = estimate_tokens(MESSAGES[0]["content"]) + estimate_tokens("first chunk ")
+    assert _available(router) == pytest.approx(6000 - used, abs=1)
+
+
+def test_rejected_stream_refunds_the_reservation():
+    error = Exception("Error code: 400 - bad request")
+    error.status_code = 400
+    router = _router(StreamingClient([], error=error))
+    with pytest.raises(Exception):
+        list(router.stream_chat(MESSAGES, "roadmap", max_tokens=100))
+    assert _available(router) == pytest.approx(6000, abs=1)